@@ -1,20 +1,37 @@
-﻿import json
+﻿import atexit
 import os
+import threading
 import time
 import uuid
 
-from flask import Flask, request, jsonify, g
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 
+from attribute_store import AttributeStore
 from db_utils import DbUtil
 from jwt_util import decode, encode
-from model_search import neo4j_db
+from model_search import DEFAULT_EXPAND_FANOUT, MAX_BULK_OPERATIONS, MAX_EXPAND_FANOUT, neo4j_db
+from record_converter import parse_fields
+from user_dictionary import DYNASTIES, UserDictionary
 
 app = Flask(__name__)
 CORS(app)  # 允许所有域名访问
 neo4j_db_handle = neo4j_db()
 user_id = None
 
+# 预加载图谱内存快照，读接口直接由快照提供
+try:
+    neo4j_db_handle.refresh_snapshot()
+except Exception as e:
+    print(f"预加载图谱快照失败，将在首次读取时重试: {str(e)}")
+
+# 地名属性库，启动时增量同步 result 目录下有变化的属性文件
+attribute_store = AttributeStore()
+try:
+    attribute_store.sync()
+except Exception as e:
+    print(f"同步地名属性库失败: {str(e)}")
+
 # 获取项目目录
 APP_PATH = os.path.dirname(__file__)
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{APP_PATH}/database'
@@ -23,8 +40,104 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # 初始化数据库
 DbUtil.init_app(app)
 
-# 历史地名词典
-historical_places = []
+# 各阶段使用的大模型：实体提取使用结构化输出模式（可换为较小的非推理模型，如 qwen2.5:3b），回答生成使用推理模型
+EXTRACTION_MODEL = 'deepseek-r1:7b'
+EXTRACTION_STRUCTURED = True
+ANSWER_MODEL = 'deepseek-r1:7b'
+# 规则推理的最大深度，同步与异步推理接口共用
+INFERENCE_MAX_DEPTH = 30
+
+# 所有请求共享的实体提取器（地名词典自动机随图谱版本自动重建）
+_entity_extractor = None
+_entity_extractor_lock = threading.Lock()
+
+
+def _load_place_names():
+    """地名词典来源：图谱节点名称、别名及历史地名词典文件（朝代名由PlaceDictionary排除）"""
+    from entity_extract.place_dictionary import load_dictionary_file
+    names = load_dictionary_file(os.path.join(APP_PATH, 'historical_places.txt'))
+    try:
+        names.extend(neo4j_db_handle.get_place_names())
+    except Exception as e:
+        print(f"读取图谱地名失败，地名词典只使用词典文件: {str(e)}")
+    return names
+
+
+def get_entity_extractor():
+    """获取共享的实体提取器，首次调用时创建"""
+    global _entity_extractor
+    if _entity_extractor is None:
+        with _entity_extractor_lock:
+            if _entity_extractor is None:
+                from entity_extract.extraction_cache import ExtractionCache
+                from entity_extract.extractor import STRUCTURED_NUM_PREDICT, Extractor
+                from entity_extract.place_dictionary import PlaceDictionary
+                place_dictionary = PlaceDictionary(_load_place_names, neo4j_db_handle.names_version,
+                                                   exclude=DYNASTIES)
+                _entity_extractor = Extractor(
+                    model_name=EXTRACTION_MODEL,
+                    place_dictionary=place_dictionary,
+                    cache=ExtractionCache(),
+                    structured=EXTRACTION_STRUCTURED,
+                    num_predict=STRUCTURED_NUM_PREDICT
+                )
+    return _entity_extractor
+
+
+# 异步推理引擎和实体提取器（与同步提取器共享地名词典和提取缓存，
+# 二者的协程都在同一个后台事件循环上执行，共享一个AsyncClient）
+_async_inference = None
+
+
+def get_async_inference():
+    """获取共享的异步推理引擎和异步实体提取器，首次调用时创建"""
+    global _async_inference
+    if _async_inference is None:
+        extractor = get_entity_extractor()
+        with _entity_extractor_lock:
+            if _async_inference is None:
+                from entity_extract.async_extractor import AsyncExtractor, BackgroundLoop
+                from inference.async_rule_llm_integration import AsyncRuleLLMIntegration
+                background_loop = BackgroundLoop()
+                atexit.register(background_loop.close)
+                _async_inference = (
+                    AsyncRuleLLMIntegration(
+                        rule_file_path='rules/rule_base.json',
+                        model_name=ANSWER_MODEL,
+                        max_depth=INFERENCE_MAX_DEPTH,
+                        background_loop=background_loop
+                    ),
+                    AsyncExtractor(
+                        model_name=extractor.model_name,
+                        place_dictionary=extractor.place_dictionary,
+                        cache=extractor.cache,
+                        structured=extractor.structured,
+                        num_predict=extractor.num_predict,
+                        background_loop=background_loop
+                    )
+                )
+    return _async_inference
+
+
+# 异步推理任务：任务ID -> (提交时间, Future)；完成的任务保留INFERENCE_JOB_TTL秒供轮询
+INFERENCE_JOB_TTL = 600
+# 同时进行中的异步推理任务上限
+MAX_PENDING_INFERENCE_JOBS = 500
+_inference_jobs = {}
+_inference_jobs_lock = threading.Lock()
+
+
+def _prune_inference_jobs():
+    """移除超过保留时间的已完成任务，返回进行中的任务数（调用方持有锁）"""
+    now = time.time()
+    pending = 0
+    for job_id, (submitted_at, future) in list(_inference_jobs.items()):
+        if not future.done():
+            pending += 1
+        elif now - submitted_at > INFERENCE_JOB_TTL:
+            del _inference_jobs[job_id]
+    return pending
+
 
 # 修复：替换不再支持的before_first_request装饰器
 @app.before_request
@@ -32,9 +145,7 @@ def initialize_entity_extractor():
     # 添加对entity_extract的支持
     if not hasattr(g, 'entity_extractor'):
         try:
-            from entity_extract.extractor import Extractor
-            g.entity_extractor = Extractor()
-            print("实体提取器已初始化")
+            g.entity_extractor = get_entity_extractor()
         except Exception as e:
             print(f"初始化实体提取器失败: {str(e)}")
             
@@ -44,8 +155,8 @@ def initialize_entity_extractor():
             from inference.rule_llm_integration import RuleLLMIntegration
             g.rule_llm_integration = RuleLLMIntegration(
                 rule_file_path='rules/rule_base.json',
-                model_name='deepseek-r1:7b',
-                max_depth=30
+                model_name=ANSWER_MODEL,
+                max_depth=INFERENCE_MAX_DEPTH
             )
             print("规则推理模块已初始化")
         except Exception as e:
@@ -53,108 +164,23 @@ def initialize_entity_extractor():
 
 
 
-# 初始化用户词典
-def init_user_dict():
-    """从data.json提取地名实体并创建历史地名词典文件"""
-    dict_path = os.path.join(APP_PATH, 'historical_places.txt')
-    data_json_path = os.path.join(APP_PATH, 'data', 'data.json')
-    
+# 分词用户词典：启动时从已有词典文件和分词器缓存加载，再在后台按图谱内容同步
+user_dictionary = UserDictionary()
+try:
+    user_dictionary.load()
+    neo4j_db_handle.user_dictionary = user_dictionary
+except Exception as e:
+    print(f"加载分词用户词典失败: {str(e)}")
+
+
+def _sync_user_dictionary():
     try:
-        # 检查data.json是否存在
-        if not os.path.exists(data_json_path):
-            print(f"警告：data.json文件不存在: {data_json_path}")
-            return
-        
-        # 读取data.json文件
-        with open(data_json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        print(f"从data.json中提取实体，共有{len(data)}条记录")
-        
-        # 提取所有实体名称、类型和关系
-        entities = set()  # 实体名称
-        entity_types = set()  # 实体类型
-        relation_types = set()  # 关系类型
-        
-        for item in data:
-            # 提取实体名称
-            if "实体名称" in item and item["实体名称"]:
-                entities.add(item["实体名称"])
-            
-            # 提取关联实体
-            if "关联实体" in item and item["关联实体"]:
-                # 处理可能包含多个实体的情况（如：长洲县、元和县）
-                associated_entities = item["关联实体"].split("、")
-                for entity in associated_entities:
-                    entities.add(entity)
-            
-            # 提取实体类型
-            if "实体类型" in item and item["实体类型"]:
-                entity_types.add(item["实体类型"])
-            
-            # 提取关联实体类型
-            if "关联实体类型" in item and item["关联实体类型"]:
-                entity_types.add(item["关联实体类型"])
-            
-            # 提取关系类型
-            if "实体关系" in item and item["实体关系"]:
-                relation_types.add(item["实体关系"])
-        
-        # 添加朝代和时间单位
-        dynasties = [
-            "秦朝", "汉朝", "西汉", "东汉", "三国", "魏国", "蜀国", "吴国",
-            "晋朝", "西晋", "东晋", "南北朝", "隋朝", "唐朝", "五代十国", 
-            "宋朝", "北宋", "南宋", "辽朝", "金朝", "元朝", "明朝", "清朝", "民国"
-        ]
-        
-        for dynasty in dynasties:
-            entities.add(dynasty)
-        
-        # 组装词典内容
-        # 格式：词语 频率 词性
-        dict_content = []
-        
-        # 添加实体名称，标记为地名 (ns)
-        for entity in entities:
-            dict_content.append(f"{entity} 10 ns")
-        
-        # 添加实体类型，标记为名词 (n)
-        for entity_type in entity_types:
-            dict_content.append(f"{entity_type} 10 n")
-        
-        # 添加关系类型，标记为动词 (v)
-        for relation in relation_types:
-            dict_content.append(f"{relation} 10 v")
-        
-        # 写入文件
-        with open(dict_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(dict_content))
-        
-        print(f"已成功生成历史地名词典文件: {dict_path}")
-        print(f"词典包含 {len(entities)} 个实体名称, {len(entity_types)} 个实体类型, {len(relation_types)} 个关系类型")
-        
+        user_dictionary.sync(neo4j_db_handle)
     except Exception as e:
-        print(f"创建历史地名词典文件失败: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"从图谱同步分词用户词典失败: {str(e)}")
 
-# 调用初始化函数
-init_user_dict()
 
-# 预加载jieba分词用户词典
-try:
-    import jieba
-    
-    dict_path = os.path.join(APP_PATH, 'historical_places.txt')
-    if os.path.exists(dict_path):
-        jieba.load_userdict(dict_path)
-        print(f"成功加载历史地名词典: {dict_path}")
-    else:
-        print(f"警告：历史地名词典不存在: {dict_path}")
-except ImportError:
-    print("未找到jieba分词库，跳过用户词典加载")
-except Exception as e:
-    print(f"加载用户词典失败: {str(e)}")
+threading.Thread(target=_sync_user_dictionary, daemon=True).start()
 
 
 @app.before_request
@@ -227,17 +253,25 @@ def search_name():
     node_type = data.get('node_type', '')
     rel_type = data.get('rel_type', '')
     load_all = data.get('load_all', True)  # 默认加载所有节点和关系
+    stream = data.get('stream', False)  # 全量加载时是否以流式分块返回
+    fields = parse_fields(data.get('fields'))  # 字段投影，如 "id,name,type"，为空时返回全部属性
     
     try:
+        # 全量加载且要求流式返回时，边读边写出，避免在内存中构建完整结果
+        if not entity and not node_type and not rel_type and load_all and stream:
+            fmt = data.get('format', 'json')
+            print(f"使用流式方式加载全部图谱, 格式: {fmt}")
+            return _graph_stream_response(fmt, fields)
+
         # 如果没有提供任何参数，则使用默认图谱加载并加载所有关系
         if not entity and not node_type and not rel_type:
-            json_data = neo4j_db_handle.get_default_graph(limit=50, load_all=load_all)
+            json_data = neo4j_db_handle.get_default_graph(limit=50, load_all=load_all, fields=fields)
             print(f"使用默认图谱加载方式, {'加载全部' if load_all else '加载部分'}")
         else:
             # 根据提供的不同参数类型，使用不同的专用函数
             if entity:
                 # 使用实体名称搜索
-                json_data = neo4j_db_handle.search_nodes_by_name(entity)
+                json_data = neo4j_db_handle.search_nodes_by_name(entity, fields=fields)
                 print(f"按实体名称'{entity}'搜索")
             elif node_type:
                 # 按节点类型筛选
@@ -264,13 +298,33 @@ def search_name():
         })
 
 
+def _graph_stream_response(fmt, fields=None):
+    """构建全量图谱的流式响应"""
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    return Response(neo4j_db_handle.iter_default_graph(fmt=fmt, fields=fields),
+                    content_type=f'{mimetype}; charset=utf-8')
+
+
+@app.route('/api/graph/export', methods=['GET'])
+def export_graph():
+    """流式导出全量图谱（format=json|ndjson，fields为逗号分隔的字段投影）"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('json', 'ndjson'):
+        return jsonify({
+            "code": 400,
+            "msg": "不支持的导出格式"
+        })
+    return _graph_stream_response(fmt, parse_fields(request.args.get('fields')))
+
+
 @app.route('/api/find_node_page', methods=['POST'])
 def find_list():
     # 获取前端传递的参数
     current = int(request.json.get('pageNum', 1))
     limit = int(request.json.get('pageSize', 10))
     name_query = request.json.get('name', '')
-    json_data = neo4j_db_handle.find_node_page(current, limit, name_query)
+    cursor = request.json.get('cursor')  # 续页游标，提供时按游标翻页
+    json_data = neo4j_db_handle.find_node_page(current, limit, name_query, cursor)
     return jsonify({
         "code": 200,
         "data": json_data
@@ -308,6 +362,41 @@ def delete_node():
 
 
 
+@app.route('/bulk_mutate', methods=['POST'])
+def bulk_mutate():
+    """在一个事务中批量创建、修改、删除节点"""
+    try:
+        data = request.json or {}
+        operations = data.get('operations')
+        if not operations or not isinstance(operations, list):
+            return jsonify({
+                "code": 400,
+                "msg": "操作列表不能为空"
+            })
+        if len(operations) > MAX_BULK_OPERATIONS:
+            return jsonify({
+                "code": 400,
+                "msg": f"单次最多提交{MAX_BULK_OPERATIONS}项操作"
+            })
+        
+        committed, results = neo4j_db_handle.bulk_mutate(operations)
+        succeeded = sum(1 for item in results if item['success'])
+        return jsonify({
+            "code": 200 if committed else 500,
+            "msg": "success" if committed else "批量写入失败，所有操作均未生效",
+            "data": {
+                "results": results,
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
 @app.route('/api/node_types', methods=['GET'])
 def get_node_types():
     """获取所有节点类型"""
@@ -342,6 +431,52 @@ def get_relationship_types():
         })
 
 
+@app.route('/api/schema/catalog', methods=['GET'])
+def get_schema_catalog():
+    """获取节点类型和关系类型及其数量"""
+    try:
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": neo4j_db_handle.get_schema_catalog()
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
+@app.route('/api/place/attributes', methods=['GET'])
+def get_place_attributes():
+    """按中文名或别名获取地名属性"""
+    try:
+        name = request.args.get('name')
+        if not name:
+            return jsonify({
+                "code": 400,
+                "msg": "地名不能为空"
+            })
+
+        attributes = attribute_store.get(name.strip())
+        if attributes is None:
+            return jsonify({
+                "code": 404,
+                "msg": "未找到该地名的属性"
+            })
+
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": attributes
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
 @app.route('/api/node/detail', methods=['GET'])
 def get_node_detail():
     """获取节点的详细属性"""
@@ -434,6 +569,42 @@ def get_node_relations():
         })
 
 
+@app.route('/api/node/expand', methods=['POST'])
+def expand_nodes():
+    """批量展开多个节点的邻域，返回合并后的子图"""
+    try:
+        data = request.json or {}
+        node_ids = data.get('ids') or []
+        if not node_ids or not isinstance(node_ids, list):
+            return jsonify({
+                "code": 400,
+                "msg": "节点ID列表不能为空"
+            })
+        fanout = data.get('fanout', DEFAULT_EXPAND_FANOUT)
+        if isinstance(fanout, bool) or not isinstance(fanout, int) or not 1 <= fanout <= MAX_EXPAND_FANOUT:
+            return jsonify({
+                "code": 400,
+                "msg": f"fanout必须是1到{MAX_EXPAND_FANOUT}之间的整数"
+            })
+        
+        result = neo4j_db_handle.expand_nodes(
+            node_ids,
+            hops=data.get('hops', 1),
+            rel_types=data.get('rel_types'),
+            fanout=fanout
+        )
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": result
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
 @app.route('/api/node/by_type', methods=['GET'])
 def get_nodes_by_type():
     """根据节点类型获取节点列表"""
@@ -488,6 +659,8 @@ def search_nodes_by_name():
     try:
         search_text = request.args.get('name')
         limit = request.args.get('limit', 100, type=int)
+        prefix = request.args.get('mode') == 'prefix'  # mode=prefix 为联想输入（前缀）搜索
+        fields = parse_fields(request.args.get('fields'))
         
         if not search_text:
             return jsonify({
@@ -495,7 +668,126 @@ def search_nodes_by_name():
                 "msg": "搜索文本不能为空"
             })
         
-        result = neo4j_db_handle.search_nodes_by_name(search_text, limit)
+        result = neo4j_db_handle.search_nodes_by_name(search_text, limit, prefix=prefix, fields=fields)
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": result
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
+@app.route('/api/stats/queries', methods=['GET'])
+def get_query_stats():
+    """获取各命名查询的执行统计（调用次数、本进程重复发送相同语句的次数、耗时）"""
+    try:
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": neo4j_db_handle.get_query_stats()
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
+@app.route('/api/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """获取读结果缓存的命中统计"""
+    try:
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": neo4j_db_handle.get_cache_stats()
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
+@app.route('/api/stats/extraction', methods=['GET'])
+def get_extraction_stats():
+    """获取实体提取结果缓存的命中统计及节省的模型调用时间"""
+    try:
+        cache = get_entity_extractor().cache
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": cache.stats() if cache is not None else {}
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
+@app.route('/api/ai/extract_batch', methods=['POST'])
+def extract_entities_batch():
+    """批量提取多条文本中的地名实体，结果与输入顺序一致"""
+    try:
+        from entity_extract.extractor import DEFAULT_BATCH_TIMEOUT, DEFAULT_BATCH_WORKERS, MAX_BATCH_TEXTS
+        data = request.json or {}
+        texts = data.get('texts')
+        if not texts or not isinstance(texts, list):
+            return jsonify({
+                "code": 400,
+                "msg": "文本列表不能为空"
+            })
+        if len(texts) > MAX_BATCH_TEXTS:
+            return jsonify({
+                "code": 400,
+                "msg": f"单次最多提交{MAX_BATCH_TEXTS}条文本"
+            })
+        
+        batch = get_entity_extractor().extract_entities_batch(
+            [text if isinstance(text, str) else '' for text in texts],
+            use_llm=bool(data.get('use_llm', False)),
+            max_workers=int(data.get('max_workers', DEFAULT_BATCH_WORKERS)),
+            timeout=float(data.get('timeout', DEFAULT_BATCH_TIMEOUT))
+        )
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": batch
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "msg": str(e)
+        })
+
+
+@app.route('/api/ai/extract_document', methods=['POST'])
+def extract_document_entities():
+    """长文档地名实体提取：分块并发提取，返回去重后的地名及其在原文中的字符偏移"""
+    try:
+        from entity_extract.document_chunker import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE
+        from entity_extract.extractor import DEFAULT_BATCH_TIMEOUT, DEFAULT_BATCH_WORKERS
+        data = request.json or {}
+        text = data.get('text')
+        if not text or not isinstance(text, str):
+            return jsonify({
+                "code": 400,
+                "msg": "文本不能为空"
+            })
+        
+        result = get_entity_extractor().extract_entities_long(
+            text,
+            use_llm=bool(data.get('use_llm', False)),
+            chunk_size=max(1, int(data.get('chunk_size', DEFAULT_CHUNK_SIZE))),
+            overlap=max(0, int(data.get('overlap', DEFAULT_CHUNK_OVERLAP))),
+            max_workers=int(data.get('max_workers', DEFAULT_BATCH_WORKERS)),
+            timeout=float(data.get('timeout', DEFAULT_BATCH_TIMEOUT))
+        )
         return jsonify({
             "code": 200,
             "msg": "success",
@@ -512,25 +804,9 @@ def search_nodes_by_name():
 def ai_inference():
     """使用大模型进行推理"""
     try:
-        # 获取请求参数
-        if request.method == 'POST':
-            data = request.get_json()
-            if not data:
-                return jsonify({
-                    'success': False,
-                    'error': '请求参数不能为空'
-                }), 400
-            
-            user_question = data.get('question', '')
-        else:  # GET请求
-            user_question = request.args.get('question', '')
-        
-        # 验证问题不为空
-        if not user_question or len(user_question.strip()) == 0:
-            return jsonify({
-                'success': False,
-                'error': '问题不能为空'
-            }), 400
+        user_question, use_llm_extraction, error_response = _read_inference_request()
+        if error_response is not None:
+            return error_response
         
         # 请求ID用于日志跟踪
         request_id = str(uuid.uuid4())[:8]
@@ -544,8 +820,8 @@ def ai_inference():
                 from inference.rule_llm_integration import RuleLLMIntegration
                 g.rule_llm_integration = RuleLLMIntegration(
                     rule_file_path='rules/rule_base.json',
-                    model_name='deepseek-r1:7b',
-                    max_depth=3
+                    model_name=ANSWER_MODEL,
+                    max_depth=INFERENCE_MAX_DEPTH
                 )
             except Exception as init_err:
                 print(f"[{request_id}] 初始化规则推理模块失败: {str(init_err)}")
@@ -560,8 +836,7 @@ def ai_inference():
         if not hasattr(g, 'entity_extractor'):
             print(f"[{request_id}] 初始化实体提取器")
             try:
-                from entity_extract.extractor import Extractor
-                g.entity_extractor = Extractor()
+                g.entity_extractor = get_entity_extractor()
             except Exception as init_err:
                 print(f"[{request_id}] 初始化实体提取器失败: {str(init_err)}")
                 return jsonify({
@@ -579,84 +854,191 @@ def ai_inference():
             result = g.rule_llm_integration.process_question(
                 question=user_question,
                 entity_extractor=g.entity_extractor,
-                neo4j_db=neo4j_db_handle
+                neo4j_db=neo4j_db_handle,
+                use_llm_extraction=use_llm_extraction
             )
             
-            # 构建响应
-            process_time = result.get('process_time', 0)
-            entities = result.get('entities', [])
-            
-            # 记录处理结果
-            print(f"[{request_id}] 问题处理完成，耗时: {process_time:.2f}秒, 识别到 {len(entities)} 个实体")
-            if entities:
-                print(f"[{request_id}] 识别到的实体: {', '.join(entities[:5])}" + ("..." if len(entities) > 5 else ""))
-            
-            # 检查知识图谱数据
-            kg_data = result.get('kg_data', {'nodes': [], 'lines': []})
-            node_count = len(kg_data.get('nodes', []))
-            line_count = len(kg_data.get('lines', []))
-            print(f"[{request_id}] 生成的知识图谱数据: {node_count} 个节点, {line_count} 条关系")
-            
-            # 获取格式化的关系文本
-            relations_text = result.get('context', '未找到相关关系数据')
-            
-            # 返回完整响应
-            response = {
-                'success': True,
-                'answer': result.get('answer', '抱歉，无法回答这个问题'),
-                'kg_data': kg_data,
-                'entities': entities,
-                'process_time': process_time,
-                'relations_text': relations_text  # 添加格式化的关系文本
-            }
-            
-            return jsonify(response)
+            return _inference_response(request_id, result)
             
         except Exception as process_err:
-            error_type = type(process_err).__name__
-            error_msg = str(process_err)
-            
-            print(f"[{request_id}] 处理问题时出错: {error_type} - {error_msg}")
-            import traceback
-            traceback.print_exc()
-            
-            # 根据错误类型提供不同的用户友好错误信息
-            user_message = "抱歉，处理您的问题时遇到了技术问题。"
-            
-            if "ConnectionRefused" in error_type or "ConnectionError" in error_type:
-                user_message = "抱歉，无法连接到知识库服务器，请检查数据库连接。"
-            elif "TimeoutError" in error_type:
-                user_message = "抱歉，查询超时，请尝试简化您的问题或稍后再试。"
-            elif "ollama" in error_msg.lower():
-                user_message = "抱歉，大模型服务暂时不可用，请稍后再试。"
-            elif "memory" in error_msg.lower() or "cuda" in error_msg.lower():
-                user_message = "抱歉，系统资源不足，请稍后再试。"
-            elif "invalid" in error_msg.lower() or "syntax" in error_msg.lower():
-                user_message = "抱歉，您的问题格式可能有误，请尝试用不同方式提问。"
-            
-            return jsonify({
-                'success': False,
-                'error': f'处理问题时出错: {error_type}',
-                'error_detail': error_msg,
-                'answer': user_message,
-                'kg_data': {'nodes': [], 'lines': []},
-                'process_time': time.time() - start_time
-            }), 500
+            return _inference_process_error(request_id, process_err, start_time)
         
     except Exception as e:
-        error_type = type(e).__name__
-        error_msg = str(e)
-        print(f"处理推理请求时出错: {error_type} - {error_msg}")
-        import traceback
-        traceback.print_exc()
+        return _inference_request_error(e)
+
+
+def _read_inference_request():
+    """
+    读取推理请求参数
+    :return: (问题, 是否直接使用大模型提取实体, 参数错误时的响应)
+    """
+    if request.method == 'POST':
+        data = request.get_json()
+        if not data:
+            return None, False, (jsonify({
+                'success': False,
+                'error': '请求参数不能为空'
+            }), 400)
+        
+        user_question = data.get('question', '')
+        use_llm_extraction = bool(data.get('use_llm', False))
+    else:  # GET请求
+        user_question = request.args.get('question', '')
+        use_llm_extraction = request.args.get('use_llm') in ('1', 'true')
+    
+    # 验证问题不为空
+    if not user_question or len(user_question.strip()) == 0:
+        return None, False, (jsonify({
+            'success': False,
+            'error': '问题不能为空'
+        }), 400)
+    return user_question, use_llm_extraction, None
+
+
+def _inference_response(request_id, result, **extra):
+    """由推理结果构建响应，extra 为附加的响应字段"""
+    process_time = result.get('process_time', 0)
+    entities = result.get('entities', [])
+    
+    # 记录处理结果
+    print(f"[{request_id}] 问题处理完成，耗时: {process_time:.2f}秒, 识别到 {len(entities)} 个实体")
+    if entities:
+        print(f"[{request_id}] 识别到的实体: {', '.join(entities[:5])}" + ("..." if len(entities) > 5 else ""))
+    
+    # 检查知识图谱数据
+    kg_data = result.get('kg_data', {'nodes': [], 'lines': []})
+    node_count = len(kg_data.get('nodes', []))
+    line_count = len(kg_data.get('lines', []))
+    print(f"[{request_id}] 生成的知识图谱数据: {node_count} 个节点, {line_count} 条关系")
+    
+    # 获取格式化的关系文本
+    relations_text = result.get('context', '未找到相关关系数据')
+    
+    # 返回完整响应
+    response = {
+        'success': True,
+        'answer': result.get('answer', '抱歉，无法回答这个问题'),
+        'kg_data': kg_data,
+        'entities': entities,
+        'process_time': process_time,
+        'relations_text': relations_text  # 添加格式化的关系文本
+    }
+    response.update(extra)
+    
+    return jsonify(response)
+
+
+def _inference_process_error(request_id, process_err, start_time):
+    """处理问题出错时的响应"""
+    error_type = type(process_err).__name__
+    error_msg = str(process_err)
+    
+    print(f"[{request_id}] 处理问题时出错: {error_type} - {error_msg}")
+    import traceback
+    traceback.print_exc()
+    
+    # 根据错误类型提供不同的用户友好错误信息
+    user_message = "抱歉，处理您的问题时遇到了技术问题。"
+    
+    if "ConnectionRefused" in error_type or "ConnectionError" in error_type:
+        user_message = "抱歉，无法连接到知识库服务器，请检查数据库连接。"
+    elif "TimeoutError" in error_type:
+        user_message = "抱歉，查询超时，请尝试简化您的问题或稍后再试。"
+    elif "ollama" in error_msg.lower():
+        user_message = "抱歉，大模型服务暂时不可用，请稍后再试。"
+    elif "memory" in error_msg.lower() or "cuda" in error_msg.lower():
+        user_message = "抱歉，系统资源不足，请稍后再试。"
+    elif "invalid" in error_msg.lower() or "syntax" in error_msg.lower():
+        user_message = "抱歉，您的问题格式可能有误，请尝试用不同方式提问。"
+    
+    return jsonify({
+        'success': False,
+        'error': f'处理问题时出错: {error_type}',
+        'error_detail': error_msg,
+        'answer': user_message,
+        'kg_data': {'nodes': [], 'lines': []},
+        'process_time': time.time() - start_time
+    }), 500
+
+
+def _inference_request_error(e):
+    """推理请求无法处理时的响应"""
+    error_type = type(e).__name__
+    error_msg = str(e)
+    print(f"处理推理请求时出错: {error_type} - {error_msg}")
+    import traceback
+    traceback.print_exc()
+    
+    return jsonify({
+        'success': False,
+        'error': f'请求处理错误: {error_type}',
+        'error_detail': error_msg,
+        'answer': f"抱歉，系统无法处理您的请求。请检查输入格式是否正确，或稍后再试。",
+        'kg_data': {'nodes': [], 'lines': []}
+    }), 500
+
+
+@app.route('/api/ai/inference_async', methods=['POST', 'GET'])
+def ai_inference_async():
+    """
+    使用大模型进行推理（异步版本）：提交后立即返回任务ID，由客户端轮询 /api/ai/inference_async/<job_id> 获取结果
+    推理协程在常驻的后台事件循环上并发执行，所有任务共享一个AsyncClient连接池，等待模型期间不占用请求线程
+    """
+    try:
+        user_question, use_llm_extraction, error_response = _read_inference_request()
+        if error_response is not None:
+            return error_response
+        
+        integration, extractor = get_async_inference()
+        with _inference_jobs_lock:
+            if _prune_inference_jobs() >= MAX_PENDING_INFERENCE_JOBS:
+                return jsonify({
+                    'success': False,
+                    'error': '进行中的推理任务过多，请稍后再试'
+                }), 503
+            job_id = str(uuid.uuid4())
+            future = integration.background_loop.submit(integration.aprocess_question(
+                question=user_question,
+                entity_extractor=extractor,
+                neo4j_db=neo4j_db_handle,
+                use_llm_extraction=use_llm_extraction
+            ))
+            _inference_jobs[job_id] = (time.time(), future)
+        print(f"[{job_id[:8]}] 已提交异步大模型推理任务: '{user_question}'")
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'pending'
+        }), 202
         
+    except Exception as e:
+        return _inference_request_error(e)
+
+
+@app.route('/api/ai/inference_async/<job_id>', methods=['GET'])
+def get_inference_job(job_id):
+    """查询异步推理任务：未完成时返回 status=pending，完成后返回与 /api/ai/inference 相同的结果"""
+    with _inference_jobs_lock:
+        job = _inference_jobs.get(job_id)
+    if job is None:
         return jsonify({
             'success': False,
-            'error': f'请求处理错误: {error_type}',
-            'error_detail': error_msg,
-            'answer': f"抱歉，系统无法处理您的请求。请检查输入格式是否正确，或稍后再试。",
-            'kg_data': {'nodes': [], 'lines': []}
-        }), 500
+            'error': '推理任务不存在或已过期'
+        }), 404
+    
+    submitted_at, future = job
+    if not future.done():
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'pending'
+        })
+    
+    try:
+        return _inference_response(job_id[:8], future.result(), job_id=job_id, status='done')
+    except Exception as process_err:
+        return _inference_process_error(job_id[:8], process_err, submitted_at)
 
 
 @app.route('/user/menu', methods=['GET'])
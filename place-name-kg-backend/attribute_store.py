@@ -0,0 +1,175 @@
+"""
+地名属性库
+将 result/*.json 属性文件编译为一个SQLite文件，按 中文名 和别名建立索引；
+同步时只重新解析修改时间或内容哈希发生变化的文件
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from search_index import split_aliases
+
+# 默认属性库路径
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'attributes.db')
+# 默认属性文件目录
+DEFAULT_SOURCE_DIR = os.path.join(os.path.dirname(__file__), 'result')
+
+# 检索键优先级：中文名优先于别名
+PRIORITY_NAME = 0
+PRIORITY_ALIAS = 1
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        filename TEXT PRIMARY KEY,
+        mtime REAL NOT NULL,
+        size INTEGER NOT NULL,
+        sha1 TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS attributes (
+        filename TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS names (
+        key TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        priority INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_names_key ON names (key, priority, filename);
+    CREATE INDEX IF NOT EXISTS idx_names_filename ON names (filename);
+"""
+
+
+def file_digest(content):
+    """文件内容哈希"""
+    return hashlib.sha1(content).hexdigest()
+
+
+class AttributeStore:
+    """
+    地名属性库
+    每个属性文件一行，属性以JSON保存；names表将 中文名/别名 映射到文件，
+    同名时按 (优先级, 文件名) 取第一条
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM attributes").fetchone()[0]
+
+    def sync(self, directory=DEFAULT_SOURCE_DIR):
+        """
+        增量同步属性文件
+        修改时间和大小均未变化的文件直接跳过；变化的文件先比较内容哈希，内容变化才重新解析；
+        已删除的文件从库中移除
+        :return: 同步统计
+        """
+        stats = {'scanned': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        filenames = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+
+        with self._lock:
+            known = {row[0]: row[1:] for row in self._conn.execute("SELECT filename, mtime, size, sha1 FROM files")}
+            try:
+                for filename in filenames:
+                    stats['scanned'] += 1
+                    filepath = os.path.join(directory, filename)
+                    stat = os.stat(filepath)
+                    previous = known.get(filename)
+                    if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                        stats['unchanged'] += 1
+                        continue
+
+                    with open(filepath, 'rb') as file:
+                        content = file.read()
+                    digest = file_digest(content)
+                    if previous and previous[2] == digest:
+                        # 只有修改时间变化
+                        self._conn.execute("UPDATE files SET mtime = ?, size = ? WHERE filename = ?",
+                                           (stat.st_mtime, stat.st_size, filename))
+                        stats['unchanged'] += 1
+                        continue
+
+                    try:
+                        data = json.loads(content.decode('utf-8'))
+                    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                        print(f"解析文件 {filename} 时出错: {e}")
+                        stats['failed'] += 1
+                        continue
+                    self._write_file(filename, data)
+                    self._conn.execute("INSERT OR REPLACE INTO files (filename, mtime, size, sha1) VALUES (?, ?, ?, ?)",
+                                       (filename, stat.st_mtime, stat.st_size, digest))
+                    stats['updated'] += 1
+
+                for filename in set(known) - set(filenames):
+                    self._delete_file(filename)
+                    stats['removed'] += 1
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+        print(f"属性库同步完成: 扫描{stats['scanned']}个文件, 更新{stats['updated']}个, "
+              f"删除{stats['removed']}个, 失败{stats['failed']}个")
+        return stats
+
+    def _write_file(self, filename, data):
+        self._delete_file(filename)
+        if not isinstance(data, dict):
+            return
+        self._conn.execute("INSERT INTO attributes (filename, data) VALUES (?, ?)",
+                           (filename, json.dumps(data, ensure_ascii=False)))
+        name = data.get("中文名")
+        keys = []
+        if name:
+            keys.append((name, PRIORITY_NAME))
+        keys.extend((alias, PRIORITY_ALIAS) for alias in split_aliases(data.get("别名")) if alias != name)
+        self._conn.executemany("INSERT INTO names (key, filename, priority) VALUES (?, ?, ?)",
+                               [(key, filename, priority) for key, priority in keys])
+
+    def _delete_file(self, filename):
+        self._conn.execute("DELETE FROM names WHERE filename = ?", (filename,))
+        self._conn.execute("DELETE FROM attributes WHERE filename = ?", (filename,))
+        self._conn.execute("DELETE FROM files WHERE filename = ?", (filename,))
+
+    def get(self, name, include_aliases=True):
+        """
+        按中文名或别名获取地名属性
+        :param include_aliases: 为False时只按中文名匹配
+        :return: 属性字典，不存在时返回None
+        """
+        if not name:
+            return None
+        max_priority = PRIORITY_ALIAS if include_aliases else PRIORITY_NAME
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT a.data FROM names k JOIN attributes a ON a.filename = k.filename
+                WHERE k.key = ? AND k.priority <= ?
+                ORDER BY k.priority, k.filename
+                LIMIT 1
+            """, (name, max_priority)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, names, include_aliases=True):
+        """批量获取地名属性，返回 {名称: 属性}，不存在的名称不包含在结果中"""
+        result = {}
+        for name in set(names):
+            attributes = self.get(name, include_aliases)
+            if attributes is not None:
+                result[name] = attributes
+        return result
@@ -1,46 +1,39 @@
+import argparse
+import csv
+import hashlib
 import json
 import os
+import random
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from py2neo import Graph, Node, Relationship
 
-# 连接到Neo4j数据库
-graph = Graph("bolt://localhost:7687", auth=("neo4j", "123456"))
+from attribute_store import DEFAULT_DB_PATH, AttributeStore
+from graph_stamp import DEFAULT_STAMP_PATH, publish_graph_change
+from ingest_pipeline import (NameRegistry, ProgressReporter, batched, iter_json_array, normalize_rows,
+                             split_target_entities, split_targets, validate_rows)
+from query_executor import QueryExecutor
 
+# 默认连接的Neo4j数据库，可通过 --uri/--user/--password 指定
+DEFAULT_NEO4J_URI = "bolt://localhost:7687"
+DEFAULT_NEO4J_USER = "neo4j"
+DEFAULT_NEO4J_PASSWORD = "123456"
 
-def read_json_files(directory):
-    """
-    读取指定目录下的所有JSON文件
-    参数:
-        directory (str): 要搜索的目录路径
-    返回:
-        list: 包含所有JSON文件内容的列表
-    """
-    json_data = []
-    # 遍历目录下的所有文件
-    for filename in os.listdir(directory):
-        if filename.endswith('.json'):
-            filepath = os.path.join(directory, filename)
-            try:
-                # 读取并解析JSON文件
-                with open(filepath, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    json_data.append(data)
-            except json.JSONDecodeError as e:
-                print(f"解析文件 {filename} 时出错: {e}")
-            except Exception as e:
-                print(f"读取文件 {filename} 时发生错误: {e}")
+# 当前连接，由 main 按命令行参数创建（csv模式不连接数据库）
+graph = None
 
-    return json_data
-
-
-def get_attributes(address_attributes, address):
-    """
-    获取地址属性
-    """
-    for address_attribute in address_attributes:
-        if address_attribute.get("中文名") == address:
-            return address_attribute
-    return None
+# 批量导入时每条UNWIND语句包含的行数
+IMPORT_BATCH_SIZE = 1000
+# 上次导入的状态（节点/关系的内容哈希），供增量导入比较
+IMPORT_STATE_PATH = 'data/import_state.json'
+# neo4j-admin 导入CSV的默认输出目录
+ADMIN_CSV_DIR = 'import'
+# 并行导入时批次遇到临时性错误（如锁冲突、死锁）的重试次数及初始退避时间（秒）
+IMPORT_RETRIES = 3
+RETRY_BASE_DELAY = 0.2
 
 
 def is_evolution_relation(relation):
@@ -76,7 +69,7 @@ def get_time_from_name(name):
     return int(match.group(1)) if match else None
 
 
-def save_to_neo(data, address_attributes):
+def save_to_neo(data, attribute_store):
     """
     保存数据到Neo4j
     """
@@ -97,7 +90,7 @@ def save_to_neo(data, address_attributes):
     # 创建或获取实体节点
     node1 = graph.nodes.match(name=entity1).first()
     if not node1:
-        node1_attributes = get_attributes(address_attributes, entity1)
+        node1_attributes = attribute_store.get(entity1, include_aliases=False)
         if node1_attributes:
             node1 = Node(label1, name=entity1, **node1_attributes)
         else:
@@ -105,14 +98,14 @@ def save_to_neo(data, address_attributes):
         graph.create(node1)
 
     # 处理目标实体（支持多个）
-    target_entities = entity2.split("、") if "、" in entity2 else entity2.split(",")
+    target_entities = split_target_entities(entity2)
     
     for target_entity in target_entities:
         try:
             # 创建或获取目标节点
             node2 = graph.nodes.match(name=target_entity).first()
             if not node2:
-                node2_attributes = get_attributes(address_attributes, target_entity)
+                node2_attributes = attribute_store.get(target_entity, include_aliases=False)
                 if node2_attributes:
                     node2 = Node(label2, name=target_entity, **node2_attributes)
                 else:
@@ -148,21 +141,623 @@ def save_to_neo(data, address_attributes):
             print(f"处理关系时出错: {data}, 错误: {e}")
 
 
+def relationship_from_row(row):
+    """
+    由只含一个关联实体的主数据行构建关系，方向、名称和属性与 save_to_neo 相同
+    返回:
+        dict: {'src', 'src_label', 'dst', 'dst_label', 'type', 'props'}
+    """
+    relation = row["实体关系"]
+    date = row.get("时间", "")
+    relation_type = row.get("关系类型", "")
+
+    props = {'relation': relation}
+    if date:
+        props['time'] = date
+    if relation_type:
+        props['relation_type'] = relation_type
+
+    source = (row["实体名称"], row["实体类型"])
+    target = (row["关联实体"], row["关联实体类型"])
+    # "演变类"关系方向为 关联实体 -> 实体名称
+    if relation_type == "演变类":
+        source, target = target, source
+    return {'src': source[0], 'src_label': source[1], 'dst': target[0], 'dst_label': target[1],
+            'type': format_relation(relation, date), 'props': props}
+
+
+def plan_import(rows, attribute_store):
+    """
+    将主数据整理为待写入的节点和关系
+    节点按名称唯一，标签取该名称首次出现时的实体类型（与逐条导入时按名称复用已有节点一致）；
+    关系方向、名称和属性与 save_to_neo 相同
+    返回:
+        tuple: (节点 {名称: {'label': 标签, 'props': 属性}}, 关系列表 [{'src', 'dst', 'type', 'props'}])
+    """
+    nodes = {}
+    relationships = []
+
+    def add_node(name, label):
+        if name not in nodes:
+            attributes = attribute_store.get(name, include_aliases=False)
+            nodes[name] = {'label': label, 'props': dict(attributes) if attributes else {}}
+
+    for row in split_targets(validate_rows(normalize_rows(rows))):
+        add_node(row["实体名称"], row["实体类型"])
+        add_node(row["关联实体"], row["关联实体类型"])
+        rel = relationship_from_row(row)
+        relationships.append({'src': rel['src'], 'dst': rel['dst'], 'type': rel['type'], 'props': rel['props']})
+
+    return nodes, relationships
+
+
+def content_hash(value):
+    """
+    计算数据的内容哈希（键排序后的JSON）
+    """
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def relationship_key(src_label, src, rel_type, dst_label, dst):
+    """
+    关系的唯一标识：两端节点 (标签, 名称) 及关系类型
+    """
+    return json.dumps([src_label, src, rel_type, dst_label, dst], ensure_ascii=False)
+
+
+def build_import_state(nodes, relationships):
+    """
+    由导入计划生成导入状态，记录每个节点/关系的标识、内容哈希、属性键及属性
+    返回:
+        dict: {'nodes': {名称: 记录}, 'relationships': {关系标识: 记录}}
+    """
+    state = {'nodes': {}, 'relationships': {}}
+    for name, node in nodes.items():
+        state['nodes'][name] = {
+            'name': name,
+            'label': node['label'],
+            'hash': content_hash([node['label'], node['props']]),
+            'keys': sorted(node['props']),
+            'props': node['props']
+        }
+    for rel in relationships:
+        src_label = nodes[rel['src']]['label']
+        dst_label = nodes[rel['dst']]['label']
+        key = relationship_key(src_label, rel['src'], rel['type'], dst_label, rel['dst'])
+        state['relationships'][key] = {
+            'src': rel['src'],
+            'dst': rel['dst'],
+            'src_label': src_label,
+            'dst_label': dst_label,
+            'type': rel['type'],
+            'hash': content_hash(rel['props']),
+            'keys': sorted(rel['props']),
+            'props': rel['props']
+        }
+    return state
+
+
+def load_import_state(path=IMPORT_STATE_PATH):
+    """
+    读取上次导入的状态，不存在时返回空状态
+    """
+    if not os.path.exists(path):
+        return {'nodes': {}, 'relationships': {}}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_import_state(state, path=IMPORT_STATE_PATH):
+    """
+    保存导入状态（先写临时文件再替换，避免中断时留下不完整的状态文件）
+    属性本身不写入状态文件，只保留哈希和属性键
+    """
+    stored = {
+        'nodes': {key: {k: v for k, v in item.items() if k != 'props'} for key, item in state['nodes'].items()},
+        'relationships': {key: {k: v for k, v in item.items() if k != 'props'}
+                          for key, item in state['relationships'].items()}
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(stored, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def diff_import_state(previous, current):
+    """
+    比较两次导入状态
+    节点标签变化视为删除旧节点并新增节点；属性被删除的键以 None 写入，使 SET += 移除该属性
+    返回:
+        dict: 各类变更 {'nodes_upsert', 'nodes_delete', 'rels_upsert', 'rels_delete'}，
+              以及新增/修改/删除的数量
+    """
+    delta = {'nodes_upsert': [], 'nodes_delete': [], 'rels_upsert': [], 'rels_delete': [],
+             'added': 0, 'changed': 0, 'removed': 0}
+
+    for kind, upsert, remove in (('nodes', 'nodes_upsert', 'nodes_delete'),
+                                 ('relationships', 'rels_upsert', 'rels_delete')):
+        old_items = previous.get(kind, {})
+        new_items = current[kind]
+        for key, old in old_items.items():
+            new = new_items.get(key)
+            if new is None or new.get('label') != old.get('label'):
+                delta[remove].append(old)
+                delta['removed'] += 1
+        for key, new in new_items.items():
+            old = old_items.get(key)
+            if old is not None and old.get('label') == new.get('label'):
+                if old['hash'] == new['hash']:
+                    continue
+                delta['changed'] += 1
+                props = dict(new['props'])
+                for removed_key in set(old.get('keys', [])) - set(props):
+                    props[removed_key] = None
+                delta[upsert].append(dict(new, props=props))
+            else:
+                delta['added'] += 1
+                delta[upsert].append(new)
+    return delta
+
+
+def _group_rows(items):
+    """
+    按结构占位符取值分组
+    参数:
+        items (iterable): (结构占位符取值, 行)
+    返回:
+        list: [(结构占位符取值, 行列表)]
+    """
+    groups = {}
+    for schema, row in items:
+        groups.setdefault(tuple(sorted(schema.items())), []).append(row)
+    return [(dict(schema), rows) for schema, rows in groups.items()]
+
+
+def _write_groups(executor, query, groups, batch_size, tx):
+    """
+    在给定事务中按组执行UNWIND写入，每组按 batch_size 切分
+    参数:
+        groups (list): [(结构占位符取值, 行列表)]
+    返回:
+        int: 写入的行数
+    """
+    written = 0
+    for schema, rows in groups:
+        for start in range(0, len(rows), batch_size):
+            written += executor.evaluate(query, schema=schema, tx=tx,
+                                         rows=rows[start:start + batch_size]) or 0
+    return written
+
+
+def _in_transaction(executor, work):
+    """
+    在一个事务中执行 work(tx)，失败时回滚
+    """
+    tx = executor.graph.begin()
+    try:
+        result = work(tx)
+        executor.graph.commit(tx)
+    except Exception:
+        executor.graph.rollback(tx)
+        raise
+    return result
+
+
+def _node_rows(items):
+    return _group_rows(({'label': item['label']}, {'name': name, 'props': item.get('props', {})})
+                       for name, item in items)
+
+
+def _relationship_rows(items):
+    return _group_rows(({'src_label': item['src_label'], 'dst_label': item['dst_label'], 'rel_type': item['type']},
+                        {'src': item['src'], 'dst': item['dst'], 'props': item.get('props', {})})
+                       for item in items)
+
+
+def _ensure_constraints(executor, state):
+    """
+    为导入涉及的标签创建唯一约束（模式变更不能与数据写入在同一事务中）
+    """
+    for label in sorted({item['label'] for item in state['nodes'].values()}):
+        executor.run('import_name_constraint', schema={'label': label})
+
+
+def _report(title, rows, executor, start_time, **counts):
+    elapsed = time.perf_counter() - start_time
+    round_trips = sum(stats['calls'] for stats in executor.stats().values())
+    stats = dict(counts, rows=rows, round_trips=round_trips, elapsed=elapsed,
+                 rows_per_sec=rows / elapsed if elapsed else 0.0)
+    details = ', '.join(f"{key}={value}" for key, value in counts.items())
+    print(f"{title}: {rows}行, {details}, {round_trips}次往返, "
+          f"耗时: {elapsed:.2f}秒, {stats['rows_per_sec']:.0f}行/秒")
+    return stats
+
+
+def is_transient_error(error):
+    """
+    判断是否为可重试的临时性错误（Neo4j错误码为 Neo.TransientError.*，如死锁、锁等待超时）
+    """
+    code = getattr(error, 'code', None) or ''
+    return '.TransientError.' in code or any(cls.__name__ == 'TransientError' for cls in type(error).__mro__)
+
+
+def node_bucket(label, name, buckets):
+    """节点所在的哈希桶（同一进程内外均稳定）"""
+    return zlib.crc32(f"{label}\0{name}".encode('utf-8')) % buckets
+
+
+def partition_batches(groups, partition_key, batch_size):
+    """
+    将分组后的写入行按分区切分为批次
+    同一分区的批次应由同一个工作线程依次写入，不同分区之间可以并行
+    参数:
+        groups (list): [(结构占位符取值, 行列表)]
+        partition_key (callable): 由 (结构占位符取值, 行) 得到分区键
+    返回:
+        list: [(分区键, 批次列表)]，按分区键排序，每个批次为 [(结构占位符取值, 行列表)]，不超过 batch_size 行
+    """
+    partitions = {}
+    for schema, rows in groups:
+        for row in rows:
+            partitions.setdefault(partition_key(schema, row), []).append((schema, row))
+
+    result = []
+    for key, items in sorted(partitions.items()):
+        batches = []
+        batch = []
+        size = 0
+        for schema, rows in _group_rows(items):
+            for start in range(0, len(rows), batch_size):
+                chunk = rows[start:start + batch_size]
+                if batch and size + len(chunk) > batch_size:
+                    batches.append(batch)
+                    batch = []
+                    size = 0
+                batch.append((schema, chunk))
+                size += len(chunk)
+        if batch:
+            batches.append(batch)
+        result.append((key, batches))
+    return result
+
+
+def relationship_rounds(groups, buckets, batch_size):
+    """
+    将关系划分为若干轮，同一轮内各分区之间不共享端点节点，可以并行写入而不争用节点锁
+    两端节点按哈希分桶，两端分别位于桶i、j的关系属于分区(i, j)；
+    第一轮为各桶内部的关系，之后按循环赛排程，每轮取互不相交的桶对
+    参数:
+        buckets (int): 哈希桶数（奇数时加一）
+    返回:
+        list: 轮次列表，每轮为分区列表，每个分区为批次列表
+    """
+    buckets += buckets % 2
+
+    def bucket_pair(schema, row):
+        src = node_bucket(schema['src_label'], row['src'], buckets)
+        dst = node_bucket(schema['dst_label'], row['dst'], buckets)
+        return min(src, dst), max(src, dst)
+
+    partitions = dict(partition_batches(groups, bucket_pair, batch_size))
+    rounds = [[(bucket, bucket) for bucket in range(buckets)]]
+    order = list(range(buckets))
+    for _ in range(buckets - 1):
+        rounds.append([tuple(sorted((order[i], order[-1 - i]))) for i in range(buckets // 2)])
+        order = [order[0], order[-1]] + order[1:-1]
+    return [[partitions[pair] for pair in pairs if pair in partitions] for pairs in rounds]
+
+
+def _write_batch_with_retry(executor, query, batch, batch_size, retries):
+    """
+    在独立事务中写入一个批次，遇到临时性错误时回滚并指数退避重试；
+    写入均为MERGE，重试不会产生重复数据
+    """
+    attempt = 0
+    while True:
+        try:
+            return _in_transaction(executor, lambda tx: _write_groups(executor, query, batch, batch_size, tx))
+        except Exception as e:
+            if attempt >= retries or not is_transient_error(e):
+                raise
+            delay = RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random())
+            attempt += 1
+            print(f"批次写入遇到临时性错误，{delay:.2f}秒后第{attempt}次重试: {e}")
+            time.sleep(delay)
+
+
+def _write_partition(executor, query, batches, batch_size, retries):
+    """依次写入一个分区的各批次"""
+    return sum(_write_batch_with_retry(executor, query, batch, batch_size, retries) for batch in batches)
+
+
+def parallel_write(executor, query, partitions, workers, batch_size=IMPORT_BATCH_SIZE, retries=IMPORT_RETRIES):
+    """
+    以工作线程池并行写入各分区，每个分区的批次由同一个工作线程依次写入；
+    返回写入的行数，所有分区完成后才返回
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_partition, executor, query, batches, batch_size, retries)
+                   for batches in partitions]
+        return sum(future.result() for future in futures)
+
+
+def bulk_import(rows, attribute_store, executor, batch_size=IMPORT_BATCH_SIZE, state_path=IMPORT_STATE_PATH,
+                workers=1, retries=IMPORT_RETRIES):
+    """
+    批量导入主数据
+    先在内存中汇总全部节点和关系，再按标签/关系类型分组，以UNWIND + MERGE分批写入，
+    往返次数与分组数成正比，与数据行数无关。
+    workers为1时节点一个事务、关系一个事务；大于1时节点按哈希桶划分为独立分区并行写入，
+    关系按两端节点的哈希桶分轮并行写入（同一轮内的分区不共享端点），全部节点写入完成后才开始写入关系
+    返回:
+        dict: 导入统计
+    """
+    start_time = time.perf_counter()
+    state = build_import_state(*plan_import(rows, attribute_store))
+    _ensure_constraints(executor, state)
+
+    node_groups = _node_rows(state['nodes'].items())
+    rel_groups = _relationship_rows(state['relationships'].values())
+    if workers > 1:
+        node_partitions = [batches for _, batches in partition_batches(
+            node_groups, lambda schema, row: node_bucket(schema['label'], row['name'], workers), batch_size)]
+        node_count = parallel_write(executor, 'import_merge_nodes', node_partitions, workers, batch_size, retries)
+        rel_count = sum(parallel_write(executor, 'import_merge_relationships', partitions, workers,
+                                       batch_size, retries)
+                        for partitions in relationship_rounds(rel_groups, workers * 2, batch_size))
+    else:
+        node_count = _in_transaction(executor, lambda tx: _write_groups(
+            executor, 'import_merge_nodes', node_groups, batch_size, tx))
+        rel_count = _in_transaction(executor, lambda tx: _write_groups(
+            executor, 'import_merge_relationships', rel_groups, batch_size, tx))
+    save_import_state(state, state_path)
+
+    return _report("批量导入完成", len(rows), executor, start_time,
+                   nodes=node_count, relationships=rel_count)
+
+
+def delta_import(rows, attribute_store, executor, batch_size=IMPORT_BATCH_SIZE, state_path=IMPORT_STATE_PATH):
+    """
+    增量导入主数据
+    与上次导入的状态比较内容哈希（节点哈希包含其属性文件中的属性），只写入新增、修改和删除的部分；
+    所有变更在一个事务中提交，导入期间图谱保持在线且始终为一致状态。
+    只有上次导入写入的属性才会被修改或删除，通过接口编辑的其他属性保持不变
+    返回:
+        dict: 导入统计
+    """
+    start_time = time.perf_counter()
+    previous = load_import_state(state_path)
+    current = build_import_state(*plan_import(rows, attribute_store))
+    delta = diff_import_state(previous, current)
+
+    if delta['nodes_upsert'] or delta['nodes_delete'] or delta['rels_upsert'] or delta['rels_delete']:
+        _ensure_constraints(executor, current)
+
+        def apply(tx):
+            # 先删除关系和节点，再写入节点，最后写入关系
+            _write_groups(executor, 'import_delete_relationships', _relationship_rows(delta['rels_delete']),
+                          batch_size, tx)
+            _write_groups(executor, 'import_delete_nodes',
+                          _node_rows((item['name'], item) for item in delta['nodes_delete']), batch_size, tx)
+            _write_groups(executor, 'import_merge_nodes',
+                          _node_rows((item['name'], item) for item in delta['nodes_upsert']), batch_size, tx)
+            _write_groups(executor, 'import_merge_relationships', _relationship_rows(delta['rels_upsert']),
+                          batch_size, tx)
+
+        _in_transaction(executor, apply)
+    save_import_state(current, state_path)
+
+    return _report("增量导入完成", len(rows), executor, start_time,
+                   added=delta['added'], changed=delta['changed'], removed=delta['removed'])
+
+
+def _write_csv(path, header, records):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(records)
+
+
+def export_admin_csv(rows, attribute_store, output_dir=ADMIN_CSV_DIR):
+    """
+    生成 neo4j-admin 离线导入所需的CSV文件
+    节点按标签分文件，同一标签下属性键不同的节点再分文件，避免缺失的属性被导入为空字符串；
+    节点以名称作为导入ID，关系文件包含 time、relation_type、relation 属性，
+    关系方向与 save_to_neo 相同（"演变类"关系为 关联实体 -> 实体名称）
+    返回:
+        list: neo4j-admin import 参数
+    """
+    start_time = time.perf_counter()
+    nodes, relationships = plan_import(rows, attribute_store)
+    os.makedirs(output_dir, exist_ok=True)
+    arguments = []
+
+    node_files = {}
+    for name, node in nodes.items():
+        keys = tuple(sorted(node['props']))
+        node_files.setdefault((node['label'], keys), []).append([name] + [node['props'][key] for key in keys])
+    for index, ((label, keys), records) in enumerate(sorted(node_files.items())):
+        path = os.path.join(output_dir, f"nodes_{index}.csv")
+        _write_csv(path, ['name:ID'] + list(keys), records)
+        arguments.append(f"--nodes={label}={path}")
+
+    rel_files = {}
+    for rel in relationships:
+        keys = tuple(key for key in ('time', 'relation_type', 'relation') if key in rel['props'])
+        rel_files.setdefault(keys, []).append([rel['src'], rel['dst'], rel['type']] +
+                                              [rel['props'][key] for key in keys])
+    for index, (keys, records) in enumerate(sorted(rel_files.items())):
+        path = os.path.join(output_dir, f"relationships_{index}.csv")
+        _write_csv(path, [':START_ID', ':END_ID', ':TYPE'] + list(keys), records)
+        arguments.append(f"--relationships={path}")
+
+    arguments.append('--multiline-fields=true')
+    elapsed = time.perf_counter() - start_time
+    print(f"neo4j-admin CSV已生成: {len(nodes)}个节点, {len(relationships)}个关系, "
+          f"{len(node_files) + len(rel_files)}个文件, 耗时: {elapsed:.2f}秒")
+    print("在停止的空数据库上执行: neo4j-admin database import full " + ' '.join(arguments))
+    return arguments
+
+
+def stream_import(path, attribute_store, executor, batch_size=IMPORT_BATCH_SIZE, progress_every=10000):
+    """
+    流式导入主数据（适用于无法一次载入内存的大规模数据）
+    增量读取JSON数组，经 规范化 -> 校验 -> 拆分关联实体 后按批写入：每批先MERGE本批新出现的节点，
+    再MERGE本批关系，每批一个事务。地名首次出现时的标签登记在磁盘上的登记表中，
+    内存占用只与批大小有关。写入均为MERGE，重复执行结果不变；不维护增量导入状态
+    返回:
+        dict: 导入统计
+    """
+    start_time = time.perf_counter()
+    stats = {}
+    progress = ProgressReporter("流式导入", every=progress_every)
+    registry = NameRegistry()
+    constrained_labels = set()
+    node_count = rel_count = 0
+
+    def counted(rows):
+        for row in rows:
+            progress.update()
+            yield row
+
+    try:
+        rows = split_targets(validate_rows(normalize_rows(counted(iter_json_array(path))), stats))
+        for batch in batched(rows, batch_size):
+            new_nodes = []
+            relationships = []
+            for row in batch:
+                rel = relationship_from_row(row)
+                for name_key, label_key in (('src', 'src_label'), ('dst', 'dst_label')):
+                    label, created = registry.register(rel[name_key], rel[label_key])
+                    rel[label_key] = label
+                    if created:
+                        attributes = attribute_store.get(rel[name_key], include_aliases=False)
+                        new_nodes.append((rel[name_key], {'label': label,
+                                                          'props': dict(attributes) if attributes else {}}))
+                relationships.append(rel)
+
+            for label in {item['label'] for _, item in new_nodes} - constrained_labels:
+                executor.run('import_name_constraint', schema={'label': label})
+                constrained_labels.add(label)
+
+            def write(tx):
+                nodes_written = _write_groups(executor, 'import_merge_nodes', _node_rows(new_nodes), batch_size, tx)
+                rels_written = _write_groups(executor, 'import_merge_relationships',
+                                             _relationship_rows(relationships), batch_size, tx)
+                return nodes_written, rels_written
+
+            nodes_written, rels_written = _in_transaction(executor, write)
+            registry.commit()
+            node_count += nodes_written
+            rel_count += rels_written
+    finally:
+        registry.close()
+
+    progress.report()
+    return _report("流式导入完成", progress.count, executor, start_time,
+                   invalid=stats.get('invalid', 0), nodes=node_count, relationships=rel_count)
+
+
+def peak_memory_kb():
+    """
+    当前进程的内存峰值（KB），平台不支持时返回None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以KB为单位
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
 def main():
-    # 清空数据库
-    graph.delete_all()
-    
-    # 读取属性数据
-    address_attributes = read_json_files("result")
-    
-    # 读取并处理主数据
-    with open('data/data.json', 'r', encoding='utf-8') as file:
-        data = json.load(file)
-        for item in data:
-            try:
-                save_to_neo(item, address_attributes)
-            except Exception as e:
-                print(f"处理数据时出错: {item}, 错误: {e}")
+    parser = argparse.ArgumentParser(description='导入地名知识图谱数据')
+    parser.add_argument('--mode', choices=['delta', 'bulk', 'legacy', 'csv', 'stream'], default='delta',
+                        help='delta: 增量导入（默认）；bulk: 清空后批量UNWIND/MERGE导入；legacy: 清空后逐条导入；'
+                             'csv: 生成neo4j-admin离线导入CSV；stream: 流式导入大规模数据')
+    parser.add_argument('--uri', default=DEFAULT_NEO4J_URI,
+                        help='Neo4j数据库地址')
+    parser.add_argument('--user', default=DEFAULT_NEO4J_USER,
+                        help='Neo4j用户名')
+    parser.add_argument('--password', default=DEFAULT_NEO4J_PASSWORD,
+                        help='Neo4j密码')
+    parser.add_argument('--input', default='data/data.json',
+                        help='主数据文件（JSON数组）')
+    parser.add_argument('--result-dir', default='result',
+                        help='地名属性文件目录')
+    parser.add_argument('--attributes-db', default=DEFAULT_DB_PATH,
+                        help='地名属性库路径')
+    parser.add_argument('--state-path', default=IMPORT_STATE_PATH,
+                        help='导入状态文件路径')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                        help='批量导入时每条语句包含的行数')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='bulk模式下并行写入的工作线程数')
+    parser.add_argument('--retries', type=int, default=IMPORT_RETRIES,
+                        help='并行写入时批次遇到临时性错误的重试次数')
+    parser.add_argument('--output-dir', default=ADMIN_CSV_DIR,
+                        help='csv模式下CSV文件的输出目录')
+    parser.add_argument('--stamp-path', default=DEFAULT_STAMP_PATH,
+                        help='图谱变更标记文件，写入图谱后更新，运行中的应用据此刷新缓存')
+    parser.add_argument('--stats-json', default=None,
+                        help='将导入统计（含内存峰值）写入该JSON文件')
+    args = parser.parse_args()
+
+    global graph
+    if args.mode != 'csv':
+        graph = Graph(args.uri, auth=(args.user, args.password))
+        print(f"导入目标数据库: {args.uri}")
+
+    start_time = time.perf_counter()
+    # 同步属性库（只重新解析有变化的属性文件）
+    attribute_store = AttributeStore(args.attributes_db)
+    attribute_store.sync(args.result_dir)
+
+    if args.mode == 'stream':
+        stats = stream_import(args.input, attribute_store, QueryExecutor(graph), batch_size=args.batch_size)
+    else:
+        # 读取主数据
+        with open(args.input, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+
+        if args.mode == 'csv':
+            files = export_admin_csv(data, attribute_store, args.output_dir)
+            stats = {'rows': len(data), 'files': len(files) - 1, 'round_trips': 0}
+        elif args.mode == 'delta':
+            stats = delta_import(data, attribute_store, QueryExecutor(graph), batch_size=args.batch_size,
+                                 state_path=args.state_path)
+        else:
+            # 全量重建：清空数据库
+            graph.delete_all()
+
+            if args.mode == 'bulk':
+                stats = bulk_import(data, attribute_store, QueryExecutor(graph), batch_size=args.batch_size,
+                                    state_path=args.state_path, workers=args.workers, retries=args.retries)
+            else:
+                # 逐条导入不维护导入状态，清除旧状态使下次增量导入重新比较全部数据
+                if os.path.exists(args.state_path):
+                    os.remove(args.state_path)
+                for item in data:
+                    try:
+                        save_to_neo(item, attribute_store)
+                    except Exception as e:
+                        print(f"处理数据时出错: {item}, 错误: {e}")
+                stats = {'rows': len(data)}
+
+    # 通知运行中的应用图谱已变化（csv模式只生成文件，无变化的增量导入未写入图谱）
+    if args.mode != 'csv' and (args.mode != 'delta' or stats['added'] or stats['changed'] or stats['removed']):
+        publish_graph_change(args.mode, args.stamp_path)
+
+    elapsed = time.perf_counter() - start_time
+    stats.update(mode=args.mode, total_elapsed=elapsed, peak_memory_kb=peak_memory_kb(),
+                 total_rows_per_sec=stats['rows'] / elapsed if elapsed else 0.0)
+    print(f"导入结束({args.mode}): {stats['rows']}行, 总耗时: {elapsed:.2f}秒, "
+          f"{stats['total_rows_per_sec']:.0f}行/秒, 内存峰值: {stats['peak_memory_kb']}KB")
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as file:
+            json.dump(stats, file, ensure_ascii=False, indent=2)
 
 
 if __name__ == '__main__':
@@ -3,6 +3,9 @@
 用于从文本中提取实体信息
 """
 
+from entity_extract.async_extractor import AsyncExtractor
+from entity_extract.extraction_cache import ExtractionCache
 from entity_extract.extractor import Extractor
+from entity_extract.place_dictionary import AhoCorasick, PlaceDictionary, load_dictionary_file
 
-__all__ = ['Extractor'] 
\ No newline at end of file
+__all__ = ['Extractor', 'AsyncExtractor', 'ExtractionCache', 'AhoCorasick', 'PlaceDictionary', 'load_dictionary_file'] 
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+异步实体提取器
+基于 ollama.AsyncClient，在常驻的后台事件循环上以协程并发调用大模型，
+所有请求共享同一个客户端及其连接池
+"""
+import asyncio
+import threading
+import time
+
+import ollama
+
+from entity_extract.document_chunker import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, chunk_text
+from entity_extract.extractor import (DEFAULT_BATCH_TIMEOUT, DEFAULT_BATCH_WORKERS, STRUCTURED_NUM_PREDICT,
+                                      Extractor)
+
+
+class BackgroundLoop:
+    """
+    后台事件循环
+    在常驻线程中运行一个事件循环，请求线程以 submit 提交协程（或以 run 提交并等待结果）；
+    ollama.AsyncClient 的连接池绑定在创建它的事件循环上，因此只在该循环上创建一个客户端供所有协程共享，
+    close 时以 aclose 关闭客户端并停止循环
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-llm-loop', daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def client(self):
+        """共享的 AsyncClient，只能在后台事件循环中使用"""
+        if asyncio.get_running_loop() is not self._loop:
+            raise RuntimeError("AsyncClient 只能在后台事件循环中使用，请通过 BackgroundLoop.run 提交协程")
+        if self._client is None:
+            self._client = ollama.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    def submit(self, coroutine):
+        """把协程提交到后台事件循环，立即返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_started())
+
+    def run(self, coroutine, timeout=None):
+        """在后台事件循环中执行协程，阻塞等待并返回结果"""
+        return self.submit(coroutine).result(timeout)
+
+    async def _aclose_client(self):
+        client, self._client = self._client, None
+        if client is None:
+            return
+        close = getattr(client, 'close', None)
+        if close is not None:
+            await close()
+        else:
+            await client._client.aclose()
+
+    def close(self):
+        """关闭共享客户端并停止后台事件循环"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._aclose_client(), loop).result(5)
+        except Exception as e:
+            print(f"关闭AsyncClient失败: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+
+class AsyncExtractor(Extractor):
+    """
+    异步地名实体提取器
+    词典匹配、提取缓存、提示词和响应解析与 Extractor 相同；继承的同步方法保持不变，
+    异步版本以 aextract_entities 等 a 前缀命名，须在 background_loop 上执行（通过 BackgroundLoop 提交）；
+    词典匹配（可能重建检索索引）和提取缓存读写是阻塞调用，放到线程池中执行，不阻塞共享的事件循环
+    """
+
+    def __init__(self, model_name="deepseek-r1:7b", place_dictionary=None, cache=None, request_timeout=None,
+                 structured=False, num_predict=STRUCTURED_NUM_PREDICT, background_loop=None):
+        super().__init__(model_name=model_name, place_dictionary=place_dictionary, cache=cache,
+                         request_timeout=request_timeout, structured=structured, num_predict=num_predict)
+        self.background_loop = background_loop or BackgroundLoop(request_timeout)
+
+    async def aextract_entities(self, text, use_llm=False):
+        """
+        从文本中提取所有地名实体（包括现代地名和历史地名）
+
+        Args:
+            text: 输入文本
+            use_llm: 为True时跳过词典匹配，直接使用大模型提取
+
+        Returns:
+            list: 提取的地名实体列表
+        """
+        if not text or len(text.strip()) == 0:
+            print("输入文本为空，无法提取实体")
+            return []
+
+        if self.place_dictionary is not None and not use_llm:
+            places = await asyncio.to_thread(self._extract_with_dictionary, text)
+            if places:
+                return places
+            print("词典未匹配到地名，调用大模型提取")
+
+        return await self._extract_with_llm_async(text)
+
+    async def aextract_entities_batch(self, texts, use_llm=False, max_workers=DEFAULT_BATCH_WORKERS,
+                                     timeout=DEFAULT_BATCH_TIMEOUT):
+        """
+        并发提取多条文本中的地名实体，以信号量限制同时进行的模型请求数
+        返回格式与 Extractor.extract_entities_batch 相同
+        """
+        start_time = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def extract_one(index, text):
+            item_start = time.perf_counter()
+            try:
+                entities = []
+                if text and text.strip():
+                    if self.place_dictionary is not None and not use_llm:
+                        entities = await asyncio.to_thread(self._extract_with_dictionary, text)
+                    if not entities:
+                        async with semaphore:
+                            entities = await asyncio.wait_for(
+                                self._extract_with_llm_async(text, raise_errors=True), timeout)
+                error = None
+            except Exception as e:
+                entities = []
+                error = f"{type(e).__name__}: {str(e)}"
+            return {
+                "index": index,
+                "entities": entities,
+                "error": error,
+                "elapsed": time.perf_counter() - item_start
+            }
+
+        results = await asyncio.gather(*(extract_one(index, text) for index, text in enumerate(texts)))
+
+        elapsed = time.perf_counter() - start_time
+        failed = sum(1 for item in results if item["error"])
+        stats = {
+            "items": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "elapsed": elapsed,
+            "items_per_second": len(results) / elapsed if elapsed else 0.0
+        }
+        print(f"批量地名实体提取完成，共 {stats['items']} 条，失败 {failed} 条，"
+              f"总耗时: {elapsed:.2f}秒，{stats['items_per_second']:.2f}条/秒")
+        return {"results": list(results), "stats": stats}
+
+    async def aextract_entities_long(self, text, use_llm=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                                    overlap=DEFAULT_CHUNK_OVERLAP, max_workers=DEFAULT_BATCH_WORKERS,
+                                    timeout=DEFAULT_BATCH_TIMEOUT):
+        """长文档地名实体提取，返回格式与 Extractor.extract_entities_long 相同"""
+        chunks = chunk_text(text or '', chunk_size, overlap)
+        print(f"长文档分块完成，文本长度: {len(text or '')} 字符，共 {len(chunks)} 块")
+        batch = await self.aextract_entities_batch([chunk for _, chunk in chunks], use_llm=use_llm,
+                                                  max_workers=max_workers, timeout=timeout)
+        return self._merge_document_result(chunks, batch)
+
+    async def _extract_with_llm_async(self, text, raise_errors=False):
+        """异步调用大模型提取地名实体"""
+        cached = await asyncio.to_thread(self._get_cached, text)
+        if cached is not None:
+            return cached
+
+        messages = self._build_messages(text)
+
+        try:
+            total_start_time = time.time()
+            print(f"异步调用 {self.model_name} 模型进行地名实体提取...")
+            response = await self.background_loop.client().chat(**self._chat_arguments(messages))
+            return await asyncio.to_thread(self._handle_response, text, response, total_start_time)
+
+        except Exception as e:
+            print(f"大模型实体提取失败: {type(e).__name__} - {str(e)}")
+            if raise_errors:
+                raise
+            return []
@@ -0,0 +1,80 @@
+"""
+长文档分块
+按句子边界把长文本切分为相互重叠的块，使每块都能放入模型上下文并可并发提取；
+合并各块结果时把实体位置换算回原文的字符偏移
+"""
+import re
+
+# 每块的最大字符数
+DEFAULT_CHUNK_SIZE = 1500
+# 相邻块重叠的最大字符数（按整句回退），避免跨块边界的地名被截断
+DEFAULT_CHUNK_OVERLAP = 100
+
+# 句子：以句末标点或换行结尾的最短片段
+_SENTENCE = re.compile(r'[^。！？；!?;\n]*(?:[。！？；!?;\n]+|$)')
+
+
+def split_sentences(text, max_chars=DEFAULT_CHUNK_SIZE):
+    """
+    按句子边界切分文本，超过max_chars的长句按max_chars硬切分
+    :return: (起始偏移, 句子) 列表
+    """
+    sentences = []
+    for match in _SENTENCE.finditer(text):
+        sentence = match.group()
+        if not sentence:
+            continue
+        for position in range(0, len(sentence), max_chars):
+            sentences.append((match.start() + position, sentence[position:position + max_chars]))
+    return sentences
+
+
+def chunk_text(text, max_chars=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_CHUNK_OVERLAP):
+    """
+    把文本切分为不超过max_chars的块，相邻块重叠不超过overlap个字符的整句
+    :return: (块在原文中的起始偏移, 块文本) 列表
+    """
+    sentences = split_sentences(text, max_chars)
+    chunks = []
+    index = 0
+    while index < len(sentences):
+        start = sentences[index][0]
+        end = index
+        while end < len(sentences) and (end == index or
+                                        sentences[end][0] + len(sentences[end][1]) - start <= max_chars):
+            end += 1
+        chunk_end = sentences[end - 1][0] + len(sentences[end - 1][1])
+        chunks.append((start, text[start:chunk_end]))
+        if end >= len(sentences):
+            break
+        # 下一块从本块末尾回退若干整句开始，且至少前进一句
+        next_index = end
+        while next_index - 1 > index and chunk_end - sentences[next_index - 1][0] <= overlap:
+            next_index -= 1
+        index = next_index
+    return chunks
+
+
+def merge_chunk_entities(chunks, chunk_entities):
+    """
+    合并各块提取的实体，去重并定位在原文中的字符偏移
+    重叠区域中的同一处地名只保留一次；模型返回的地名未在块文本中出现时偏移为空
+    :param chunks: chunk_text 的结果
+    :param chunk_entities: 与chunks一一对应的实体列表
+    :return: [{name, offsets: [[起始, 结束], ...]}]，按首次出现的位置排序
+    """
+    mentions = {}
+    for (offset, chunk), entities in zip(chunks, chunk_entities):
+        for entity in entities:
+            starts = mentions.setdefault(entity, set())
+            position = chunk.find(entity)
+            while position >= 0:
+                starts.add(offset + position)
+                position = chunk.find(entity, position + 1)
+
+    merged = [
+        {"name": name, "offsets": [[start, start + len(name)] for start in sorted(starts)]}
+        for name, starts in mentions.items()
+    ]
+    merged.sort(key=lambda item: (item["offsets"][0][0] if item["offsets"] else float('inf'), item["name"]))
+    return merged
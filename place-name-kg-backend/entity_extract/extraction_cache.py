@@ -0,0 +1,162 @@
+"""
+实体提取结果缓存
+两级缓存：进程内LRU + SQLite持久化存储，按 (规范化文本, 模型名称, 提示词版本) 缓存大模型提取结果，
+进程重启后仍然有效
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# 默认缓存文件路径
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'extraction_cache.db')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """规范化文本：全角半角统一、合并空白"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text or '')).strip()
+
+
+def cache_key(text, model_name, prompt_version):
+    """缓存键：规范化文本、模型名称和提示词版本的哈希"""
+    raw = json.dumps([normalize_text(text), model_name, prompt_version], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    """
+    两级提取结果缓存
+    内存层按条目数做LRU淘汰；持久层按最近访问时间淘汰超出上限的条目（条目数在启动时统计一次，之后增量维护）；
+    两层都按ttl过期。
+    每个条目记录原始提取耗时，命中时累计为节省的时间
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_memory_entries=1024, max_disk_entries=100000,
+                 ttl=7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._time_saved = 0.0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    key TEXT PRIMARY KEY,
+                    entities TEXT NOT NULL,
+                    cost REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extraction_cache_accessed "
+                               "ON extraction_cache (accessed_at)")
+            self._conn.commit()
+            self._disk_entries = self._conn.execute("SELECT count(*) FROM extraction_cache").fetchone()[0]
+
+    def get(self, text, model_name, prompt_version):
+        """
+        读取缓存
+        :return: (是否命中, 实体列表)
+        """
+        key = cache_key(text, model_name, prompt_version)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                entities, cost, created_at = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self._memory_hits += 1
+                    self._time_saved += cost
+                    return True, list(entities)
+                del self._memory[key]
+
+            row = self._conn.execute("SELECT entities, cost, created_at FROM extraction_cache WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is not None:
+                if now - row[2] < self.ttl:
+                    entities = json.loads(row[0])
+                    self._conn.execute("UPDATE extraction_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+                    self._remember(key, (entities, row[1], row[2]))
+                    self._disk_hits += 1
+                    self._time_saved += row[1]
+                    return True, list(entities)
+                self._disk_entries -= self._conn.execute("DELETE FROM extraction_cache WHERE key = ?",
+                                                         (key,)).rowcount
+                self._conn.commit()
+
+            self._misses += 1
+            return False, None
+
+    def put(self, text, model_name, prompt_version, entities, cost=0.0):
+        """
+        写入缓存
+        :param cost: 本次提取的耗时（秒），命中时计入节省的时间
+        """
+        key = cache_key(text, model_name, prompt_version)
+        now = time.time()
+        with self._lock:
+            self._remember(key, (list(entities), cost, now))
+            exists = self._conn.execute("SELECT 1 FROM extraction_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO extraction_cache (key, entities, cost, created_at, accessed_at) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               (key, json.dumps(list(entities), ensure_ascii=False), cost, now, now))
+            if exists is None:
+                self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                self._disk_entries -= self._conn.execute("""
+                    DELETE FROM extraction_cache WHERE key IN (
+                        SELECT key FROM extraction_cache ORDER BY accessed_at LIMIT ?
+                    )
+                """, (self._disk_entries - self.max_disk_entries,)).rowcount
+            self._conn.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """清空两级缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM extraction_cache")
+            self._conn.commit()
+            self._disk_entries = 0
+
+    def stats(self):
+        """命中率、节省时间及容量统计"""
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            hits = self._memory_hits + self._disk_hits
+            return {
+                'memory_hits': self._memory_hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'time_saved': self._time_saved,
+                'memory_entries': len(self._memory),
+                'disk_entries': self._disk_entries,
+                'max_memory_entries': self.max_memory_entries,
+                'max_disk_entries': self.max_disk_entries,
+                'ttl': self.ttl
+            }
@@ -6,24 +6,81 @@ import os
 import json
 import ollama
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from entity_extract.document_chunker import (DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, chunk_text,
+                                             merge_chunk_entities)
+
+# 提示词版本，修改提示词或解析逻辑时递增，使旧的缓存结果失效
+PROMPT_VERSION = 1
+
+# 批量提取的默认并发数（Ollama服务端需设置 OLLAMA_NUM_PARALLEL 才能真正并行生成）
+DEFAULT_BATCH_WORKERS = 4
+# 批量提取单条文本的默认超时（秒）
+DEFAULT_BATCH_TIMEOUT = 120
+# 单次批量提取的最大文本数
+MAX_BATCH_TEXTS = 1000
+
+# 结构化输出模式：要求模型输出符合该JSON Schema的结果
+ENTITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "entities": {
+            "type": "array",
+            "items": {"type": "string"}
+        }
+    },
+    "required": ["entities"]
+}
+# 结构化输出模式下单次生成的最大token数
+STRUCTURED_NUM_PREDICT = 512
 
 class Extractor:
     """
     基于大模型的地名实体提取器
-    使用Ollama提供的大模型能力和deepseek-r1模型提取所有地名实体
+    使用Ollama提供的大模型能力和deepseek-r1模型提取所有地名实体；
+    配置了地名词典时先以词典自动机匹配，词典未匹配到地名时才调用大模型；
+    配置了提取缓存时，相同文本的大模型提取结果直接从缓存返回；
+    结构化输出模式下关闭模型的思考过程，按JSON Schema约束输出并限制生成长度，响应一步解析
     """
     
-    def __init__(self, model_name="deepseek-r1:7b"):
-        """初始化提取器"""
+    def __init__(self, model_name="deepseek-r1:7b", place_dictionary=None, cache=None, request_timeout=None,
+                 structured=False, num_predict=STRUCTURED_NUM_PREDICT):
+        """
+        初始化提取器
+        
+        Args:
+            model_name: 大模型名称
+            place_dictionary: 地名词典（PlaceDictionary），为None时总是调用大模型
+            cache: 提取结果缓存（ExtractionCache），为None时不缓存
+            request_timeout: 大模型请求超时（秒），为None时不限制
+            structured: 是否使用结构化输出模式（建议配合较小的非推理模型）
+            num_predict: 结构化输出模式下单次生成的最大token数
+        """
         self.model_name = model_name
-        print(f"已初始化大模型地名实体提取器，使用模型: {model_name}")
+        self.place_dictionary = place_dictionary
+        self.cache = cache
+        self.request_timeout = request_timeout
+        self.structured = structured
+        self.num_predict = num_predict
+        self.client = ollama.Client(timeout=request_timeout)
+        print(f"已初始化大模型地名实体提取器，使用模型: {model_name}，"
+              f"词典匹配: {'启用' if place_dictionary is not None else '未启用'}，"
+              f"结果缓存: {'启用' if cache is not None else '未启用'}，"
+              f"结构化输出: {'启用' if structured else '未启用'}")
+    
+    @property
+    def prompt_version(self):
+        """提取缓存使用的提示词版本，两种输出模式的结果分开缓存"""
+        return f"{PROMPT_VERSION}-structured" if self.structured else PROMPT_VERSION
     
-    def extract_entities(self, text):
+    def extract_entities(self, text, use_llm=False):
         """
         从文本中提取所有地名实体（包括现代地名和历史地名）
         
         Args:
             text: 输入文本
+            use_llm: 为True时跳过词典匹配，直接使用大模型提取
             
         Returns:
             list: 提取的地名实体列表
@@ -32,88 +89,173 @@ class Extractor:
             print("输入文本为空，无法提取实体")
             return []
         
-        # 记录文本的开头部分作为示例
-        text_preview = text[:100] + "..." if len(text) > 100 else text
-        print(f"准备提取文本中的地名实体，文本长度: {len(text)} 字符，文本开头: '{text_preview}'")
+        if self.place_dictionary is not None and not use_llm:
+            places = self._extract_with_dictionary(text)
+            if places:
+                return places
+            print("词典未匹配到地名，调用大模型提取")
         
-        # 构建提示词
-        prompt = self._build_prompt(text)
+        return self._extract_with_llm(text)
+    
+    def extract_entities_batch(self, texts, use_llm=False, max_workers=DEFAULT_BATCH_WORKERS,
+                               timeout=DEFAULT_BATCH_TIMEOUT):
+        """
+        并发提取多条文本中的地名实体
+        词典命中的文本不调用大模型；其余文本以最多max_workers个并发请求发往Ollama服务。
+        有空闲并发名额时才提交下一条文本，单条文本从提交起超过timeout秒仍未完成即记为超时失败，
+        不再等待其结果，也不影响其他文本
+        
+        Args:
+            texts: 文本列表
+            use_llm: 为True时跳过词典匹配，直接使用大模型提取
+            max_workers: 最大并发请求数
+            timeout: 单条文本的截止时间（秒，从提交起计算）
+            
+        Returns:
+            dict: results 为与输入顺序一致的 {index, entities, error, elapsed} 列表，
+                  stats 为成功/失败数量、总耗时和吞吐量
+        """
+        start_time = time.perf_counter()
+        client = ollama.Client(timeout=timeout)
+        
+        def extract_one(index, text):
+            item_start = time.perf_counter()
+            try:
+                entities = []
+                if text and text.strip():
+                    if self.place_dictionary is not None and not use_llm:
+                        entities = self._extract_with_dictionary(text)
+                    if not entities:
+                        entities = self._extract_with_llm(text, client=client, raise_errors=True)
+                error = None
+            except Exception as e:
+                entities = []
+                error = f"{type(e).__name__}: {str(e)}"
+            return {
+                "index": index,
+                "entities": entities,
+                "error": error,
+                "elapsed": time.perf_counter() - item_start
+            }
+        
+        workers = max(1, max_workers)
+        results = [None] * len(texts)
+        pending = list(enumerate(texts))[::-1]
+        # 进行中的任务：Future -> (文本序号, 截止时间)
+        running = {}
+        # 超时的请求仍在后台线程中运行直到HTTP超时，线程池留出余量，避免新任务排队
+        pool = ThreadPoolExecutor(max_workers=workers * 2)
+        try:
+            while pending or running:
+                while pending and len(running) < workers:
+                    index, text = pending.pop()
+                    running[pool.submit(extract_one, index, text)] = (index, time.perf_counter() + timeout)
+                nearest = min(deadline for _, deadline in running.values())
+                done, _ = wait(running, timeout=max(0.0, nearest - time.perf_counter()),
+                               return_when=FIRST_COMPLETED)
+                now = time.perf_counter()
+                for future, (index, deadline) in list(running.items()):
+                    if future in done:
+                        results[index] = future.result()
+                    elif now >= deadline:
+                        results[index] = {
+                            "index": index,
+                            "entities": [],
+                            "error": f"TimeoutError: 超过{timeout}秒未完成",
+                            "elapsed": timeout
+                        }
+                    else:
+                        continue
+                    del running[future]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        elapsed = time.perf_counter() - start_time
+        failed = sum(1 for item in results if item["error"])
+        stats = {
+            "items": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "elapsed": elapsed,
+            "items_per_second": len(results) / elapsed if elapsed else 0.0
+        }
+        print(f"批量地名实体提取完成，共 {stats['items']} 条，失败 {failed} 条，"
+              f"总耗时: {elapsed:.2f}秒，{stats['items_per_second']:.2f}条/秒")
+        return {"results": results, "stats": stats}
+    
+    def extract_entities_long(self, text, use_llm=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                              overlap=DEFAULT_CHUNK_OVERLAP, max_workers=DEFAULT_BATCH_WORKERS,
+                              timeout=DEFAULT_BATCH_TIMEOUT):
+        """
+        长文档地名实体提取
+        按句子边界把文本切分为相互重叠的块并发提取，提取耗时取决于最慢的一块而不是文档长度
+        
+        Args:
+            text: 输入文本
+            use_llm: 为True时跳过词典匹配，直接使用大模型提取
+            chunk_size: 每块的最大字符数
+            overlap: 相邻块重叠的最大字符数
+            max_workers: 最大并发请求数
+            timeout: 单块的截止时间（秒，从提交起计算）
+            
+        Returns:
+            dict: entities 为去重后的 {name, offsets} 列表（偏移为原文字符位置），
+                  chunks 为各块的起止偏移及错误信息，stats 为批量提取统计
+        """
+        chunks = chunk_text(text or '', chunk_size, overlap)
+        print(f"长文档分块完成，文本长度: {len(text or '')} 字符，共 {len(chunks)} 块")
+        batch = self.extract_entities_batch([chunk for _, chunk in chunks], use_llm=use_llm,
+                                            max_workers=max_workers, timeout=timeout)
+        return self._merge_document_result(chunks, batch)
+    
+    def _merge_document_result(self, chunks, batch):
+        """合并各块的批量提取结果"""
+        results = batch["results"]
+        return {
+            "entities": merge_chunk_entities(chunks, [item["entities"] for item in results]),
+            "chunks": [
+                {"start": offset, "end": offset + len(chunk), "error": item["error"]}
+                for (offset, chunk), item in zip(chunks, results)
+            ],
+            "stats": batch["stats"]
+        }
+    
+    def _extract_with_dictionary(self, text):
+        """以地名词典自动机进行最左最长匹配"""
+        try:
+            start_time = time.perf_counter()
+            places = [place for place in self.place_dictionary.match(text) if not self._should_filter(place)]
+            match_time = time.perf_counter() - start_time
+            if places:
+                print(f"词典匹配到 {len(places)} 个地名，耗时: {match_time * 1e6:.0f}微秒，地名: {', '.join(places[:5])}")
+            return places
+        except Exception as e:
+            print(f"地名词典匹配失败: {str(e)}")
+            return []
+    
+    def _extract_with_llm(self, text, client=None, raise_errors=False):
+        """
+        调用大模型提取地名实体
+        
+        Args:
+            client: 使用的Ollama客户端，为None时使用提取器自身的客户端
+            raise_errors: 为True时调用失败抛出异常，否则返回空列表
+        """
+        cached = self._get_cached(text)
+        if cached is not None:
+            return cached
+        
+        messages = self._build_messages(text)
         
         try:
             # 记录总体开始时间
             total_start_time = time.time()
             
-            # 记录模型调用开始时间
-            model_start_time = time.time()
             print(f"调用 {self.model_name} 模型进行地名实体提取...")
             # 调用大模型进行实体提取
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一个专业的地名识别专家。你的任务是从文本中准确识别出所有地名实体，"
-                                   "包括现代和历史地名、国内和国外地名、行政区划、自然地理实体等。请返回所有可能的地名，"
-                                   "不要遗漏任何地名。返回的地名实体应当是具体的地点名称，而不是泛指的地理概念。"
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                stream=False
-            )
-            
-            # 记录模型调用耗时
-            model_time = time.time() - model_start_time
-            print(f"模型响应成功，耗时: {model_time:.2f}秒，"
-                  f"响应长度: {len(response['message']['content'])} 字符，开始解析实体...")
-            
-            # 记录解析开始时间
-            parse_start_time = time.time()
-            
-            # 从响应中解析实体
-            extracted_entities = self._parse_entities_from_response(response['message']['content'])
-            
-            # 记录解析耗时
-            parse_time = time.time() - parse_start_time
-            
-            # 如果解析到了实体，记录一些示例
-            if extracted_entities:
-                entity_examples = ', '.join(extracted_entities[:5])
-                entity_examples += "..." if len(extracted_entities) > 5 else ""
-                print(f"解析得到 {len(extracted_entities)} 个初步实体，解析耗时: {parse_time:.2f}秒，示例: {entity_examples}")
-            else:
-                print(f"解析完成但未找到任何实体，解析耗时: {parse_time:.2f}秒，请检查文本内容或模型响应")
-            
-            # 记录后处理开始时间
-            postprocess_start_time = time.time()
-            
-            # 过滤和排序结果
-            result = self._post_process_entities(extracted_entities)
-            
-            # 记录后处理耗时
-            postprocess_time = time.time() - postprocess_start_time
+            response = (client or self.client).chat(**self._chat_arguments(messages))
             
-            # 计算总体耗时
-            total_time = time.time() - total_start_time
-            
-            # 记录详细的性能统计
-            print(f"地名实体提取完成，总耗时: {total_time:.2f}秒")
-            print(f"性能指标 - 模型调用: {model_time:.2f}秒 ({model_time/total_time:.1%}), 解析: {parse_time:.2f}秒 ({parse_time/total_time:.1%}), 后处理: {postprocess_time:.2f}秒 ({postprocess_time/total_time:.1%})")
-            
-            # 记录结果统计信息
-            if result:
-                result_examples = ', '.join(result[:5])
-                result_examples += "..." if len(result) > 5 else ""
-                avg_entity_length = sum(len(entity) for entity in result) / max(1, len(result))
-                print(f"实体统计 - 初始解析: {len(extracted_entities)}个, 最终有效: {len(result)}个, 过滤率: {(1 - len(result)/max(1, len(extracted_entities))):.2%}")
-                print(f"实体质量 - 平均长度: {avg_entity_length:.1f}字符, 最终实体示例: {result_examples}")
-                print(f"提取比率 - 每千字符实体数: {(len(result) * 1000 / max(1, len(text))):.2f}")
-            else:
-                print(f"警告: 后处理后没有剩余有效实体，请检查过滤条件或原始提取结果")
-            
-            return result
+            return self._handle_response(text, response, total_start_time)
             
         except Exception as e:
             error_type = type(e).__name__
@@ -121,9 +263,121 @@ class Extractor:
             print(f"大模型实体提取失败: {error_type} - {error_details}")
             import traceback
             print(f"错误追踪: {traceback.format_exc()}")
+            if raise_errors:
+                raise
             # 如果大模型调用失败，返回空列表
             return []
     
+    def _get_cached(self, text):
+        """读取提取缓存，未命中时返回None"""
+        if self.cache is None:
+            return None
+        hit, cached = self.cache.get(text, self.model_name, self.prompt_version)
+        if hit:
+            print(f"提取缓存命中，返回 {len(cached)} 个地名")
+            return cached
+        return None
+    
+    def _chat_arguments(self, messages):
+        """大模型调用参数；结构化输出模式下约束输出格式、关闭思考过程并限制生成长度"""
+        arguments = {
+            "model": self.model_name,
+            "messages": messages,
+            "stream": False
+        }
+        if self.structured:
+            arguments.update({
+                "format": ENTITY_SCHEMA,
+                "think": False,
+                "options": {"temperature": 0, "num_predict": self.num_predict}
+            })
+        return arguments
+    
+    def _build_messages(self, text):
+        """构建发送给大模型的对话消息"""
+        # 记录文本的开头部分作为示例
+        text_preview = text[:100] + "..." if len(text) > 100 else text
+        print(f"准备提取文本中的地名实体，文本长度: {len(text)} 字符，文本开头: '{text_preview}'")
+        
+        # 构建提示词
+        prompt = self._build_prompt(text)
+        
+        return [
+            {
+                "role": "system",
+                "content": "你是一个专业的地名识别专家。你的任务是从文本中准确识别出所有地名实体，"
+                           "包括现代和历史地名、国内和国外地名、行政区划、自然地理实体等。请返回所有可能的地名，"
+                           "不要遗漏任何地名。返回的地名实体应当是具体的地点名称，而不是泛指的地理概念。"
+            },
+            {
+                "role": "user", 
+                "content": prompt
+            }
+        ]
+    
+    def _handle_response(self, text, response, total_start_time):
+        """解析并后处理模型响应，记录性能统计，成功的结果写入提取缓存"""
+        # 记录模型调用耗时
+        model_time = time.time() - total_start_time
+        print(f"模型响应成功，耗时: {model_time:.2f}秒，"
+              f"响应长度: {len(response['message']['content'])} 字符，开始解析实体...")
+        
+        # 记录解析开始时间
+        parse_start_time = time.time()
+        
+        # 从响应中解析实体
+        if self.structured:
+            extracted_entities = self._parse_structured_response(response['message']['content'])
+        else:
+            extracted_entities = self._parse_entities_from_response(response['message']['content'])
+        
+        # 记录解析耗时
+        parse_time = time.time() - parse_start_time
+        
+        # 如果解析到了实体，记录一些示例
+        if extracted_entities:
+            entity_examples = ', '.join(extracted_entities[:5])
+            entity_examples += "..." if len(extracted_entities) > 5 else ""
+            print(f"解析得到 {len(extracted_entities)} 个初步实体，解析耗时: {parse_time:.2f}秒，示例: {entity_examples}")
+        else:
+            print(f"解析完成但未找到任何实体，解析耗时: {parse_time:.2f}秒，请检查文本内容或模型响应")
+        
+        # 记录后处理开始时间
+        postprocess_start_time = time.time()
+        
+        # 过滤和排序结果
+        result = self._post_process_entities(extracted_entities)
+        
+        # 记录后处理耗时
+        postprocess_time = time.time() - postprocess_start_time
+        
+        # 计算总体耗时
+        total_time = time.time() - total_start_time
+        
+        # 记录详细的性能统计
+        print(f"地名实体提取完成，总耗时: {total_time:.2f}秒")
+        print(f"性能指标 - 模型调用: {model_time:.2f}秒 ({model_time/total_time:.1%}), 解析: {parse_time:.2f}秒 ({parse_time/total_time:.1%}), 后处理: {postprocess_time:.2f}秒 ({postprocess_time/total_time:.1%})")
+        
+        # 记录结果统计信息
+        if result:
+            result_examples = ', '.join(result[:5])
+            result_examples += "..." if len(result) > 5 else ""
+            avg_entity_length = sum(len(entity) for entity in result) / max(1, len(result))
+            print(f"实体统计 - 初始解析: {len(extracted_entities)}个, 最终有效: {len(result)}个, 过滤率: {(1 - len(result)/max(1, len(extracted_entities))):.2%}")
+            print(f"实体质量 - 平均长度: {avg_entity_length:.1f}字符, 最终实体示例: {result_examples}")
+            print(f"提取比率 - 每千字符实体数: {(len(result) * 1000 / max(1, len(text))):.2f}")
+        else:
+            print(f"警告: 后处理后没有剩余有效实体，请检查过滤条件或原始提取结果")
+        
+        # 只缓存成功的提取结果：输出被截断（如达到num_predict）或结果为空（可能是无法解析的输出）时不缓存，下次重新提取
+        truncated = response.get('done_reason') == 'length'
+        if truncated:
+            print("警告: 模型输出达到长度上限被截断，结果不写入缓存")
+        if self.cache is not None and result and not truncated:
+            self.cache.put(text, self.model_name, self.prompt_version, result, total_time)
+        
+        return result
+    
     def _build_prompt(self, text):
         """构建提示词，引导模型提取所有地名实体"""
         prompt = f"""请从以下文本中识别并提取所有地名实体:
@@ -200,6 +454,16 @@ class Extractor:
             print(f"原始响应: {response_text}")
             return []
     
+    def _parse_structured_response(self, response_text):
+        """解析结构化输出模式的响应（符合ENTITY_SCHEMA的JSON），格式不符时退回通用解析"""
+        try:
+            entities = json.loads(response_text)['entities']
+            if isinstance(entities, list):
+                return [entity.strip() for entity in entities if isinstance(entity, str) and entity.strip()]
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"结构化响应解析失败: {str(e)}")
+        return self._parse_entities_from_response(response_text)
+    
     def _post_process_entities(self, entities):
         """对提取的实体进行后处理，包括去重、过滤和排序"""
         if not entities:
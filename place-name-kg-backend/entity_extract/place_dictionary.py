@@ -0,0 +1,165 @@
+"""
+地名词典匹配
+以图谱节点名称、别名和历史地名词典构建Aho-Corasick自动机，一次扫描文本即可找出所有词典地名
+"""
+import os
+import threading
+
+# 词典匹配的最短地名长度
+MIN_PLACE_LENGTH = 2
+
+
+class AhoCorasick:
+    """
+    多模式匹配自动机
+    节点以整数下标表示，goto为每个节点的 {字符: 子节点}；
+    outputs[i] 为以节点i结尾的所有模式长度（已合并失败链上的输出）
+    """
+
+    def __init__(self, words=()):
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [()]
+        self._size = 0
+        for word in words:
+            self.add(word)
+        self.build()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, word):
+        """添加模式（需在build之前调用）"""
+        if not word:
+            return
+        node = 0
+        for char in word:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(())
+            node = child
+        if len(word) not in self._outputs[node]:
+            self._outputs[node] = self._outputs[node] + (len(word),)
+            self._size += 1
+
+    def build(self):
+        """按广度优先计算失败指针并合并输出"""
+        queue = list(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+        position = 0
+        while position < len(queue):
+            node = queue[position]
+            position += 1
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                inherited = self._outputs[self._fail[child]]
+                if inherited:
+                    self._outputs[child] = tuple(sorted(set(self._outputs[child] + inherited), reverse=True))
+                queue.append(child)
+
+    def iter_matches(self, text):
+        """产出所有匹配 (起始位置, 长度)，可能重叠"""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length in self._outputs[node]:
+                yield index - length + 1, length
+
+    def longest_matches(self, text):
+        """
+        最左最长匹配：从左到右选取互不重叠的匹配，同一起点取最长
+        :return: (起始位置, 长度) 列表
+        """
+        matches = sorted(self.iter_matches(text), key=lambda item: (item[0], -item[1]))
+        result = []
+        end = 0
+        for start, length in matches:
+            if start >= end:
+                result.append((start, length))
+                end = start + length
+        return result
+
+
+def load_dictionary_file(path):
+    """
+    读取jieba格式的历史地名词典（词语 频率 词性），只保留词性为ns的地名；
+    以“、”连接的多个地名拆分为单独的词
+    """
+    words = []
+    if not os.path.exists(path):
+        return words
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            parts = line.split()
+            if not parts or (len(parts) >= 3 and parts[-1] != 'ns'):
+                continue
+            words.extend(word for word in parts[0].split('、') if word)
+    return words
+
+
+class PlaceDictionary:
+    """
+    可刷新的地名词典
+    loader 返回地名可迭代对象，version_getter 返回数据版本号（如图谱版本），
+    版本号变化后在下次匹配时重新构建自动机；exclude 中的词（如朝代名）不是地名，不加入自动机，
+    文本中只出现这些词时词典匹配为空，由调用方回退到大模型提取
+    """
+
+    def __init__(self, loader, version_getter=None, min_length=MIN_PLACE_LENGTH, exclude=()):
+        self.loader = loader
+        self.version_getter = version_getter
+        self.min_length = min_length
+        self.exclude = frozenset(exclude)
+        self._automaton = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        return self.version_getter() if self.version_getter else None
+
+    def _get_automaton(self):
+        version = self._current_version()
+        automaton = self._automaton
+        if automaton is not None and self._version == version:
+            return automaton
+        with self._lock:
+            if self._automaton is None or self._version != version:
+                words = {word.strip() for word in self.loader() if word and len(word.strip()) >= self.min_length}
+                words -= self.exclude
+                self._automaton = AhoCorasick(sorted(words))
+                self._version = version
+                print(f"地名词典自动机构建完成，共 {len(self._automaton)} 个地名")
+            return self._automaton
+
+    def refresh(self):
+        """强制在下次匹配时重新构建"""
+        with self._lock:
+            self._automaton = None
+
+    def __len__(self):
+        return len(self._get_automaton())
+
+    def match(self, text):
+        """
+        找出文本中的词典地名（最左最长匹配，按出现顺序去重）
+        :return: 地名列表
+        """
+        if not text:
+            return []
+        automaton = self._get_automaton()
+        places = []
+        for start, length in automaton.longest_matches(text):
+            place = text[start:start + length]
+            if place not in places:
+                places.append(place)
+        return places
@@ -0,0 +1,270 @@
+"""
+图谱内存快照
+启动时从Neo4j加载全量节点和关系，在进程内以紧凑数组结构提供只读查询；
+Neo4j仍是唯一的数据源，图谱写入后快照重新加载
+"""
+import time
+from array import array
+
+from record_converter import LineRecord, NodeRecord
+
+
+class GraphSnapshot:
+    """
+    只读图谱快照
+    节点ID和关系类型均被内部化为连续的整数下标；邻接关系以CSR格式存储：
+    adj_offsets[i]..adj_offsets[i+1] 为节点i在 adj_edges 中的关系下标区间（出向和入向均包含）
+    """
+
+    def __init__(self):
+        # 节点：下标 -> Neo4j节点ID / 标签列表 / 属性
+        self.node_ids = array('q')
+        self.node_labels = []
+        self.node_props = []
+        # Neo4j节点ID -> 下标
+        self.node_index = {}
+        # 标签 -> [节点下标]
+        self.label_nodes = {}
+
+        # 关系：下标 -> 起点下标 / 终点下标 / 类型下标 / 属性
+        self.edge_src = array('i')
+        self.edge_dst = array('i')
+        self.edge_types = array('i')
+        self.edge_props = []
+        # 关系类型名称表及反向索引，类型下标 -> [关系下标]
+        self.rel_type_names = []
+        self._rel_type_index = {}
+        self.type_edges = {}
+
+        # CSR邻接表
+        self.adj_offsets = array('i', [0])
+        self.adj_edges = array('i')
+
+        self.version = None
+        self.loaded_at = 0.0
+        self.load_time = 0.0
+
+    @classmethod
+    def load(cls, executor, version=None):
+        """从Neo4j加载快照"""
+        start_time = time.perf_counter()
+        snapshot = cls()
+        for record in executor.run('export_nodes'):
+            snapshot._add_node(record['id'], record['labels'] or [], dict(record['props']))
+        for record in executor.run('export_relationships'):
+            snapshot._add_edge(record['from_id'], record['to_id'], record['type'], dict(record['props']))
+        snapshot._build_adjacency()
+        snapshot.version = version
+        snapshot.loaded_at = time.time()
+        snapshot.load_time = time.perf_counter() - start_time
+        print(f"图谱快照加载完成: {len(snapshot.node_ids)}个节点, {len(snapshot.edge_src)}个关系, "
+              f"耗时: {snapshot.load_time:.3f}秒")
+        return snapshot
+
+    def _add_node(self, node_id, labels, props):
+        index = len(self.node_ids)
+        self.node_ids.append(node_id)
+        self.node_labels.append(labels)
+        self.node_props.append(props)
+        self.node_index[node_id] = index
+        for label in labels:
+            self.label_nodes.setdefault(label, []).append(index)
+
+    def _add_edge(self, from_id, to_id, rel_type, props):
+        src = self.node_index.get(from_id)
+        dst = self.node_index.get(to_id)
+        if src is None or dst is None:
+            # 加载期间新增的节点不在快照中，忽略其关系
+            return
+        type_index = self._rel_type_index.get(rel_type)
+        if type_index is None:
+            type_index = self._rel_type_index[rel_type] = len(self.rel_type_names)
+            self.rel_type_names.append(rel_type)
+        edge = len(self.edge_src)
+        self.edge_src.append(src)
+        self.edge_dst.append(dst)
+        self.edge_types.append(type_index)
+        self.edge_props.append(props)
+        self.type_edges.setdefault(type_index, []).append(edge)
+
+    def _build_adjacency(self):
+        node_count = len(self.node_ids)
+        degrees = [0] * node_count
+        for src, dst in zip(self.edge_src, self.edge_dst):
+            degrees[src] += 1
+            if dst != src:
+                degrees[dst] += 1
+
+        offsets = array('i', [0] * (node_count + 1))
+        for i in range(node_count):
+            offsets[i + 1] = offsets[i] + degrees[i]
+
+        positions = array('i', offsets[:node_count])
+        adj_edges = array('i', [0] * offsets[node_count])
+        for edge, (src, dst) in enumerate(zip(self.edge_src, self.edge_dst)):
+            adj_edges[positions[src]] = edge
+            positions[src] += 1
+            if dst != src:
+                adj_edges[positions[dst]] = edge
+                positions[dst] += 1
+
+        self.adj_offsets = offsets
+        self.adj_edges = adj_edges
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def stats(self):
+        """快照规模和加载信息"""
+        return {
+            'nodes': len(self.node_ids),
+            'relationships': len(self.edge_src),
+            'node_types': len(self.label_nodes),
+            'relationship_types': len(self.rel_type_names),
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'load_time': self.load_time
+        }
+
+    # ---------- 数据转换 ----------
+
+    def _node_record(self, index):
+        return NodeRecord.from_values(self.node_ids[index], self.node_labels[index], self.node_props[index])
+
+    def node_record(self, node_id):
+        """按节点ID获取节点记录，不存在时返回None"""
+        index = self.node_index.get(node_id)
+        return self._node_record(index) if index is not None else None
+
+    def node_data(self, index, full=False, fields=None):
+        """节点下标转换为接口返回的节点数据，full为False时只包含 id/name/type"""
+        record = self._node_record(index)
+        return record.to_dict(fields) if full else record.brief()
+
+    def line_data(self, edge, fields=None):
+        """关系下标转换为接口返回的关系数据"""
+        return LineRecord(self.node_ids[self.edge_src[edge]], self.node_ids[self.edge_dst[edge]],
+                          self.rel_type_names[self.edge_types[edge]], self.edge_props[edge]).to_dict(fields)
+
+    def neighbors(self, index):
+        """节点的 (关系下标, 相邻节点下标) 列表"""
+        result = []
+        for position in range(self.adj_offsets[index], self.adj_offsets[index + 1]):
+            edge = self.adj_edges[position]
+            src = self.edge_src[edge]
+            result.append((edge, self.edge_dst[edge] if src == index else src))
+        return result
+
+    # ---------- 只读查询 ----------
+
+    def node_detail(self, node_id):
+        """节点的所有属性"""
+        index = self.node_index.get(int(node_id))
+        if index is None:
+            return None
+        node_properties = dict(self.node_props[index])
+        node_properties['id'] = self.node_ids[index]
+        labels = self.node_labels[index]
+        node_properties['type'] = labels[0] if labels else ''
+        return node_properties
+
+    def nodes_by_type(self, node_type, limit=100):
+        """某一类型的节点"""
+        indices = self.label_nodes.get(node_type, [])[:limit]
+        nodes = []
+        for index in indices:
+            node_data = self.node_data(index)
+            node_data['type'] = node_type
+            nodes.append(node_data)
+        return {"nodes": nodes, "lines": []}
+
+    def nodes_by_relationship(self, rel_type, limit=100):
+        """某一关系类型的关系及其两端节点"""
+        type_index = self._rel_type_index.get(rel_type)
+        if type_index is None:
+            return {"nodes": [], "lines": []}
+        nodes = []
+        lines = []
+        node_seen = set()
+        for edge in self.type_edges.get(type_index, [])[:limit]:
+            for index in (self.edge_src[edge], self.edge_dst[edge]):
+                if index not in node_seen:
+                    node_seen.add(index)
+                    nodes.append(self.node_data(index))
+            lines.append(self.line_data(edge))
+        return {"nodes": nodes, "lines": lines}
+
+    def expand(self, node_ids, hops=1, rel_types=None, fanout=None):
+        """
+        批量展开多个节点的邻域
+        :param node_ids: 中心节点ID列表
+        :param hops: 展开跳数
+        :param rel_types: 只沿这些关系类型展开，为空时不限制
+        :param fanout: 每个中心节点最多展开的不同关系数（与Cypher查询expand_nodes的计数单位相同），为None时不限制
+        :return: 合并去重后的子图
+        """
+        allowed_types = None
+        if rel_types:
+            allowed_types = {self._rel_type_index[t] for t in rel_types if t in self._rel_type_index}
+
+        nodes = []
+        lines = []
+        node_seen = set()
+        edge_seen = set()
+
+        def add_node(index):
+            if index not in node_seen:
+                node_seen.add(index)
+                nodes.append(self.node_data(index))
+
+        for node_id in node_ids:
+            center = self.node_index.get(int(node_id))
+            if center is None:
+                continue
+            add_node(center)
+            visited = {center}
+            frontier = [center]
+            # 本中心节点已展开的关系（两端都在邻域内的关系会被遍历两次，只计数一次）
+            expanded = set()
+            for _ in range(hops):
+                next_frontier = []
+                for index in frontier:
+                    for edge, other in self.neighbors(index):
+                        if allowed_types is not None and self.edge_types[edge] not in allowed_types:
+                            continue
+                        if edge in expanded:
+                            continue
+                        if fanout is not None and len(expanded) >= fanout:
+                            break
+                        expanded.add(edge)
+                        add_node(other)
+                        if edge not in edge_seen:
+                            edge_seen.add(edge)
+                            lines.append(self.line_data(edge))
+                        if other not in visited:
+                            visited.add(other)
+                            next_frontier.append(other)
+                frontier = next_frontier
+                if not frontier:
+                    break
+        return {"nodes": nodes, "lines": lines}
+
+    def default_graph(self, limit=50, load_all=False, fields=None):
+        """默认图谱：全部节点和关系，或前limit个节点及其之间的关系"""
+        if load_all:
+            nodes = [self.node_data(index, full=True, fields=fields) for index in range(len(self.node_ids))]
+            lines = [self.line_data(edge, fields) for edge in range(len(self.edge_src))]
+            return {"nodes": nodes, "lines": lines}
+
+        indices = range(min(limit, len(self.node_ids)))
+        nodes = [self.node_data(index, full=True, fields=fields) for index in indices]
+        lines = []
+        edge_seen = set()
+        for index in indices:
+            for edge, other in self.neighbors(index):
+                if other < limit and edge not in edge_seen:
+                    edge_seen.add(edge)
+                    lines.append(self.line_data(edge, fields))
+                    if len(lines) >= limit * 2:
+                        return {"nodes": nodes, "lines": lines}
+        return {"nodes": nodes, "lines": lines}
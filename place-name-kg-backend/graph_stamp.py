@@ -0,0 +1,47 @@
+"""
+图谱变更标记
+导入脚本等外部写入者在写入图谱后更新标记文件，运行中的应用定期检查标记，
+发现变化时使快照、检索索引、模式目录、结果缓存和分词用户词典失效
+"""
+import json
+import os
+import time
+
+# 标记文件路径（导入脚本与应用共用）
+DEFAULT_STAMP_PATH = os.path.join(os.path.dirname(__file__), 'data', 'graph_stamp.json')
+# 应用检查标记文件的最短间隔（秒）
+STAMP_CHECK_INTERVAL = 2
+
+
+def read_graph_stamp(path=DEFAULT_STAMP_PATH):
+    """读取标记，文件不存在或无法解析时返回None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def publish_graph_change(source, path=DEFAULT_STAMP_PATH):
+    """
+    记录一次外部写入：标记版本号递增并写入时间和来源
+    :param source: 写入来源（如导入模式）
+    :return: 新的标记
+    """
+    previous = read_graph_stamp(path) or {}
+    stamp = {
+        'version': int(previous.get('version', 0)) + 1,
+        'updated_at': time.time(),
+        'source': source
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(stamp, file)
+    os.replace(temp_path, path)
+    print(f"已更新图谱变更标记: 版本 {stamp['version']}（{source}）")
+    return stamp
@@ -0,0 +1,89 @@
+"""
+导入性能基准
+生成不同规模的合成数据集，分别以子进程运行 data_process 的各导入模式，
+记录吞吐量（行/秒）、内存峰值和数据库往返次数。
+注意：除csv外的模式都会写入数据库（bulk/legacy 会先清空），须以 --uri 显式指定测试库
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from synthetic_data import generate_dataset
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# 只生成文件、不写入数据库的导入模式
+OFFLINE_MODES = {'csv'}
+
+
+def run_mode(dataset_dir, mode, extra_args=()):
+    """以子进程运行一次导入，返回 data_process 写出的统计"""
+    stats_path = os.path.join(dataset_dir, f"stats_{mode}.json")
+    command = [
+        sys.executable, os.path.join(BACKEND_DIR, 'data_process.py'),
+        '--mode', mode,
+        '--input', os.path.join(dataset_dir, 'data.json'),
+        '--result-dir', os.path.join(dataset_dir, 'result'),
+        '--attributes-db', os.path.join(dataset_dir, 'attributes.db'),
+        '--state-path', os.path.join(dataset_dir, 'import_state.json'),
+        '--output-dir', os.path.join(dataset_dir, 'import'),
+        '--stats-json', stats_path,
+        # 变更标记写入数据集目录，避免通知连接正式库的应用
+        '--stamp-path', os.path.join(dataset_dir, 'graph_stamp.json'),
+    ] + list(extra_args)
+    subprocess.run(command, cwd=BACKEND_DIR, check=True)
+    with open(stats_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导入性能基准')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='逗号分隔的数据集行数，最大100万')
+    parser.add_argument('--modes', default='csv,stream',
+                        help='逗号分隔的导入模式（除csv外都会写入--uri指定的数据库，bulk/legacy会先清空）')
+    parser.add_argument('--uri', default=None, help='测试用Neo4j数据库地址，运行写库模式时必须指定')
+    parser.add_argument('--user', default='neo4j', help='测试库用户名')
+    parser.add_argument('--password', default=None, help='测试库密码')
+    parser.add_argument('--work-dir', default='data/benchmark', help='数据集和统计的输出目录')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--output', default=None, help='基准结果JSON文件，默认写入工作目录')
+    args, extra_args = parser.parse_known_args()
+
+    modes = [value for value in args.modes.split(',') if value]
+    online_modes = [mode for mode in modes if mode not in OFFLINE_MODES]
+    if online_modes:
+        if not args.uri or args.password is None:
+            parser.error(f"模式 {','.join(online_modes)} 会写入数据库，必须以 --uri 和 --password 显式指定测试库")
+        extra_args = ['--uri', args.uri, '--user', args.user, '--password', args.password] + extra_args
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(',') if value]:
+        dataset_dir = os.path.abspath(os.path.join(args.work_dir, str(size)))
+        if not os.path.exists(os.path.join(dataset_dir, 'data.json')):
+            generate_dataset(dataset_dir, size, args.seed)
+        for mode in modes:
+            stats = run_mode(dataset_dir, mode, extra_args)
+            results.append({
+                'rows': size,
+                'mode': mode,
+                'rows_per_sec': stats.get('total_rows_per_sec'),
+                'elapsed': stats.get('total_elapsed'),
+                'peak_memory_kb': stats.get('peak_memory_kb'),
+                'round_trips': stats.get('round_trips')
+            })
+
+    print(f"{'行数':>10} {'模式':>8} {'行/秒':>10} {'耗时(秒)':>10} {'内存峰值(KB)':>14} {'往返次数':>10}")
+    for item in results:
+        print(f"{item['rows']:>10} {item['mode']:>8} {item['rows_per_sec'] or 0:>10.0f} {item['elapsed'] or 0:>10.2f} "
+              f"{item['peak_memory_kb'] or 0:>14} {item['round_trips'] if item['round_trips'] is not None else '-':>10}")
+
+    output = args.output or os.path.join(args.work_dir, 'benchmark.json')
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print(f"基准结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
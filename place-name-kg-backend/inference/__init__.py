@@ -8,5 +8,7 @@ __version__ = '0.1.0'
 
 # 导入主要类
 from .rule_llm_integration import RuleLLMIntegration
+from .async_rule_llm_integration import AsyncRuleLLMIntegration
+from .entity_linker import EntityLinker
 
-__all__ = ['RuleLLMIntegration'] 
\ No newline at end of file
+__all__ = ['RuleLLMIntegration', 'AsyncRuleLLMIntegration', 'EntityLinker'] 
\ No newline at end of file
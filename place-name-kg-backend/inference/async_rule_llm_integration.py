@@ -0,0 +1,105 @@
+"""
+异步规则和大模型集成的推理引擎
+大模型调用基于后台事件循环上共享的 ollama.AsyncClient，图谱查询放到线程池中执行
+"""
+import asyncio
+import time
+from typing import Dict, List
+
+from entity_extract.async_extractor import BackgroundLoop
+from .rule_llm_integration import ANSWER_OPTIONS, NO_ENTITY_ANSWER, RuleLLMIntegration
+
+
+class AsyncRuleLLMIntegration(RuleLLMIntegration):
+    """
+    异步推理引擎
+    规则库、提示词构建和结果组装与 RuleLLMIntegration 相同，
+    继承的同步方法保持不变，异步版本为 aprocess_question 与 agenerate_response_with_llm，须在 background_loop 上执行
+    """
+
+    def __init__(self, rule_file_path: str = 'rules/rule_base.json',
+                 model_name: str = "deepseek-r1:7b",
+                 max_depth: int = 30,
+                 request_timeout: float = None,
+                 background_loop: BackgroundLoop = None):
+        super().__init__(rule_file_path=rule_file_path, model_name=model_name, max_depth=max_depth)
+        self.background_loop = background_loop or BackgroundLoop(request_timeout)
+
+    async def agenerate_response_with_llm(self,
+                                         question: str,
+                                         entities: List[str],
+                                         entity_info: List[Dict],
+                                         relationships: List[Dict],
+                                         paths: List[Dict]) -> str:
+        """使用大模型异步生成回答"""
+        messages = self._build_answer_messages(question, entities, entity_info, relationships, paths)
+
+        try:
+            start_time = time.time()
+            print(f"异步调用 {self.model_name} 模型生成回答...")
+
+            response = await self.background_loop.client().chat(
+                model=self.model_name,
+                messages=messages,
+                stream=False,
+                options=ANSWER_OPTIONS
+            )
+
+            print(f"模型响应成功，耗时: {time.time() - start_time:.2f}秒")
+            return response['message']['content']
+
+        except Exception as e:
+            print(f"模型调用失败: {str(e)}")
+            return f"抱歉，在处理您的问题时遇到了技术问题。错误信息: {str(e)}"
+
+    async def aprocess_question(self, question: str, entity_extractor, neo4j_db,
+                               use_llm_extraction: bool = False) -> Dict:
+        """
+        异步处理用户问题，返回推理结果
+
+        Args:
+            question: 用户问题
+            entity_extractor: 异步实体提取器（AsyncExtractor）
+            neo4j_db: Neo4j数据库实例
+            use_llm_extraction: 为True时跳过地名词典，直接使用大模型提取实体
+
+        Returns:
+            包含回答和可视化数据的字典，格式与 RuleLLMIntegration.process_question 相同
+        """
+        start_time = time.time()
+
+        try:
+            processed_question = self._prepare_question(question)
+            if processed_question is None:
+                return self._empty_result("请提供有效的问题。", [], start_time)
+
+            entities = await entity_extractor.aextract_entities(processed_question, use_llm=use_llm_extraction)
+            entities = entities or self._keyword_entities(processed_question)
+
+            if not entities:
+                return self._empty_result(NO_ENTITY_ANSWER, [], start_time)
+
+            print(f"从问题中识别到的实体: {entities}")
+
+            # 图谱查询和规则推理是同步的数据库调用，放到线程池中执行，不阻塞事件循环
+            all_entity_info, all_relationships, all_paths = await asyncio.to_thread(
+                self._collect_graph_context, entities, neo4j_db)
+
+            if not all_entity_info:
+                return self._empty_result(self._not_found_answer(entities), entities, start_time)
+
+            inferred_relationships = await asyncio.to_thread(self.apply_inference_rules, all_relationships)
+
+            answer = await self.agenerate_response_with_llm(
+                question=processed_question,
+                entities=entities,
+                entity_info=all_entity_info,
+                relationships=all_relationships + inferred_relationships,
+                paths=all_paths
+            )
+
+            return self._build_result(answer, entities, all_entity_info, all_relationships,
+                                      inferred_relationships, all_paths, start_time)
+
+        except Exception as e:
+            return self._error_result(e, locals().get('entities', []), start_time)
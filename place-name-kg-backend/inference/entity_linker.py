@@ -0,0 +1,132 @@
+"""
+实体链接
+把从问题中提取的地名（mention）一次性链接到图谱节点：在内存中的名称/别名检索索引上依次进行
+完全匹配、包含匹配和小编辑距离匹配，返回按得分排序的候选节点，不需要逐个地名查询图数据库
+"""
+from typing import Callable, Dict, List
+
+# 各匹配方式的得分
+SCORE_EXACT = 1.0
+SCORE_ALIAS = 0.9
+# 包含匹配得分区间，按较短一方占较长一方的长度比例线性插值
+SCORE_CONTAINS_MIN = 0.5
+SCORE_CONTAINS_MAX = 0.8
+# 编辑距离匹配的得分：每差一处字符扣减一次
+SCORE_EDIT_MAX = 0.7
+SCORE_EDIT_PENALTY = 0.1
+
+# 包含匹配时较短一方的最短长度，避免“县”“州”等单字匹配大量节点
+MIN_CONTAINED_LENGTH = 2
+# 每个mention返回的候选数量
+DEFAULT_TOP_K = 5
+# 低于该得分的候选被丢弃
+DEFAULT_MIN_SCORE = 0.5
+
+
+def max_edits_for(mention: str) -> int:
+    """按mention长度允许的编辑距离：2字不允许，3-5字允许1处，更长允许2处"""
+    if len(mention) <= 2:
+        return 0
+    return 1 if len(mention) <= 5 else 2
+
+
+class EntityLinker:
+    """
+    基于名称/别名检索索引的实体链接器
+    index_getter 返回当前的 NameSearchIndex；检索索引随节点写入增量更新，链接器无需单独重建
+    """
+
+    def __init__(self, index_getter: Callable, top_k: int = DEFAULT_TOP_K, min_score: float = DEFAULT_MIN_SCORE):
+        self.index_getter = index_getter
+        self.top_k = top_k
+        self.min_score = min_score
+
+    def link(self, mentions: List[str]) -> Dict[str, List[Dict]]:
+        """
+        链接一组mention
+
+        Args:
+            mentions: 提取出的地名列表
+
+        Returns:
+            {mention: [{'id', 'name', 'type', 'score', 'match'}, ...]}，候选按得分降序排列
+        """
+        index = self.index_getter()
+        linked = {}
+        for mention in mentions:
+            if mention in linked:
+                continue
+            linked[mention] = self._link_one(index, mention)
+        return linked
+
+    def _link_one(self, index, mention: str) -> List[Dict]:
+        query = (mention or '').strip().lower()
+        if not query:
+            return []
+        # 节点ID -> (得分, 匹配方式)
+        scored = {}
+
+        def offer(node_id, score, match):
+            if score > scored.get(node_id, (0, ''))[0]:
+                scored[node_id] = (score, match)
+
+        # 1. 完全匹配名称或别名
+        for node_id in index.lookup(query):
+            doc = index.get(node_id)
+            if doc and doc['name'].lower() == query:
+                offer(node_id, SCORE_EXACT, 'exact')
+            else:
+                offer(node_id, SCORE_ALIAS, 'alias')
+
+        # 2. 包含匹配：节点名称包含mention（如“平江”->“平江府”）
+        if len(query) >= MIN_CONTAINED_LENGTH:
+            for node_id, _ in index.search(query, limit=self.top_k * 4):
+                doc = index.get(node_id)
+                key = self._best_key(doc, lambda key: query in key)
+                if key and key != query:
+                    offer(node_id, self._contains_score(query, key), 'contains')
+
+        # 3. 包含匹配：mention包含节点名称（如“苏州府城”->“苏州府”），枚举mention的子串做完全匹配
+        for length in range(len(query) - 1, MIN_CONTAINED_LENGTH - 1, -1):
+            for start in range(len(query) - length + 1):
+                substring = query[start:start + length]
+                for node_id in index.lookup(substring):
+                    offer(node_id, self._contains_score(substring, query), 'contained')
+
+        # 4. 小编辑距离匹配（错别字、异体字）
+        max_edits = max_edits_for(query)
+        if max_edits:
+            for node_id, key, distance in index.near_keys(query, max_edits):
+                if distance:
+                    offer(node_id, round(SCORE_EDIT_MAX - SCORE_EDIT_PENALTY * distance, 2), 'edit')
+
+        candidates = []
+        for node_id, (score, match) in scored.items():
+            if score < self.min_score:
+                continue
+            doc = index.get(node_id)
+            if not doc:
+                continue
+            candidates.append({
+                'id': node_id,
+                'name': doc['name'],
+                'type': doc['type'],
+                'score': score,
+                'match': match
+            })
+        candidates.sort(key=lambda item: (-item['score'], len(item['name']), item['name'], item['id']))
+        return candidates[:self.top_k]
+
+    @staticmethod
+    def _best_key(doc, predicate):
+        """满足条件的最短检索键（名称或别名）"""
+        if not doc:
+            return None
+        keys = [doc['name'].lower()] + [alias.lower() for alias in doc['aliases']]
+        matched = [key for key in keys if key and predicate(key)]
+        return min(matched, key=len) if matched else None
+
+    @staticmethod
+    def _contains_score(shorter: str, longer: str) -> float:
+        ratio = len(shorter) / max(1, len(longer))
+        return round(SCORE_CONTAINS_MIN + (SCORE_CONTAINS_MAX - SCORE_CONTAINS_MIN) * ratio, 2)
@@ -8,6 +8,15 @@ import time
 import ollama
 from typing import List, Dict, Any, Optional, Tuple
 
+from record_converter import LineRecord, NodeRecord, node_brief, node_type, relationship_type
+from .entity_linker import EntityLinker
+
+# 生成回答的模型参数
+ANSWER_OPTIONS = {"temperature": 0.1}
+
+# 未识别到地名时的回答
+NO_ENTITY_ANSWER = "抱歉，我无法从您的问题中识别出任何地名实体。请尝试提供更具体的地名，例如'苏州'、'平江府'等。"
+
 
 class RuleLLMIntegration:
     """
@@ -120,65 +129,60 @@ class RuleLLMIntegration:
         Returns:
             关系列表
         """
-        try:
-            # 获取出向关系
-            query_outgoing = f"""
-            MATCH (n)-[r]->(m)
-            WHERE ID(n) = {entity_id}
-            RETURN n, r, m, 'outgoing' as direction
-            """
-            
-            # 获取入向关系
-            query_incoming = f"""
-            MATCH (n)<-[r]-(m)
-            WHERE ID(n) = {entity_id}
-            RETURN n, r, m, 'incoming' as direction
-            """
-            
-            # 合并结果
-            results_outgoing = neo4j_db.graph.run(query_outgoing).data()
-            results_incoming = neo4j_db.graph.run(query_incoming).data()
+        return self.get_entities_relationships([entity_id], neo4j_db).get(entity_id, [])
+    
+    def get_entities_relationships(self, entity_ids: List[int], neo4j_db) -> Dict[int, List[Dict]]:
+        """
+        批量获取多个实体的关系（单次查询）
+        
+        Args:
+            entity_ids: 实体ID列表
+            neo4j_db: Neo4j数据库实例
             
-            relationships = []
+        Returns:
+            实体ID到关系列表的映射
+        """
+        try:
+            expanded = neo4j_db.expand_paths(entity_ids, hops=1)
+        except Exception as e:
+            print(f"获取实体关系时出错: {str(e)}")
+            return {}
+        
+        relationships_map = {}
+        for center_node, paths in expanded:
+            entity_id = center_node.identity
+            outgoing = []
+            incoming = []
             processed_relations = set()  # 用于去重
             
-            # 处理所有结果
-            for result in results_outgoing + results_incoming:
-                source_node = result['n'] if result['direction'] == 'outgoing' else result['m']
-                target_node = result['m'] if result['direction'] == 'outgoing' else result['n']
-                relation = result['r']
+            for path in paths:
+                relation = path.relationships[0]
+                source_node = relation.start_node
+                target_node = relation.end_node
+                direction = 'outgoing' if source_node.identity == entity_id else 'incoming'
                 
                 # 创建关系的唯一标识，避免重复
-                relation_id = f"{source_node.identity}_{target_node.identity}_{type(relation).__name__}"
+                rel_type = relationship_type(relation)
+                relation_id = f"{source_node.identity}_{target_node.identity}_{rel_type}"
                 if relation_id in processed_relations:
                     continue
                 
                 processed_relations.add(relation_id)
                 
-                rel_type = type(relation).__name__
-                
                 rel_info = {
-                    'source': {
-                        'id': source_node.identity,
-                        'name': source_node.get('name', ''),
-                        'type': list(source_node.labels)[0] if source_node.labels else ''
-                    },
-                    'target': {
-                        'id': target_node.identity,
-                        'name': target_node.get('name', ''),
-                        'type': list(target_node.labels)[0] if target_node.labels else ''
-                    },
+                    'source': node_brief(source_node),
+                    'target': node_brief(target_node),
                     'relation': rel_type,
                     'properties': {k: v for k, v in relation.items()},
-                    'direction': result['direction']
+                    'direction': direction
                 }
-                relationships.append(rel_info)
+                # 出向关系在前，入向关系在后
+                (outgoing if direction == 'outgoing' else incoming).append(rel_info)
             
-            print(f"获取到实体ID({entity_id})的 {len(relationships)} 个关系")
-            return relationships
-        except Exception as e:
-            print(f"获取实体关系时出错: {str(e)}")
-            return []
+            relationships_map[entity_id] = outgoing + incoming
+            print(f"获取到实体ID({entity_id})的 {len(relationships_map[entity_id])} 个关系")
+        
+        return relationships_map
     
     def search_paths_between_entities(self, entity1_id: int, entity2_id: int, 
                                      neo4j_db, max_depth: Optional[int] = None) -> List[Dict]:
@@ -203,24 +207,13 @@ class RuleLLMIntegration:
                 print(f"跳过相同节点的路径搜索: {entity1_id} -> {entity1_id}")
                 return []
                 
-            # 查询从entity1到entity2的有向路径
-            query_forward = f"""
-            MATCH path = shortestPath((n)-[*1..{max_depth}]->(m))
-            WHERE ID(n) = {entity1_id} AND ID(m) = {entity2_id}
-            RETURN path
-            """
-            
-            # 查询从entity2到entity1的有向路径
-            query_backward = f"""
-            MATCH path = shortestPath((n)-[*1..{max_depth}]->(m))
-            WHERE ID(n) = {entity2_id} AND ID(m) = {entity1_id}
-            RETURN path
-            """
-            
-            # 合并结果
+            # 分别查询entity1到entity2、entity2到entity1的有向路径
+            schema = {'max_depth': int(max_depth)}
             results = []
-            forward_results = neo4j_db.graph.run(query_forward).data()
-            backward_results = neo4j_db.graph.run(query_backward).data()
+            forward_results = neo4j_db.executor.data('shortest_path', schema=schema,
+                                                     start_id=entity1_id, end_id=entity2_id)
+            backward_results = neo4j_db.executor.data('shortest_path', schema=schema,
+                                                      start_id=entity2_id, end_id=entity1_id)
             
             # 如果有正向路径，优先使用正向路径
             if forward_results:
@@ -242,21 +235,13 @@ class RuleLLMIntegration:
                 last_node_id = None
                 
                 for i, node in enumerate(nodes):
-                    node_data = {
-                        'name': node['name'],
-                        'id': node.identity,
-                        'type': list(node.labels)[0] if node.labels else ''
-                    }
-                    
-                    # 添加所有节点属性
-                    for key, value in node.items():
-                        if key != 'name' and key != 'id' and key != 'type':
-                            node_data[key] = value
+                    # 节点数据包含所有节点属性
+                    node_data = NodeRecord.from_node(node).to_dict()
                     
                     # 添加关系信息
                     if i > 0 and i-1 < len(rels):
                         rel = rels[i-1]
-                        rel_type = type(rel).__name__
+                        rel_type = relationship_type(rel)
                         
                         if rel.start_node.identity == last_node_id:
                             node_data['relation'] = f"{last_node_name} -{rel_type}-> {node['name']}"
@@ -575,46 +560,19 @@ class RuleLLMIntegration:
         Returns:
             生成的回答
         """
-        # 构建提示词
-        user_prompt = self._build_inference_prompt(
-            question=question,
-            entities=entities,
-            entity_info=entity_info,
-            relationships=relationships,
-            paths=paths
-        )
+        messages = self._build_answer_messages(question, entities, entity_info, relationships, paths)
         
         try:
             # 记录模型调用开始时间
             start_time = time.time()
             print(f"调用 {self.model_name} 模型生成回答...")
             
-            # 增强的system提示词，强调对用户问题的准确理解
-            system_prompt = """你是一个专业的苏州历史地名专家，精通苏州历史地名沿革、行政区划变迁和隶属等关系。
-你的职责是：
-1. 只回答用户提出的原始问题，不要重复或引用我给你的指令内容
-2. 不要在回答中说"根据提供的信息"或"基于图谱数据"等引导语
-3. 所有回答必须基于知识图谱提供的事实，不要编造不存在的关系
-4. 答案应直接、简洁，不要添加不必要的解释
-
-重要: 不要将指令或提示词本身视为用户问题的一部分。用户的原始问题已在提示词开头明确标出。
-"""
-            
             # 调用大模型生成回答
             response = ollama.chat(
                 model=self.model_name,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user", 
-                        "content": user_prompt
-                    }
-                ],
+                messages=messages,
                 stream=False,
-                options={"temperature": 0.1}  # 添加温度参数
+                options=ANSWER_OPTIONS
             )
             
             # 记录模型调用耗时
@@ -628,7 +586,45 @@ class RuleLLMIntegration:
             print(f"模型调用失败: {str(e)}")
             return f"抱歉，在处理您的问题时遇到了技术问题。错误信息: {str(e)}"
     
-    def process_question(self, question: str, entity_extractor, neo4j_db) -> Dict:
+    def _build_answer_messages(self, 
+                               question: str,
+                               entities: List[str],
+                               entity_info: List[Dict],
+                               relationships: List[Dict],
+                               paths: List[Dict]) -> List[Dict]:
+        """构建生成回答的对话消息"""
+        # 构建提示词
+        user_prompt = self._build_inference_prompt(
+            question=question,
+            entities=entities,
+            entity_info=entity_info,
+            relationships=relationships,
+            paths=paths
+        )
+        
+        # 增强的system提示词，强调对用户问题的准确理解
+        system_prompt = """你是一个专业的苏州历史地名专家，精通苏州历史地名沿革、行政区划变迁和隶属等关系。
+你的职责是：
+1. 只回答用户提出的原始问题，不要重复或引用我给你的指令内容
+2. 不要在回答中说"根据提供的信息"或"基于图谱数据"等引导语
+3. 所有回答必须基于知识图谱提供的事实，不要编造不存在的关系
+4. 答案应直接、简洁，不要添加不必要的解释
+
+重要: 不要将指令或提示词本身视为用户问题的一部分。用户的原始问题已在提示词开头明确标出。
+"""
+        
+        return [
+            {
+                "role": "system", 
+                "content": system_prompt
+            },
+            {
+                "role": "user", 
+                "content": user_prompt
+            }
+        ]
+    
+    def process_question(self, question: str, entity_extractor, neo4j_db, use_llm_extraction: bool = False) -> Dict:
         """
         处理用户问题，返回推理结果
         
@@ -636,6 +632,7 @@ class RuleLLMIntegration:
             question: 用户问题
             entity_extractor: 实体提取器实例
             neo4j_db: Neo4j数据库实例
+            use_llm_extraction: 为True时跳过地名词典，直接使用大模型提取实体
             
         Returns:
             包含回答和可视化数据的字典
@@ -644,187 +641,195 @@ class RuleLLMIntegration:
         
         try:
             # 预处理用户问题
-            if not question or not question.strip():
-                return {
-                    'answer': "请提供有效的问题。",
-                    'entities': [],
-                    'kg_data': {'nodes': [], 'lines': []},
-                    'process_time': time.time() - start_time
-                }
-            
-            # 规范化问题格式
-            processed_question = question.strip()
-            # 检查问题是否过短或可能无效
-            if len(processed_question) < 3:
-                print(f"警告: 问题过短或可能无效: '{processed_question}'")
-            
-            print(f"开始处理用户问题: '{processed_question}'")
+            processed_question = self._prepare_question(question)
+            if processed_question is None:
+                return self._empty_result("请提供有效的问题。", [], start_time)
             
             # 1. 从问题中提取实体
-            entities = entity_extractor.extract_entities(processed_question)
-            
-            # 如果没有识别到实体，但问题中可能包含地名相关词汇，尝试进行模糊匹配
-            if not entities:
-                # 检查问题中是否包含可能的地名关键词
-                location_keywords = ["地", "区", "县", "市", "州", "府", "路", "街", "苏州", "吴", "阊", "平江"]
-                has_location_keyword = any(keyword in processed_question for keyword in location_keywords)
-                
-                if has_location_keyword:
-                    print(f"未识别到具体地名实体，但问题中包含地名关键词，尝试进行模糊匹配")
-                    # 提取问题中的所有可能实体词 (简单处理，实际应使用NLP工具)
-                    potential_entities = []
-                    for keyword in location_keywords:
-                        if keyword in processed_question and len(keyword) > 1:  # 避免单字匹配
-                            potential_entities.append(keyword)
-                    
-                    if potential_entities:
-                        print(f"从问题中提取潜在地名关键词: {potential_entities}")
-                        entities = potential_entities
+            entities = entity_extractor.extract_entities(processed_question, use_llm=use_llm_extraction)
+            entities = entities or self._keyword_entities(processed_question)
             
             if not entities:
-                return {
-                    'answer': "抱歉，我无法从您的问题中识别出任何地名实体。请尝试提供更具体的地名，例如'苏州'、'平江府'等。",
-                    'entities': [],
-                    'kg_data': {'nodes': [], 'lines': []},
-                    'process_time': time.time() - start_time
-                }
+                return self._empty_result(NO_ENTITY_ANSWER, [], start_time)
             
             print(f"从问题中识别到的实体: {entities}")
             
-            # 记录查询涉及的所有节点和关系
-            all_entity_info = []
-            all_relationships = []
-            all_paths = []
-            
-            # 2. 从知识图谱中查询实体信息
-            entity_info_map = {}  # 实体ID到实体信息的映射
-            for entity in entities:
-                # 先进行精确查询
-                query = f"""
-                MATCH (n)
-                WHERE n.name = '{entity}'
-                RETURN n
-                LIMIT 1
-                """
-                results = neo4j_db.graph.run(query).data()
-                
-                if results:
-                    node = results[0]['n']
-                    info = {
-                        'id': node.identity,
-                        'name': node['name'],
-                        'type': list(node.labels)[0] if node.labels else '',
-                        'properties': {k: v for k, v in node.items()}
-                    }
-                    all_entity_info.append(info)
-                    entity_info_map[info['id']] = info
-                else:
-                    # 尝试模糊查询
-                    fuzzy_query = f"""
-                    MATCH (n)
-                    WHERE n.name CONTAINS '{entity}' OR '{entity}' CONTAINS n.name
-                    RETURN n
-                    LIMIT 5
-                    """
-                    fuzzy_results = neo4j_db.graph.run(fuzzy_query).data()
-                    
-                    if fuzzy_results:
-                        for result in fuzzy_results:
-                            node = result['n']
-                            info = {
-                                'id': node.identity,
-                                'name': node['name'],
-                                'type': list(node.labels)[0] if node.labels else '',
-                                'properties': {k: v for k, v in node.items()}
-                            }
-                            all_entity_info.append(info)
-                            entity_info_map[info['id']] = info
+            # 2-4. 查询实体信息、关系和实体间路径
+            all_entity_info, all_relationships, all_paths = self._collect_graph_context(entities, neo4j_db)
             
             # 如果没有找到任何实体信息，给出更友好的回复
             if not all_entity_info:
-                return {
-                    'answer': f"抱歉，我无法在知识库中找到与'{', '.join(entities)}'相关的地名信息。请尝试其他地名或检查拼写是否正确。",
-                    'entities': entities,
-                    'kg_data': {'nodes': [], 'lines': []},
-                    'process_time': time.time() - start_time
-                }
-            
-            # 3. 获取实体关系
-            for info in all_entity_info:
-                entity_id = info['id']
-                relationships = self.get_entity_relationships(entity_id, neo4j_db)
-                all_relationships.extend(relationships)
-            
-            # 4. 搜索实体之间的路径
-            if len(all_entity_info) >= 2:
-                # 已处理的实体对，避免重复查询
-                processed_entity_pairs = set()
-                
-                for i in range(len(all_entity_info)):
-                    for j in range(i+1, len(all_entity_info)):
-                        entity1_id = all_entity_info[i]['id']
-                        entity2_id = all_entity_info[j]['id']
-                        
-                        # 跳过相同的实体ID
-                        if entity1_id == entity2_id:
-                            continue
-                            
-                        # 创建一个排序后的实体ID对作为键，确保不重复查询
-                        entity_pair = tuple(sorted([entity1_id, entity2_id]))
-                        if entity_pair in processed_entity_pairs:
-                            continue
-                            
-                        processed_entity_pairs.add(entity_pair)
-                        
-                        # 搜索路径
-                        paths = self.search_paths_between_entities(entity1_id, entity2_id, neo4j_db)
-                        all_paths.extend(paths)
+                return self._empty_result(self._not_found_answer(entities), entities, start_time)
             
             # 5. 应用推理规则
             inferred_relationships = self.apply_inference_rules(all_relationships)
             
-            # 原始关系与推理关系分开处理
-            original_relationships = all_relationships.copy()
-            all_relationships.extend(inferred_relationships)
-            
             # 6. 使用大模型生成回答
             answer = self.generate_response_with_llm(
                 question=processed_question,  # 使用处理后的问题
                 entities=entities,
                 entity_info=all_entity_info,
-                relationships=all_relationships,
+                relationships=all_relationships + inferred_relationships,
                 paths=all_paths
             )
             
-            # 7. 构建知识图谱可视化数据（只使用原始关系，不含推理关系）
-            kg_data = self._convert_to_visual_data(all_entity_info, original_relationships, all_paths)
-            
-            # 8. 格式化关系数据为三元组格式（包含原始和推理关系，但推理关系明确标注）
-            context = self._format_relations_for_context(original_relationships, inferred_relationships)
-            
-            process_time = time.time() - start_time
-            print(f"问题处理完成，总耗时: {process_time:.2f}秒")
-            
-            return {
-                'answer': answer,
-                'entities': entities,
-                'kg_data': kg_data,
-                'context': context,  # 添加格式化后的关系上下文
-                'process_time': process_time
-            }
+            return self._build_result(answer, entities, all_entity_info, all_relationships,
+                                      inferred_relationships, all_paths, start_time)
             
         except Exception as e:
-            print(f"处理问题时出错: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            return self._error_result(e, locals().get('entities', []), start_time)
+    
+    def _prepare_question(self, question: str) -> Optional[str]:
+        """规范化问题格式，问题为空时返回None"""
+        if not question or not question.strip():
+            return None
+        
+        processed_question = question.strip()
+        # 检查问题是否过短或可能无效
+        if len(processed_question) < 3:
+            print(f"警告: 问题过短或可能无效: '{processed_question}'")
+        
+        print(f"开始处理用户问题: '{processed_question}'")
+        return processed_question
+    
+    def _keyword_entities(self, processed_question: str) -> List[str]:
+        """没有识别到实体时，从问题中的地名关键词进行模糊匹配"""
+        # 检查问题中是否包含可能的地名关键词
+        location_keywords = ["地", "区", "县", "市", "州", "府", "路", "街", "苏州", "吴", "阊", "平江"]
+        has_location_keyword = any(keyword in processed_question for keyword in location_keywords)
+        
+        potential_entities = []
+        if has_location_keyword:
+            print(f"未识别到具体地名实体，但问题中包含地名关键词，尝试进行模糊匹配")
+            # 提取问题中的所有可能实体词 (简单处理，实际应使用NLP工具)
+            for keyword in location_keywords:
+                if keyword in processed_question and len(keyword) > 1:  # 避免单字匹配
+                    potential_entities.append(keyword)
             
-            return {
-                'answer': f"抱歉，处理您的问题时遇到了技术问题: {str(e)}",
-                'entities': entities if 'entities' in locals() else [],
-                'kg_data': {'nodes': [], 'lines': []},
-                'error': str(e),
-                'process_time': time.time() - start_time
-            }
+            if potential_entities:
+                print(f"从问题中提取潜在地名关键词: {potential_entities}")
+        return potential_entities
+    
+    def _collect_graph_context(self, entities: List[str], neo4j_db) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """
+        从知识图谱中查询实体信息、批量获取实体关系并搜索实体之间的路径
+        
+        Returns:
+            (实体信息列表, 关系列表, 路径列表)
+        """
+        all_entity_info = []
+        all_relationships = []
+        all_paths = []
+        
+        # 2. 实体链接：在内存中的名称/别名索引上一次性解析所有实体，再以一次查询取回节点
+        linked = EntityLinker(neo4j_db.get_search_index).link(entities)
+        selected = {}  # 节点ID -> 链接结果
+        for entity in entities:
+            candidates = linked.get(entity, [])
+            # 有完全匹配（名称或别名）时只取最佳候选，否则保留所有候选
+            if candidates and candidates[0]['match'] in ('exact', 'alias'):
+                candidates = candidates[:1]
+            for candidate in candidates:
+                if candidate['id'] not in selected:
+                    selected[candidate['id']] = dict(candidate, mention=entity)
+        
+        if selected:
+            nodes = {record['n'].identity: record['n']
+                     for record in neo4j_db.executor.data('nodes_by_ids', node_ids=list(selected))}
+            for node_id, link in selected.items():
+                node = nodes.get(node_id)
+                if node is None:
+                    continue
+                all_entity_info.append({
+                    'id': node.identity,
+                    'name': node['name'],
+                    'type': node_type(node),
+                    'properties': {k: v for k, v in node.items()},
+                    'link': {'mention': link['mention'], 'score': link['score'], 'match': link['match']}
+                })
+        
+        if not all_entity_info:
+            return all_entity_info, all_relationships, all_paths
+        
+        # 3. 批量获取实体关系
+        relationships_map = self.get_entities_relationships(
+            [info['id'] for info in all_entity_info], neo4j_db)
+        for info in all_entity_info:
+            all_relationships.extend(relationships_map.get(info['id'], []))
+        
+        # 4. 搜索实体之间的路径
+        if len(all_entity_info) >= 2:
+            # 已处理的实体对，避免重复查询
+            processed_entity_pairs = set()
+            
+            for i in range(len(all_entity_info)):
+                for j in range(i+1, len(all_entity_info)):
+                    entity1_id = all_entity_info[i]['id']
+                    entity2_id = all_entity_info[j]['id']
+                    
+                    # 跳过相同的实体ID
+                    if entity1_id == entity2_id:
+                        continue
+                        
+                    # 创建一个排序后的实体ID对作为键，确保不重复查询
+                    entity_pair = tuple(sorted([entity1_id, entity2_id]))
+                    if entity_pair in processed_entity_pairs:
+                        continue
+                        
+                    processed_entity_pairs.add(entity_pair)
+                    
+                    # 搜索路径
+                    paths = self.search_paths_between_entities(entity1_id, entity2_id, neo4j_db)
+                    all_paths.extend(paths)
+        
+        return all_entity_info, all_relationships, all_paths
+    
+    def _not_found_answer(self, entities: List[str]) -> str:
+        return f"抱歉，我无法在知识库中找到与'{', '.join(entities)}'相关的地名信息。请尝试其他地名或检查拼写是否正确。"
+    
+    def _empty_result(self, answer: str, entities: List[str], start_time: float) -> Dict:
+        """无法查询图谱时的结果"""
+        return {
+            'answer': answer,
+            'entities': entities,
+            'kg_data': {'nodes': [], 'lines': []},
+            'process_time': time.time() - start_time
+        }
+    
+    def _build_result(self, answer: str, entities: List[str], entity_info: List[Dict],
+                      original_relationships: List[Dict], inferred_relationships: List[Dict],
+                      paths: List[Dict], start_time: float) -> Dict:
+        """构建可视化数据和关系上下文，组装最终结果"""
+        # 7. 构建知识图谱可视化数据（只使用原始关系，不含推理关系）
+        kg_data = self._convert_to_visual_data(entity_info, original_relationships, paths)
+        
+        # 8. 格式化关系数据为三元组格式（包含原始和推理关系，但推理关系明确标注）
+        context = self._format_relations_for_context(original_relationships, inferred_relationships)
+        
+        process_time = time.time() - start_time
+        print(f"问题处理完成，总耗时: {process_time:.2f}秒")
+        
+        return {
+            'answer': answer,
+            'entities': entities,
+            'kg_data': kg_data,
+            'context': context,  # 添加格式化后的关系上下文
+            'process_time': process_time
+        }
+    
+    def _error_result(self, error: Exception, entities: List[str], start_time: float) -> Dict:
+        """处理问题出错时的结果"""
+        print(f"处理问题时出错: {str(error)}")
+        import traceback
+        traceback.print_exc()
+        
+        return {
+            'answer': f"抱歉，处理您的问题时遇到了技术问题: {str(error)}",
+            'entities': entities,
+            'kg_data': {'nodes': [], 'lines': []},
+            'error': str(error),
+            'process_time': time.time() - start_time
+        }
     
     def _convert_to_visual_data(self, entities, relationships, paths):
         """将实体、关系和路径转换为可视化数据格式"""
@@ -836,11 +841,7 @@ class RuleLLMIntegration:
         # 添加实体节点
         for entity in entities:
             if entity['id'] not in node_ids:
-                nodes.append({
-                    'id': entity['id'],
-                    'name': entity['name'],
-                    'type': entity['type']
-                })
+                nodes.append(NodeRecord(entity['id'], entity['name'], entity['type']).brief())
                 node_ids.add(entity['id'])
         
         # 添加路径中的节点和关系
@@ -852,12 +853,7 @@ class RuleLLMIntegration:
                 # 添加节点
                 node_id = node.get('id')
                 if node_id not in node_ids:
-                    node_data = {
-                        'id': node_id,
-                        'name': node.get('name', '未命名'),
-                        'type': node.get('type', '')
-                    }
-                    nodes.append(node_data)
+                    nodes.append(NodeRecord(node_id, node.get('name', '未命名'), node.get('type', '')).brief())
                     node_ids.add(node_id)
                 
                 # 添加关系（从第二个节点开始）
@@ -893,21 +889,10 @@ class RuleLLMIntegration:
             relation_type = rel['relation']
             
             # 确保节点存在
-            if from_id not in node_ids:
-                nodes.append({
-                    'id': from_id,
-                    'name': rel['source']['name'],
-                    'type': rel['source']['type']
-                })
-                node_ids.add(from_id)
-            
-            if to_id not in node_ids:
-                nodes.append({
-                    'id': to_id,
-                    'name': rel['target']['name'],
-                    'type': rel['target']['type']
-                })
-                node_ids.add(to_id)
+            for end in (rel['source'], rel['target']):
+                if end['id'] not in node_ids:
+                    nodes.append(NodeRecord(end['id'], end['name'], end['type']).brief())
+                    node_ids.add(end['id'])
             
             # 创建唯一关系ID
             relation_id = f"{from_id}_{to_id}_{relation_type}"
@@ -916,16 +901,8 @@ class RuleLLMIntegration:
             if relation_id not in relation_ids:
                 relation_ids.add(relation_id)
                 
-                line_data = {
-                    'from': from_id,
-                    'to': to_id,
-                    'text': relation_type
-                }
-                
-                # 添加关系属性
-                if 'properties' in rel:
-                    for k, v in rel['properties'].items():
-                        line_data[k] = v
+                # 关系数据包含关系属性
+                line_data = LineRecord(from_id, to_id, relation_type, rel.get('properties')).to_dict()
                 
                 # 添加关系方向
                 if 'direction' in rel:
@@ -0,0 +1,181 @@
+"""
+流式数据导入管道
+逐条读取JSON数组中的主数据，经 规范化 -> 校验 -> 拆分关联实体 各阶段处理后分批写出，
+内存占用只与批大小有关，与输入数据量无关
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+# 每次从文件读取的字符数
+READ_CHUNK_SIZE = 64 * 1024
+
+# 主数据必填字段
+REQUIRED_FIELDS = ("实体类型", "实体名称", "实体关系", "关联实体类型", "关联实体")
+
+
+def iter_json_array(path, chunk_size=READ_CHUNK_SIZE):
+    """
+    增量解析JSON数组文件，逐个产出数组元素
+    缓冲区只保留尚未解析的部分，占用内存不超过单个元素加一个读取块
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        buffer = ''
+        position = 0
+        started = False
+        eof = False
+
+        def fill():
+            nonlocal buffer, position, eof
+            chunk = file.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            return bool(chunk)
+
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position >= len(buffer):
+                if not fill():
+                    raise ValueError(f"JSON数组不完整: {path}")
+                continue
+
+            char = buffer[position]
+            if not started:
+                if char != '[':
+                    raise ValueError(f"文件内容不是JSON数组: {path}")
+                started = True
+                position += 1
+            elif char == ']':
+                return
+            elif char == ',':
+                position += 1
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # 元素跨越了读取块的边界
+                    if fill():
+                        continue
+                    raise
+                if end >= len(buffer) and not eof:
+                    # 数字等标量可能在块边界被截断，读入更多内容后重新解析
+                    fill()
+                    continue
+                position = end
+                yield item
+
+
+def split_target_entities(entity2):
+    """
+    拆分关联实体（支持多个，以“、”或“,”分隔）
+    """
+    return entity2.split("、") if "、" in entity2 else entity2.split(",")
+
+
+def normalize_rows(rows):
+    """规范化阶段：去除字符串字段首尾空白"""
+    for row in rows:
+        if isinstance(row, dict):
+            yield {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+        else:
+            yield row
+
+
+def validate_rows(rows, stats=None):
+    """校验阶段：丢弃缺少必填字段的行"""
+    for row in rows:
+        if isinstance(row, dict) and all(row.get(field) for field in REQUIRED_FIELDS):
+            yield row
+        else:
+            print(f"数据不完整: {row}")
+            if stats is not None:
+                stats['invalid'] = stats.get('invalid', 0) + 1
+
+
+def split_targets(rows):
+    """拆分阶段：关联实体包含多个地名时拆分为多行，每行只有一个关联实体"""
+    for row in rows:
+        for target_entity in split_target_entities(row["关联实体"]):
+            target_entity = target_entity.strip()
+            if target_entity:
+                yield dict(row, 关联实体=target_entity)
+
+
+def batched(items, size):
+    """按固定大小分批"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ProgressReporter:
+    """处理进度和吞吐量报告"""
+
+    def __init__(self, title, every=10000):
+        self.title = title
+        self.every = every
+        self.count = 0
+        self.start_time = time.perf_counter()
+        self._next_report = every
+
+    def update(self, count=1):
+        self.count += count
+        if self.count >= self._next_report:
+            self.report()
+            self._next_report = (self.count // self.every + 1) * self.every
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.start_time
+        return self.count / elapsed if elapsed else 0.0
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start_time
+        print(f"{self.title}: 已处理{self.count}行, 耗时: {elapsed:.1f}秒, {self.rate:.0f}行/秒")
+
+
+class NameRegistry:
+    """
+    地名 -> 标签 登记表
+    保存在临时SQLite文件中，记录每个地名首次出现时的标签，内存占用与地名数量无关
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix='name_registry_', suffix='.db')
+            os.close(handle)
+            self._temporary = True
+        else:
+            self._temporary = False
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS names (name TEXT PRIMARY KEY, label TEXT NOT NULL)")
+
+    def register(self, name, label):
+        """
+        登记地名
+        :return: (该地名的标签, 是否为首次出现)
+        """
+        row = self._conn.execute("SELECT label FROM names WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0], False
+        self._conn.execute("INSERT INTO names (name, label) VALUES (?, ?)", (name, label))
+        return label, True
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+        if self._temporary and os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,10 +1,40 @@
+import base64
+import json
+import threading
+import time
+
 from py2neo import Graph, Node
 
+from graph_snapshot import GraphSnapshot
+from graph_stamp import DEFAULT_STAMP_PATH, STAMP_CHECK_INTERVAL, read_graph_stamp
+from query_executor import QueryExecutor
+from record_converter import LineRecord, NodeRecord, node_brief, node_to_dict, relationship_to_line
+from result_cache import ResultCache, cached_read
+from schema_catalog import SchemaCatalog
+from search_index import NameSearchIndex, split_aliases
+
+# 邻域展开的最大跳数和默认的单节点路径数上限
+MAX_EXPAND_HOPS = 3
+DEFAULT_EXPAND_FANOUT = 100
+MAX_EXPAND_FANOUT = 1000
+# 内存快照的最长使用时间（秒），用于感知导入脚本等外部写入
+SNAPSHOT_MAX_AGE = 300
+# 单次批量写入的最大操作数
+MAX_BULK_OPERATIONS = 1000
+# 批量写入支持的操作及其对应的命名查询
+BULK_OPERATION_QUERIES = {
+    'create': 'bulk_create_nodes',
+    'update': 'bulk_update_nodes',
+    'delete': 'bulk_delete_nodes',
+    'update_properties': 'bulk_update_properties',
+}
+
 
 class neo4j_db():
     '''neo4j的操作'''
 
-    def __init__(self, uri="bolt://localhost:7687", user=None, password=None, **kwargs):
+    def __init__(self, uri="bolt://localhost:7687", user=None, password=None, use_snapshot=True,
+                 use_result_cache=True, stamp_path=DEFAULT_STAMP_PATH, **kwargs):
         # 设置默认认证信息
         if user is None:
             user = "neo4j"
@@ -12,30 +42,58 @@ class neo4j_db():
             password = "123456"
         
         self.graph = Graph(uri, user=user, password=password)
+        # 所有查询统一经由执行层以参数化方式发送
+        self.executor = QueryExecutor(self.graph)
+        
+        # 图谱版本号，通过本实例写入图谱或发现外部变更标记变化时递增，用于使各类读缓存失效
+        self._graph_version = 0
+        # 导入脚本等外部写入者发布的变更标记，读取版本号时按STAMP_CHECK_INTERVAL检查
+        self.stamp_path = stamp_path
+        self.graph_stamp = read_graph_stamp(stamp_path)
+        self._stamp_checked_at = time.monotonic()
+        self._stamp_lock = threading.Lock()
+        # 名称/别名检索索引，首次搜索时构建，之后随节点写入增量更新；
+        # 外部变更标记变化或超过SNAPSHOT_MAX_AGE后重建
+        self.search_index = None
+        self.search_index_built_at = 0.0
+        self._search_index_lock = threading.Lock()
+        # 节点类型/关系类型目录
+        self.schema_catalog = SchemaCatalog(self.executor)
+        # 分词用户词典（UserDictionary），由应用设置，节点写入后增量加入新地名
+        self.user_dictionary = None
+        # 图谱内存快照，读接口优先由快照提供，写入后按版本号重新加载
+        self.use_snapshot = use_snapshot
+        self.snapshot = None
+        self._snapshot_lock = threading.Lock()
+        # 读接口结果缓存，以graph_version判断失效
+        self.result_cache = ResultCache() if use_result_cache else None
         
         # 直接设置APOC不可用，不进行检测
         self.apoc_available = False
         print("使用非APOC方式进行模糊匹配")
 
-    def find_node_page(self, current, limit, name_query):
-        # 计算分页参数
-        skip = (current - 1) * limit
-        # 构建Cypher查询
-        match_clause = "MATCH (n)"
-        where_clause = f"WHERE n.name CONTAINS '{name_query}'" if name_query else ""
-        return_clause = "RETURN id(n), labels(n), n.name"
-        order_by_clause = "ORDER BY n.name"
-        skip_limit_clause = f"SKIP {skip} LIMIT {limit}"
-        query = " ".join([match_clause, where_clause, return_clause, order_by_clause, skip_limit_clause])
+    def find_node_page(self, current, limit, name_query, cursor=None):
+        """
+        分页查询节点，按 (name, id) 排序
+        :param current: 页码，未提供游标时按页码跳转
+        :param limit: 每页数量
+        :param name_query: 名称过滤条件
+        :param cursor: 上一页返回的续页游标，提供时从游标位置继续读取，不受页深影响
+        :return: 总数、当前页记录和下一页游标
+        """
+        name_query = name_query or ''
+        position = self._decode_page_cursor(cursor, name_query)
         # 执行查询
-        results = self.graph.run(query).data()
-        # 获取总节点数（用于分页）
-        if name_query:
-            name_condition = f' {{name: "{name_query}"}}'
+        if position:
+            after_name, after_id = position
+            results = self.executor.data('find_node_page_after', name_query=name_query,
+                                         after_name=after_name, after_id=after_id, limit=limit)
         else:
-            name_condition = ''
-        count_query = f"MATCH (n{name_condition}) RETURN count(DISTINCT n)"
-        total_count = self.graph.run(count_query).evaluate() or 0
+            # 计算分页参数
+            skip = (current - 1) * limit
+            results = self.executor.data('find_node_page', name_query=name_query, skip=skip, limit=limit)
+        # 获取总节点数（用于分页）
+        total_count = self._get_page_total(name_query)
         # 返回结果
         nodes = []
         for record in results:
@@ -48,32 +106,209 @@ class neo4j_db():
                 "name": node_name
             })
 
+        # 本页已满时返回下一页游标
+        next_cursor = None
+        if nodes and len(nodes) == limit:
+            last = nodes[-1]
+            next_cursor = self._encode_page_cursor(last['name'] or '', last['id'], name_query)
+
         return {
             "total": total_count,
-            "records": nodes
+            "records": nodes,
+            "cursor": next_cursor
         }
 
+    @staticmethod
+    def _encode_page_cursor(name, node_id, name_query):
+        payload = json.dumps([name, node_id, name_query], ensure_ascii=False)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_page_cursor(cursor, name_query):
+        """解析续页游标，游标无效或与当前过滤条件不一致时返回None"""
+        if not cursor:
+            return None
+        try:
+            name, node_id, cursor_query = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if not isinstance(name, str) or not isinstance(cursor_query, str):
+                raise ValueError("游标格式错误")
+            node_id = int(node_id)
+        except Exception:
+            print(f"无效的分页游标: {cursor}")
+            return None
+        if cursor_query != name_query:
+            return None
+        return name, node_id
+
+    @cached_read
+    def _get_page_total(self, name_query):
+        """获取过滤条件下的节点总数，与其他读接口共用结果缓存（按图谱版本和ttl失效）"""
+        return self.executor.evaluate('find_node_page_count', name_query=name_query) or 0
+
+    @property
+    def graph_version(self):
+        """图谱版本号，读取前先检查外部变更标记"""
+        self._check_graph_stamp()
+        return self._graph_version
+
+    def _mark_graph_changed(self):
+        """图谱已写入：递增版本号，依赖图谱内容的缓存随之失效"""
+        self._graph_version += 1
+
+    def _check_graph_stamp(self):
+        """距上次检查超过STAMP_CHECK_INTERVAL时读取变更标记，标记变化说明图谱已被外部写入"""
+        if time.monotonic() - self._stamp_checked_at < STAMP_CHECK_INTERVAL:
+            return
+        with self._stamp_lock:
+            if time.monotonic() - self._stamp_checked_at < STAMP_CHECK_INTERVAL:
+                return
+            self._stamp_checked_at = time.monotonic()
+            stamp = read_graph_stamp(self.stamp_path)
+            if stamp == self.graph_stamp:
+                return
+            self.graph_stamp = stamp
+        print(f"检测到图谱外部变更: {stamp}")
+        self._graph_changed_externally()
+
+    def _graph_changed_externally(self):
+        """
+        图谱已被外部写入：递增版本号使快照和结果缓存失效，检索索引和模式目录重新加载，
+        分词用户词典在后台重新同步
+        """
+        # 先递增版本号，正在进行的检索索引构建据此判断结果已过期
+        self._mark_graph_changed()
+        self.search_index_built_at = 0.0
+        self.schema_catalog.invalidate()
+        if self.user_dictionary is not None:
+            def sync_user_dictionary():
+                try:
+                    self.user_dictionary.sync(self)
+                except Exception as e:
+                    print(f"从图谱同步分词用户词典失败: {str(e)}")
+
+            threading.Thread(target=sync_user_dictionary, daemon=True).start()
+
+    def _node_written(self, node_id, label, properties, created=False):
+        """节点已创建或更新：增量更新检索索引、模式目录和分词用户词典"""
+        if self.search_index is not None:
+            self.search_index.add(node_id, properties.get('name'), label, self._node_aliases(properties))
+        if created:
+            self.schema_catalog.node_created(label)
+        if self.user_dictionary is not None:
+            try:
+                self.user_dictionary.add_words([properties.get('name')] + self._node_aliases(properties))
+                if created and label:
+                    from user_dictionary import TAG_TYPE
+                    self.user_dictionary.add_words([label], TAG_TYPE)
+            except Exception as e:
+                print(f"更新分词用户词典失败: {str(e)}")
+        self._mark_graph_changed()
+
+    def _node_removed(self, node_id):
+        """节点已删除：从检索索引中移除，模式目录（含随节点删除的关系）重新加载"""
+        if self.search_index is not None:
+            self.search_index.remove(node_id)
+        self.schema_catalog.invalidate()
+        self._mark_graph_changed()
+
+    @staticmethod
+    def _node_aliases(properties):
+        """节点的别名（alias属性和导入的“别名”属性）"""
+        return split_aliases(properties.get('alias')) + split_aliases(properties.get('别名'))
+
+    def _search_index_fresh(self):
+        return self.search_index is not None and time.time() - self.search_index_built_at < SNAPSHOT_MAX_AGE
+
+    def _get_search_index(self):
+        """获取检索索引，首次使用或超过SNAPSHOT_MAX_AGE时从快照或图谱重建"""
+        if self._search_index_fresh():
+            return self.search_index
+        with self._search_index_lock:
+            if self._search_index_fresh():
+                return self.search_index
+            version = self.graph_version
+            index = NameSearchIndex()
+            snapshot = self._get_snapshot()
+            if snapshot is not None:
+                for i, props in enumerate(snapshot.node_props):
+                    labels = snapshot.node_labels[i]
+                    index.add(snapshot.node_ids[i], props.get('name'), labels[0] if labels else '',
+                              self._node_aliases(props))
+            else:
+                for record in self.executor.run('search_index_source'):
+                    aliases = split_aliases(record['alias']) + split_aliases(record['alias_cn'])
+                    index.add(record['id'], record['name'], record['labels'][0] if record['labels'] else '', aliases)
+            self.search_index = index
+            # 构建期间有写入时，新索引可能缺少这些写入，下次使用时再重建一次
+            self.search_index_built_at = time.time() if self.graph_version == version else 0.0
+            print(f"名称检索索引构建完成，共 {len(index)} 个节点")
+            return index
+
+    def names_version(self):
+        """名称数据的版本（图谱版本和检索索引构建时间），检索索引过期时先重建"""
+        self._get_search_index()
+        return self.graph_version, self.search_index_built_at
+
+    def _get_snapshot(self):
+        """
+        获取与当前图谱版本一致的内存快照
+        快照过期（有写入或超过SNAPSHOT_MAX_AGE）时重新加载；未启用或加载失败时返回None，由调用方退回Cypher查询
+        """
+        if not self.use_snapshot:
+            return None
+        snapshot = self.snapshot
+        if self._snapshot_fresh(snapshot):
+            return snapshot
+        with self._snapshot_lock:
+            snapshot = self.snapshot
+            if self._snapshot_fresh(snapshot):
+                return snapshot
+            try:
+                self.snapshot = GraphSnapshot.load(self.executor, version=self.graph_version)
+            except Exception as e:
+                print(f"加载图谱快照失败，使用Cypher查询: {str(e)}")
+                return None
+            return self.snapshot
+
+    def _snapshot_fresh(self, snapshot):
+        return (snapshot is not None and snapshot.version == self.graph_version
+                and time.time() - snapshot.loaded_at < SNAPSHOT_MAX_AGE)
+
+    def refresh_snapshot(self):
+        """立即重新加载内存快照（用于启动预热或外部导入之后）"""
+        if not self.use_snapshot:
+            return None
+        with self._snapshot_lock:
+            self.snapshot = GraphSnapshot.load(self.executor, version=self.graph_version)
+        # 检索索引在下次使用时从新快照重建
+        self.search_index_built_at = 0.0
+        return self.snapshot.stats()
+
     # 创建节点
     def create_node(self, label, name):
         node = Node(label, name=name)
         self.graph.create(node)
+        self._node_written(node.identity, label, dict(node), created=True)
         return node
 
     # 更新节点
     def update_node(self, label, node_id, new_name):
-        sql = f'MATCH (n:`{label}`) where id(n)={node_id} RETURN n'
-        result = self.graph.run(sql).data()
+        result = self.executor.data('node_by_label_and_id', schema={'label': label}, node_id=int(node_id))
         if result:
             # 从字典中提取节点对象
             node = result[0]['n']
             node["name"] = new_name
             self.graph.push(node)
+            self._node_written(node.identity, label, dict(node))
 
     # 获取节点详细信息
+    @cached_read
     def get_node_detail(self, node_id):
         """获取节点的所有属性"""
-        sql = f'MATCH (n) WHERE id(n)={node_id} RETURN n, labels(n) as labels'
-        result = self.graph.run(sql).data()
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            return snapshot.node_detail(node_id)
+        result = self.executor.data('node_detail', node_id=int(node_id))
         if result:
             node = result[0]['n']
             labels = result[0]['labels']
@@ -85,6 +320,16 @@ class neo4j_db():
             return node_properties
         return None
     
+    def get_query_stats(self):
+        """获取各命名查询的执行统计"""
+        return self.executor.stats()
+
+    def get_cache_stats(self):
+        """获取读结果缓存的命中统计"""
+        stats = self.result_cache.stats() if self.result_cache is not None else {}
+        stats['graph_version'] = self.graph_version
+        return stats
+
     # 更新节点所有属性
     def update_node_properties(self, node_id, properties):
         """更新节点的所有属性"""
@@ -92,8 +337,7 @@ class neo4j_db():
         prop_copy = {k: v for k, v in properties.items() if k not in ['id', 'type']}
         
         # 查询节点
-        sql = f'MATCH (n) WHERE id(n)={node_id} RETURN n, labels(n) as labels'
-        result = self.graph.run(sql).data()
+        result = self.executor.data('node_detail', node_id=int(node_id))
         if result:
             node = result[0]['n']
             labels = result[0]['labels']
@@ -109,127 +353,236 @@ class neo4j_db():
             
             # 保存更改
             self.graph.push(node)
+            self._node_written(node.identity, labels[0] if labels else '', dict(node))
             return True
         return False
 
     # 删除节点
     def delete_node(self, label, node_id):
-        sql = f'MATCH (n:`{label}`) where id(n)={node_id} RETURN n'
-        result = self.graph.run(sql).data()
+        result = self.executor.data('node_by_label_and_id', schema={'label': label}, node_id=int(node_id))
         if result:
             # 从字典中提取节点对象
             node = result[0]['n']
+            node_id = node.identity
             self.graph.delete(node)
+            self._node_removed(node_id)
+
+    def bulk_mutate(self, operations):
+        """
+        在一个事务中批量执行节点的增删改
+        连续的同类操作（同一操作、同一标签）合并为一次UNWIND语句，整体按提交顺序执行
+        :param operations: 操作列表，每项为
+            {"op": "create", "type": 标签, "name": 名称}
+            {"op": "update", "type": 标签, "id": 节点ID, "name": 新名称}
+            {"op": "delete", "type": 标签, "id": 节点ID}
+            {"op": "update_properties", "id": 节点ID, "properties": {...}}
+        :return: (是否提交成功, 每项操作的结果列表)
+        """
+        results = [{'index': i, 'op': (op or {}).get('op') if isinstance(op, dict) else None,
+                    'success': False} for i, op in enumerate(operations)]
+
+        # 校验并整理为批次：[(操作, 标签, [行])]
+        batches = []
+        for i, operation in enumerate(operations):
+            try:
+                op, label, row = self._prepare_bulk_row(i, operation)
+            except ValueError as e:
+                results[i]['error'] = str(e)
+                continue
+            if batches and batches[-1][0] == op and batches[-1][1] == label:
+                batches[-1][2].append(row)
+            else:
+                batches.append((op, label, [row]))
+
+        if not batches:
+            return True, results
+
+        # 在同一事务中执行所有批次
+        applied = []
+        tx = self.graph.begin()
+        try:
+            for op, label, rows in batches:
+                schema = {'label': label} if label is not None else None
+                for record in self.executor.data(BULK_OPERATION_QUERIES[op], schema=schema, tx=tx, rows=rows):
+                    applied.append((op, label, record))
+            self.graph.commit(tx)
+        except Exception as e:
+            self.graph.rollback(tx)
+            print(f"批量写入失败，事务已回滚: {str(e)}")
+            for _, _, rows in batches:
+                for row in rows:
+                    results[row['index']]['error'] = f"事务已回滚: {str(e)}"
+            return False, results
+
+        # 提交成功后记录结果并同步索引、目录等读模型
+        for op, label, record in applied:
+            item = results[record['index']]
+            item['success'] = True
+            item['id'] = record['id']
+            if op == 'create':
+                self._node_written(record['id'], label, {'name': operations[record['index']]['name']}, created=True)
+            elif op == 'update':
+                self._node_written(record['id'], label, record['props'])
+            elif op == 'update_properties':
+                labels = record['labels']
+                self._node_written(record['id'], labels[0] if labels else '', record['props'])
+            else:
+                self._node_removed(record['id'])
+        for _, _, rows in batches:
+            for row in rows:
+                if not results[row['index']]['success']:
+                    results[row['index']]['error'] = "节点不存在"
+
+        print(f"批量写入完成: {len(applied)}/{len(operations)} 项操作成功, 共 {len(batches)} 个批次")
+        return True, results
+
+    @staticmethod
+    def _prepare_bulk_row(index, operation):
+        """校验单项批量操作，返回 (操作, 标签, UNWIND行数据)"""
+        if not isinstance(operation, dict):
+            raise ValueError("操作格式不正确")
+        op = operation.get('op')
+        if op not in BULK_OPERATION_QUERIES:
+            raise ValueError(f"不支持的操作: {op}")
+
+        row = {'index': index}
+        label = None
+        if op != 'update_properties':
+            label = operation.get('type')
+            if not label:
+                raise ValueError("节点类型不能为空")
+        if op != 'create':
+            try:
+                row['id'] = int(operation.get('id'))
+            except (TypeError, ValueError):
+                raise ValueError("节点ID不能为空")
+        if op in ('create', 'update'):
+            if not operation.get('name'):
+                raise ValueError("节点名称不能为空")
+            row['name'] = operation['name']
+        if op == 'update_properties':
+            properties = operation.get('properties')
+            if not properties or not isinstance(properties, dict):
+                raise ValueError("节点属性格式不正确")
+            # 移除id和type，这些不是节点属性
+            properties = {k: v for k, v in properties.items() if k not in ['id', 'type']}
+            if any(isinstance(v, dict) for v in properties.values()):
+                raise ValueError("节点属性值不能为对象")
+            row['properties'] = properties
+        return op, label, row
 
     def get_node_types(self):
         """获取所有节点类型"""
-        query = """
-        MATCH (n)
-        RETURN DISTINCT labels(n) as types
-        """
-        results = self.graph.run(query)
-        node_types = []
-        for record in results:
-            # 获取第一个标签作为节点类型
-            if record['types']:
-                node_types.append(record['types'][0])
-        return sorted(node_types)
+        return self.schema_catalog.node_types()
 
     def get_relationship_types(self):
         """获取所有关系类型"""
-        query = """
-        MATCH ()-[r]-()
-        RETURN DISTINCT type(r) as type
-        """
-        results = self.graph.run(query)
-        rel_types = []
-        for record in results:
-            if record['type']:
-                rel_types.append(record['type'])
-        return sorted(rel_types)
+        return self.schema_catalog.relationship_types()
+
+    def get_schema_catalog(self):
+        """获取节点类型和关系类型及其数量"""
+        return self.schema_catalog.catalog()
+
+    def get_search_index(self):
+        """获取名称/别名检索索引（随节点写入增量更新）"""
+        return self._get_search_index()
 
+    def get_place_names(self):
+        """获取所有节点名称和别名（用于构建地名词典）"""
+        return self._get_search_index().names()
+
+    @cached_read
     def get_node_relations(self, node_id):
         """
         获取节点的所有直接关系
         :param node_id: 节点ID
         :return: 与节点直接相关的节点和关系
         """
-        sql = f"""
-        MATCH (n)-[r]-(m)
-        WHERE id(n) = {node_id}
-        RETURN n, r, m
+        return self.expand_nodes([node_id], hops=1, fanout=None)
+
+    def expand_paths(self, node_ids, hops=1, rel_types=None):
         """
-        result = self.graph.run(sql).data()
-        
+        批量查询多个节点的全部邻域路径（单次查询，不限制数量）
+        :param node_ids: 中心节点ID列表
+        :param hops: 展开跳数
+        :param rel_types: 只沿这些关系类型展开，为空时不限制
+        :return: [(中心节点, 路径列表)]
+        """
+        node_ids = list(dict.fromkeys(int(node_id) for node_id in node_ids))
+        if not node_ids:
+            return []
+        hops = max(1, min(int(hops), MAX_EXPAND_HOPS))
+        records = self.executor.data('expand_nodes_unbounded', schema={'hops': hops}, node_ids=node_ids,
+                                     rel_types=list(rel_types) if rel_types else None)
+        return [(record['c'], record['paths'] or []) for record in records]
+
+    def expand_relationships(self, node_ids, hops=1, rel_types=None, fanout=DEFAULT_EXPAND_FANOUT):
+        """
+        批量查询多个节点的邻域关系（单次查询）
+        :param fanout: 每个中心节点最多返回的不同关系数，为None时不限制
+        :return: [(中心节点, 关系列表)]
+        """
+        if fanout is None:
+            return [(center, [rel for path in paths for rel in path.relationships])
+                    for center, paths in self.expand_paths(node_ids, hops, rel_types)]
+        node_ids = list(dict.fromkeys(int(node_id) for node_id in node_ids))
+        if not node_ids:
+            return []
+        hops = max(1, min(int(hops), MAX_EXPAND_HOPS))
+        records = self.executor.data('expand_nodes', schema={'hops': hops}, node_ids=node_ids,
+                                     rel_types=list(rel_types) if rel_types else None, fanout=max(0, int(fanout)))
+        return [(record['c'], record['rels'] or []) for record in records]
+
+    @cached_read
+    def expand_nodes(self, node_ids, hops=1, rel_types=None, fanout=DEFAULT_EXPAND_FANOUT):
+        """
+        批量展开多个节点的邻域，合并为一个去重后的子图
+        :param node_ids: 中心节点ID列表
+        :param hops: 展开跳数（最大为MAX_EXPAND_HOPS）
+        :param rel_types: 只沿这些关系类型展开，为空时不限制
+        :param fanout: 每个中心节点最多展开的不同关系数，为None时不限制；快照和Cypher查询按相同单位计数
+        :return: 子图的节点和关系
+        """
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            hops = max(1, min(int(hops), MAX_EXPAND_HOPS))
+            return snapshot.expand(node_ids, hops, rel_types, fanout)
+
         nodes = []
         lines = []
-        node_ids = set()
-        
-        # 加入中心节点
-        center_node_sql = f"""
-        MATCH (n)
-        WHERE id(n) = {node_id}
-        RETURN n
-        """
-        center_result = self.graph.run(center_node_sql).data()
-        if center_result:
-            center_node = center_result[0]['n']
-            node_data = {
-                'id': center_node.identity,
-                'name': center_node['name'],
-                'type': list(center_node.labels)[0] if center_node.labels else ''
-            }
-            nodes.append(node_data)
-            node_ids.add(center_node.identity)
-        
-        for record in result:
-            # 添加关联节点
-            rel_node = record['m']
-            if rel_node.identity not in node_ids:
-                node_data = {
-                    'id': rel_node.identity,
-                    'name': rel_node['name'],
-                    'type': list(rel_node.labels)[0] if rel_node.labels else ''
-                }
-                nodes.append(node_data)
-                node_ids.add(rel_node.identity)
-            
-            # 添加关系
-            rel = record['r']
-            rel_type = type(rel).__name__
-            
-            # 构建关系数据
-            line_data = {
-                'from': rel.start_node.identity,
-                'to': rel.end_node.identity,
-                'text': rel_type
-            }
-            
-            # 添加关系属性，包括关系类型
-            for key, value in rel.items():
-                line_data[key] = value
-                
-            # 特别处理关系类型属性
-            if 'relation_type' in rel:
-                line_data['relation_category'] = rel['relation_type']
-            
-            lines.append(line_data)
-        
+        node_ids_seen = set()
+        rel_ids_seen = set()
+
+        def add_node(node):
+            if node.identity not in node_ids_seen:
+                nodes.append(node_brief(node))
+                node_ids_seen.add(node.identity)
+
+        for center_node, relationships in self.expand_relationships(node_ids, hops, rel_types, fanout):
+            # 加入中心节点
+            add_node(center_node)
+            for rel in relationships:
+                # 添加关系两端的节点
+                add_node(rel.start_node)
+                add_node(rel.end_node)
+                # 添加关系，按关系ID去重
+                if rel.identity not in rel_ids_seen:
+                    rel_ids_seen.add(rel.identity)
+                    lines.append(relationship_to_line(rel))
+
         return {"nodes": nodes, "lines": lines}
         
+    @cached_read
     def get_nodes_by_type(self, node_type):
         """
         根据节点类型获取节点列表
         :param node_type: 节点类型
         :return: 节点列表
         """
-        sql = f"""
-        MATCH (n:{node_type})
-        RETURN n
-        LIMIT 100
-        """
-        
-        result = self.graph.run(sql).data()
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            return snapshot.nodes_by_type(node_type, limit=100)
+        result = self.executor.data('nodes_by_type', schema={'label': node_type}, limit=100)
         
         if not result:
             return {"nodes": [], "lines": []}
@@ -239,33 +592,24 @@ class neo4j_db():
         
         for record in result:
             node = record['n']
-            node_id = node.identity
-            if node_id not in node_ids:
-                node_data = {
-                    'id': node_id,
-                    'name': node['name'],
-                    'type': node_type
-                }
-                nodes.append(node_data)
-                node_ids.add(node_id)
+            if node.identity not in node_ids:
+                nodes.append(NodeRecord(node.identity, node.get('name'), node_type).brief())
+                node_ids.add(node.identity)
             
         return {"nodes": nodes, "lines": []}
         
+    @cached_read
     def get_nodes_by_relationship(self, rel_type):
         """
         根据关系类型获取所有相关节点和关系
         :param rel_type: 关系类型
         :return: 相关节点和关系
         """
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            return snapshot.nodes_by_relationship(rel_type, limit=100)
         # 直接使用关系类型名称，不添加额外的修饰
-        sql = f"""
-        MATCH (n)-[r]-(m)
-        WHERE type(r) = '{rel_type}'
-        RETURN n, r, m
-        LIMIT 100
-        """
-        
-        result = self.graph.run(sql).data()
+        result = self.executor.data('nodes_by_relationship', rel_type=rel_type, limit=100)
         
         if not result:
             return {"nodes": [], "lines": []}
@@ -275,266 +619,243 @@ class neo4j_db():
         node_ids = set()
         
         for record in result:
-            # 添加源节点
-            source_node = record['n']
-            if source_node.identity not in node_ids:
-                source_data = {
-                    'id': source_node.identity,
-                    'name': source_node['name'],
-                    'type': list(source_node.labels)[0] if source_node.labels else ''
-                }
-                nodes.append(source_data)
-                node_ids.add(source_node.identity)
-                
-            # 添加目标节点
-            target_node = record['m']
-            if target_node.identity not in node_ids:
-                target_data = {
-                    'id': target_node.identity,
-                    'name': target_node['name'],
-                    'type': list(target_node.labels)[0] if target_node.labels else ''
-                }
-                nodes.append(target_data)
-                node_ids.add(target_node.identity)
+            # 添加源节点和目标节点
+            for node in (record['n'], record['m']):
+                if node.identity not in node_ids:
+                    nodes.append(node_brief(node))
+                    node_ids.add(node.identity)
                 
             # 添加关系
-            rel = record['r']
-            rel_type_name = type(rel).__name__
-            
-            # 构建关系数据
-            line_data = {
-                'from': rel.start_node.identity,
-                'to': rel.end_node.identity,
-                'text': rel_type_name
-            }
-            
-            # 添加关系属性，包括关系类型
-            for key, value in rel.items():
-                line_data[key] = value
-                
-            # 特别处理关系类型属性
-            if 'relation_type' in rel:
-                line_data['relation_category'] = rel['relation_type']
-            
-            lines.append(line_data)
+            lines.append(relationship_to_line(record['r']))
             
         return {"nodes": nodes, "lines": lines}
 
-
-    def search_nodes_by_name(self, search_text, limit=100):
+    def search_nodes_by_name(self, search_text, limit=100, prefix=False, fields=None):
         """
-        按节点名称进行模糊搜索
+        按节点名称和别名进行模糊搜索
         :param search_text: 搜索文本
         :param limit: 返回结果数量限制
-        :return: 匹配的节点列表
+        :param prefix: 是否为前缀（联想输入）搜索
+        :param fields: 节点字段投影（见record_converter.parse_fields），为None时返回全部属性
+        :return: 匹配的节点列表；查询出错时返回空结果，且不写入结果缓存
         """
         if not search_text:
             return {"nodes": [], "lines": []}
             
         try:
-            # 构建模糊搜索查询
-            search_text = search_text.replace("'", "\\'")  # 防止SQL注入
-            
-            cypher_query = f"""
-            MATCH (n)
-            WHERE toLower(n.name) CONTAINS toLower('{search_text}') 
-                  OR (n.alias IS NOT NULL AND toLower(n.alias) CONTAINS toLower('{search_text}'))
-            RETURN n, 
-                CASE 
-                    WHEN toLower(n.name) = toLower('{search_text}') THEN 1.0
-                    WHEN toLower(n.name) CONTAINS toLower('{search_text}') THEN 0.8
-                    WHEN n.alias IS NOT NULL AND toLower(n.alias) CONTAINS toLower('{search_text}') THEN 0.6
-                    ELSE 0.4
-                END as similarity
-            ORDER BY similarity DESC
-            LIMIT {limit}
-            """
-                
-            # 执行查询
-            result = self.graph.run(cypher_query).data()
-            
-            # 处理结果
-            nodes = []
-            for record in result:
-                node = record['n']
-                similarity = record['similarity']
-                
-                # 构建返回数据
-                node_data = {
-                    'id': node.identity,
-                    'name': node['name'],
-                    'type': list(node.labels)[0] if node.labels else '',
-                    'similarity': round(similarity, 2)
-                }
-                
-                # 添加其他属性
-                for prop in node:
-                    if prop != 'name':  # 名称已添加
-                        node_data[prop] = node[prop]
-                        
-                nodes.append(node_data)
-            
-            print(f"搜索 '{search_text}' 找到 {len(nodes)} 个匹配节点")
-            return {"nodes": nodes, "lines": []}
-                
+            return self._search_nodes_by_name(search_text, limit, prefix, fields)
         except Exception as e:
             print(f"节点名称搜索异常: {str(e)}")
             import traceback
             traceback.print_exc()
             return {"nodes": [], "lines": []}
 
-    def get_default_graph(self, limit=50, load_all=False):
+    @cached_read
+    def _search_nodes_by_name(self, search_text, limit, prefix, fields):
+        """按名称和别名搜索节点（出错时抛出异常，由search_nodes_by_name处理）"""
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            # 索引给出排序，快照提供节点属性，无需访问数据库
+            ranked = self._get_search_index().search(search_text, limit=limit, prefix=prefix)
+            nodes = []
+            for node_id, similarity in ranked:
+                record = snapshot.node_record(node_id)
+                if record is not None:
+                    node_data = record.to_dict(fields)
+                    node_data['similarity'] = round(similarity, 2)
+                    nodes.append(node_data)
+            print(f"搜索 '{search_text}' 找到 {len(nodes)} 个匹配节点")
+            return {"nodes": nodes, "lines": []}
+
+        result = self._search_records(search_text, limit, prefix)
+        
+        # 处理结果
+        nodes = []
+        for record in result:
+            node_data = node_to_dict(record['n'], fields)
+            node_data['similarity'] = round(record['similarity'], 2)
+            nodes.append(node_data)
+        
+        print(f"搜索 '{search_text}' 找到 {len(nodes)} 个匹配节点")
+        return {"nodes": nodes, "lines": []}
+
+    def _search_records(self, search_text, limit, prefix):
+        """通过检索索引得到排序后的 (节点, 相似度) 记录，索引不可用时退回Cypher查询"""
+        try:
+            ranked = self._get_search_index().search(search_text, limit=limit, prefix=prefix)
+        except Exception as e:
+            print(f"检索索引不可用，使用Cypher查询: {str(e)}")
+            return self.executor.data('search_nodes_by_name', search_text=search_text, limit=limit)
+        if not ranked:
+            return []
+        # 按ID批量取回节点属性，并保持索引给出的排序
+        node_map = {record['n'].identity: record['n']
+                    for record in self.executor.data('nodes_by_ids', node_ids=[node_id for node_id, _ in ranked])}
+        return [{'n': node_map[node_id], 'similarity': similarity}
+                for node_id, similarity in ranked if node_id in node_map]
+
+    def get_default_graph(self, limit=50, load_all=False, fields=None):
         """
         获取默认图谱数据
         :param limit: 返回的节点数量限制
         :param load_all: 是否加载所有节点和关系，不进行限制
-        :return: 包含节点和关系的图谱数据
+        :param fields: 节点/关系字段投影（见record_converter.parse_fields），为None时返回全部属性
+        :return: 包含节点和关系的图谱数据；查询出错时返回空图谱，且不写入结果缓存
         """
         try:
-            nodes = []
-            lines = []
-            node_ids = set()
+            return self._get_default_graph(limit, load_all, fields)
+        except Exception as e:
+            print(f"获取默认图谱数据异常: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return {"nodes": [], "lines": []}
+
+    @cached_read
+    def _get_default_graph(self, limit, load_all, fields):
+        """获取默认图谱数据（出错时抛出异常，由get_default_graph处理）"""
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            graph_data = snapshot.default_graph(limit=limit, load_all=load_all, fields=fields)
+            print(f"图谱加载(快照): {len(graph_data['nodes'])}个节点, {len(graph_data['lines'])}个关系, "
+                  f"{'加载全部' if load_all else '加载部分'}")
+            return graph_data
+
+        nodes = []
+        lines = []
+        node_ids = set()
+        
+        if load_all:
+            # 使用一种更可靠的方法保证连通性
+            # 1. 先获取所有节点
+            node_result = self.executor.data('all_nodes')
             
-            if load_all:
-                # 使用一种更可靠的方法保证连通性
-                # 1. 先获取所有节点
-                node_query = """
-                MATCH (n) 
-                RETURN n
-                """
-                node_result = self.graph.run(node_query).data()
-                
-                # 处理所有节点
-                for record in node_result:
-                    node = record['n']
-                    node_id = node.identity
-                    
-                    # 添加节点数据
-                    node_data = {
-                        'id': node_id,
-                        'name': node['name'],
-                        'type': list(node.labels)[0] if node.labels else ''
-                    }
-                    
-                    # 添加其他属性
-                    for prop in node:
-                        if prop != 'name':  # 名称已添加
-                            node_data[prop] = node[prop]
-                    
-                    nodes.append(node_data)
-                    node_ids.add(node_id)
-                
-                # 2. 获取所有关系 - 确保使用路径查询而非直接关系查询
-                path_query = """
-                MATCH path = (n)-[r*1..1]-(m)
-                RETURN relationships(path) as rels
-                """
-                path_result = self.graph.run(path_query).data()
-                
-                # 添加所有关系
-                processed_relations = set()  # 用于去重
-                
-                for record in path_result:
-                    for rel in record['rels']:
-                        rel_id = f"{rel.start_node.identity}-{rel.end_node.identity}-{type(rel).__name__}"
-                        
-                        # 避免重复添加相同关系
-                        if rel_id in processed_relations:
-                            continue
-                            
-                        processed_relations.add(rel_id)
-                        
-                        rel_type = type(rel).__name__
-                        
-                        # 构建关系数据
-                        line_data = {
-                            'from': rel.start_node.identity,
-                            'to': rel.end_node.identity,
-                            'text': rel_type
-                        }
-                        
-                        # 添加关系属性
-                        for key, value in rel.items():
-                            line_data[key] = value
-                            
-                        # 特别处理关系类型属性
-                        if 'relation_type' in rel:
-                            line_data['relation_category'] = rel['relation_type']
-                        
-                        lines.append(line_data)
-                
-            else:
-                # 原来的有限数据加载逻辑
-                node_query = f"""
-                MATCH (n)
-                RETURN n
-                LIMIT {limit}
-                """
-                
-                node_result = self.graph.run(node_query).data()
-                
-                if not node_result:
-                    return {"nodes": [], "lines": []}
-                    
-                # 处理节点数据
-                for record in node_result:
-                    node = record['n']
-                    node_id = node.identity
-                    
-                    # 添加节点数据
-                    node_data = {
-                        'id': node_id,
-                        'name': node['name'],
-                        'type': list(node.labels)[0] if node.labels else ''
-                    }
-                    
-                    # 添加其他属性
-                    for prop in node:
-                        if prop != 'name':  # 名称已添加
-                            node_data[prop] = node[prop]
-                    
-                    nodes.append(node_data)
-                    node_ids.add(node_id)
-                
-                # 获取这些节点之间的关系
-                if node_ids:
-                    # 限制关系数量
-                    node_id_list = ", ".join(map(str, node_ids))
-                    relation_query = f"""
-                    MATCH (n)-[r]-(m)
-                    WHERE id(n) IN [{node_id_list}] AND id(m) IN [{node_id_list}]
-                    RETURN r
-                    LIMIT {limit*2}
-                    """
-                    relation_result = self.graph.run(relation_query).data()
+            # 处理所有节点
+            for record in node_result:
+                node = record['n']
+                nodes.append(node_to_dict(node, fields))
+                node_ids.add(node.identity)
+            
+            # 2. 获取所有关系 - 确保使用路径查询而非直接关系查询
+            path_result = self.executor.data('all_paths')
+            
+            # 添加所有关系
+            processed_relations = set()  # 用于去重
+            
+            for record in path_result:
+                for rel in record['rels']:
+                    line = LineRecord.from_relationship(rel)
+                    rel_id = (line.source, line.target, line.text)
                     
-                    # 处理关系数据
-                    for record in relation_result:
-                        rel = record['r']
-                        rel_type = type(rel).__name__
-                        
-                        # 构建关系数据
-                        line_data = {
-                            'from': rel.start_node.identity,
-                            'to': rel.end_node.identity,
-                            'text': rel_type
-                        }
-                        
-                        # 添加关系属性
-                        for key, value in rel.items():
-                            line_data[key] = value
-                            
-                        # 特别处理关系类型属性
-                        if 'relation_type' in rel:
-                            line_data['relation_category'] = rel['relation_type']
+                    # 避免重复添加相同关系
+                    if rel_id in processed_relations:
+                        continue
                         
-                        lines.append(line_data)
+                    processed_relations.add(rel_id)
+                    lines.append(line.to_dict(fields))
             
-            print(f"图谱加载: {len(nodes)}个节点, {len(lines)}个关系, {'加载全部' if load_all else '加载部分'}")
-            return {"nodes": nodes, "lines": lines}
+        else:
+            # 原来的有限数据加载逻辑
+            node_result = self.executor.data('limited_nodes', limit=limit)
+            
+            if not node_result:
+                return {"nodes": [], "lines": []}
+                
+            # 处理节点数据
+            for record in node_result:
+                node = record['n']
+                nodes.append(node_to_dict(node, fields))
+                node_ids.add(node.identity)
             
+            # 获取这些节点之间的关系
+            if node_ids:
+                # 限制关系数量
+                relation_result = self.executor.data('relations_between',
+                                                     node_ids=list(node_ids), limit=limit * 2)
+                
+                # 处理关系数据
+                for record in relation_result:
+                    lines.append(relationship_to_line(record['r'], fields))
+        
+        print(f"图谱加载: {len(nodes)}个节点, {len(lines)}个关系, {'加载全部' if load_all else '加载部分'}")
+        return {"nodes": nodes, "lines": lines}
+
+    def iter_default_graph(self, fmt='json', chunk_size=500, fields=None):
+        """
+        流式导出全量图谱数据
+        节点和有向关系各读取一次，边读边写出，不在内存中构建完整结果
+        :param fmt: 输出格式，json为与/search_name_kg相同结构的分块JSON，ndjson为每行一条记录；
+            中途出错时json以 complete=false 和 error 字段结束，ndjson在末尾追加error记录
+        :param chunk_size: 每个输出块包含的记录数
+        :param fields: 节点/关系字段投影，为None时输出全部属性
+        :return: 字符串块生成器
+        """
+        if fmt == 'ndjson':
+            return self._iter_graph_ndjson(chunk_size, fields)
+        return self._iter_graph_json(chunk_size, fields)
+
+    def _iter_graph_items(self, fields=None):
+        """依次产出 ('node', 节点数据) 和 ('line', 关系数据)"""
+        for record in self.executor.run('export_nodes'):
+            yield 'node', NodeRecord.from_values(record['id'], record['labels'], record['props']).to_dict(fields)
+
+        for record in self.executor.run('export_relationships'):
+            line = LineRecord(record['from_id'], record['to_id'], record['type'], record['props'])
+            yield 'line', line.to_dict(fields)
+
+    def _iter_graph_ndjson(self, chunk_size, fields):
+        buffer = []
+        node_count = line_count = 0
+        try:
+            for kind, item in self._iter_graph_items(fields):
+                if kind == 'node':
+                    node_count += 1
+                else:
+                    line_count += 1
+                buffer.append(json.dumps({'kind': kind, 'data': item}, ensure_ascii=False))
+                if len(buffer) >= chunk_size:
+                    yield '\n'.join(buffer) + '\n'
+                    buffer = []
         except Exception as e:
-            print(f"获取默认图谱数据异常: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return {"nodes": [], "lines": []}
+            print(f"流式导出图谱数据异常: {str(e)}")
+            buffer.append(json.dumps({'kind': 'error', 'msg': str(e)}, ensure_ascii=False))
+        if buffer:
+            yield '\n'.join(buffer) + '\n'
+        print(f"图谱流式导出(ndjson): {node_count}个节点, {line_count}个关系")
+
+    def _iter_graph_json(self, chunk_size, fields):
+        yield '{"code": 200, "msg": "success", "data": {"nodes": ['
+        buffer = []
+        current_kind = 'node'
+        first = True
+        node_count = line_count = 0
+        try:
+            for kind, item in self._iter_graph_items(fields):
+                if kind != current_kind:
+                    # 节点输出完毕，切换到关系数组
+                    buffer.append('], "lines": [')
+                    current_kind = kind
+                    first = True
+                if kind == 'node':
+                    node_count += 1
+                else:
+                    line_count += 1
+                buffer.append(('' if first else ',') + json.dumps(item, ensure_ascii=False))
+                first = False
+                if len(buffer) >= chunk_size:
+                    yield ''.join(buffer)
+                    buffer = []
+        except Exception as e:
+            # 响应头已发出，以 complete 和 error 字段告知客户端导出不完整
+            print(f"流式导出图谱数据异常: {str(e)}")
+            error = str(e)
+        else:
+            error = None
+        if current_kind == 'node':
+            buffer.append('], "lines": [')
+        buffer.append(']}')
+        if error is None:
+            buffer.append(', "complete": true}')
+        else:
+            buffer.append(', "complete": false, "error": ' + json.dumps(error, ensure_ascii=False) + '}')
+        yield ''.join(buffer)
+        print(f"图谱流式导出(json): {node_count}个节点, {line_count}个关系")
@@ -0,0 +1,361 @@
+"""
+Cypher查询执行层
+集中管理命名查询，统一以参数化语句执行，并记录每个查询的调用次数、重复语句次数和耗时
+"""
+import re
+import threading
+import time
+
+
+# 命名查询注册表
+# 变量一律通过 $参数 传入，保证同一查询的语句文本固定，Neo4j可以复用已缓存的执行计划；
+# {{label}}、{{rel_type}}、{{max_depth}} 等为结构占位符，用于标签、关系类型、路径深度这类
+# 无法参数化的部分，其取值集合很小，每种取值只会产生一条固定语句
+QUERIES = {
+    # ---------- model_search.neo4j_db ----------
+    # 批量写入：同一操作、同一标签的连续条目合并为一次UNWIND
+    'bulk_create_nodes': """
+        UNWIND $rows AS row
+        CREATE (n:{{label}} {name: row.name})
+        RETURN row.index AS index, id(n) AS id
+    """,
+    'bulk_update_nodes': """
+        UNWIND $rows AS row
+        MATCH (n:{{label}})
+        WHERE id(n) = row.id
+        SET n.name = row.name
+        RETURN row.index AS index, id(n) AS id, properties(n) AS props
+    """,
+    'bulk_delete_nodes': """
+        UNWIND $rows AS row
+        MATCH (n:{{label}})
+        WHERE id(n) = row.id
+        WITH row, n, id(n) AS node_id
+        DETACH DELETE n
+        RETURN row.index AS index, node_id AS id
+    """,
+    'bulk_update_properties': """
+        UNWIND $rows AS row
+        MATCH (n)
+        WHERE id(n) = row.id
+        SET n = row.properties
+        RETURN row.index AS index, id(n) AS id, labels(n) AS labels, properties(n) AS props
+    """,
+
+    # 分页排序键为 (name, id)，名称为空的节点按空字符串排序
+    'find_node_page': """
+        MATCH (n)
+        WHERE $name_query = '' OR n.name CONTAINS $name_query
+        RETURN id(n), labels(n), n.name
+        ORDER BY coalesce(n.name, ''), id(n)
+        SKIP $skip LIMIT $limit
+    """,
+    'find_node_page_after': """
+        MATCH (n)
+        WHERE ($name_query = '' OR n.name CONTAINS $name_query)
+              AND (coalesce(n.name, '') > $after_name
+                   OR (coalesce(n.name, '') = $after_name AND id(n) > $after_id))
+        RETURN id(n), labels(n), n.name
+        ORDER BY coalesce(n.name, ''), id(n)
+        LIMIT $limit
+    """,
+    'find_node_page_count': """
+        MATCH (n)
+        WHERE $name_query = '' OR n.name CONTAINS $name_query
+        RETURN count(n)
+    """,
+    'node_by_label_and_id': """
+        MATCH (n:{{label}})
+        WHERE id(n) = $node_id
+        RETURN n
+    """,
+    'node_detail': """
+        MATCH (n)
+        WHERE id(n) = $node_id
+        RETURN n, labels(n) as labels
+    """,
+    # 模式目录：标签/关系类型取自数据库目录，计数走计数存储，均不扫描图数据
+    'catalog_labels': """
+        CALL db.labels() YIELD label
+        RETURN label
+    """,
+    'catalog_relationship_types': """
+        CALL db.relationshipTypes() YIELD relationshipType
+        RETURN relationshipType
+    """,
+    'count_label': """
+        MATCH (n:{{label}})
+        RETURN count(n)
+    """,
+    'count_relationship_type': """
+        MATCH ()-[r:{{rel_type}}]->()
+        RETURN count(r)
+    """,
+    # 批量邻域展开：一次查询返回多个中心节点及其邻域关系，
+    # 每个中心节点的不同关系数在子查询内以 LIMIT $fanout 限制（与 GraphSnapshot.expand 的计数单位相同），
+    # DISTINCT 和 LIMIT 均为惰性执行，不会先收集全部路径
+    'expand_nodes': """
+        UNWIND $node_ids AS center_id
+        MATCH (c)
+        WHERE id(c) = center_id
+        CALL {
+            WITH c
+            OPTIONAL MATCH p = (c)-[*1..{{hops}}]-(m)
+            WHERE $rel_types IS NULL OR all(r IN relationships(p) WHERE type(r) IN $rel_types)
+            UNWIND CASE WHEN p IS NULL THEN [null] ELSE relationships(p) END AS r
+            WITH DISTINCT r
+            LIMIT $fanout
+            RETURN collect(r) AS rels
+        }
+        RETURN c, rels
+    """,
+    # 不限制数量的邻域展开，返回路径，仅供内部查询节点的直接关系
+    'expand_nodes_unbounded': """
+        UNWIND $node_ids AS center_id
+        MATCH (c)
+        WHERE id(c) = center_id
+        OPTIONAL MATCH p = (c)-[*1..{{hops}}]-(m)
+        WHERE $rel_types IS NULL OR all(r IN relationships(p) WHERE type(r) IN $rel_types)
+        RETURN c, collect(p) AS paths
+    """,
+    'nodes_by_type': """
+        MATCH (n:{{label}})
+        RETURN n
+        LIMIT $limit
+    """,
+    'nodes_by_relationship': """
+        MATCH (n)-[r]-(m)
+        WHERE type(r) = $rel_type
+        RETURN n, r, m
+        LIMIT $limit
+    """,
+    'search_nodes_by_name': """
+        MATCH (n)
+        WHERE toLower(n.name) CONTAINS toLower($search_text)
+              OR (n.alias IS NOT NULL AND toLower(n.alias) CONTAINS toLower($search_text))
+        RETURN n,
+            CASE
+                WHEN toLower(n.name) = toLower($search_text) THEN 1.0
+                WHEN toLower(n.name) CONTAINS toLower($search_text) THEN 0.8
+                WHEN n.alias IS NOT NULL AND toLower(n.alias) CONTAINS toLower($search_text) THEN 0.6
+                ELSE 0.4
+            END as similarity
+        ORDER BY similarity DESC
+        LIMIT $limit
+    """,
+    'search_index_source': """
+        MATCH (n)
+        RETURN id(n) AS id, labels(n) AS labels, n.name AS name, n.alias AS alias, n.`别名` AS alias_cn
+    """,
+    'nodes_by_ids': """
+        MATCH (n)
+        WHERE id(n) IN $node_ids
+        RETURN n
+    """,
+    'all_nodes': """
+        MATCH (n)
+        RETURN n
+    """,
+    'all_paths': """
+        MATCH path = (n)-[r*1..1]-(m)
+        RETURN relationships(path) as rels
+    """,
+    'limited_nodes': """
+        MATCH (n)
+        RETURN n
+        LIMIT $limit
+    """,
+    'relations_between': """
+        MATCH (n)-[r]-(m)
+        WHERE id(n) IN $node_ids AND id(m) IN $node_ids
+        RETURN r
+        LIMIT $limit
+    """,
+
+    # 流式导出：节点与有向关系各读取一次
+    'export_nodes': """
+        MATCH (n)
+        RETURN id(n) AS id, labels(n) AS labels, properties(n) AS props
+    """,
+    'export_relationships': """
+        MATCH (n)-[r]->(m)
+        RETURN id(n) AS from_id, id(m) AS to_id, type(r) AS type, properties(r) AS props
+    """,
+
+    # ---------- inference.RuleLLMIntegration ----------
+    'shortest_path': """
+        MATCH path = shortestPath((n)-[*1..{{max_depth}}]->(m))
+        WHERE ID(n) = $start_id AND ID(m) = $end_id
+        RETURN path
+    """,
+
+    # ---------- data_process 批量导入 ----------
+    # 节点按 (标签, 名称) 唯一，MERGE依赖该约束走唯一索引查找
+    'import_name_constraint': """
+        CREATE CONSTRAINT IF NOT EXISTS FOR (n:{{label}}) REQUIRE n.name IS UNIQUE
+    """,
+    'import_merge_nodes': """
+        UNWIND $rows AS row
+        MERGE (n:{{label}} {name: row.name})
+        SET n += row.props
+        RETURN count(n) AS count
+    """,
+    'import_merge_relationships': """
+        UNWIND $rows AS row
+        MATCH (a:{{src_label}} {name: row.src})
+        MATCH (b:{{dst_label}} {name: row.dst})
+        MERGE (a)-[r:{{rel_type}}]->(b)
+        SET r += row.props
+        RETURN count(r) AS count
+    """,
+    # 增量导入：删除上次导入后已不存在的节点和关系
+    'import_delete_nodes': """
+        UNWIND $rows AS row
+        MATCH (n:{{label}} {name: row.name})
+        DETACH DELETE n
+        RETURN count(*) AS count
+    """,
+    'import_delete_relationships': """
+        UNWIND $rows AS row
+        MATCH (a:{{src_label}} {name: row.src})-[r:{{rel_type}}]->(b:{{dst_label}} {name: row.dst})
+        DELETE r
+        RETURN count(*) AS count
+    """,
+}
+
+_SCHEMA_SLOT = re.compile(r'\{\{(\w+)\}\}')
+
+
+def quote_identifier(value):
+    """将标签/关系类型转义为Cypher标识符"""
+    return '`' + str(value).replace('`', '``') + '`'
+
+
+class QueryExecutor:
+    """
+    命名查询执行器
+    所有查询都通过名称从注册表中取出，以参数化方式执行，并按名称累计执行统计
+    """
+
+    def __init__(self, graph, queries=None):
+        self.graph = graph
+        self._queries = {}
+        # 已渲染的语句缓存：(查询名, 结构占位符取值) -> 语句文本
+        self._statements = {}
+        # 已发送过的语句文本，再次发送时Neo4j会直接命中计划缓存
+        self._seen_statements = set()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.register_many(QUERIES if queries is None else queries)
+
+    def register(self, name, cypher):
+        """注册命名查询"""
+        with self._lock:
+            self._queries[name] = cypher.strip()
+            # 查询文本变化后，旧的渲染结果失效
+            for key in [key for key in self._statements if key[0] == name]:
+                del self._statements[key]
+
+    def register_many(self, queries):
+        """批量注册命名查询"""
+        for name, cypher in queries.items():
+            self.register(name, cypher)
+
+    def statement(self, query, schema=None):
+        """获取命名查询渲染后的语句文本"""
+        key = (query, tuple(sorted(schema.items())) if schema else ())
+        cached = self._statements.get(key)
+        if cached is not None:
+            return cached
+
+        if query not in self._queries:
+            raise KeyError(f"未注册的查询: {query}")
+        schema = schema or {}
+
+        def replace(match):
+            slot = match.group(1)
+            if slot not in schema:
+                raise ValueError(f"查询 {query} 缺少结构占位符: {slot}")
+            value = schema[slot]
+            if isinstance(value, int):
+                return str(value)
+            return quote_identifier(value)
+
+        rendered = _SCHEMA_SLOT.sub(replace, self._queries[query])
+        with self._lock:
+            self._statements[key] = rendered
+        return rendered
+
+    def run(self, query, schema=None, tx=None, **parameters):
+        """执行命名查询，返回游标（用于流式读取，只统计发送耗时）"""
+        statement = self.statement(query, schema)
+        start_time = time.perf_counter()
+        try:
+            runner = tx if tx is not None else self.graph
+            cursor = runner.run(statement, parameters)
+        except Exception:
+            self._record(query, statement, time.perf_counter() - start_time, failed=True)
+            raise
+        self._record(query, statement, time.perf_counter() - start_time)
+        return cursor
+
+    def data(self, query, schema=None, tx=None, **parameters):
+        """执行命名查询并返回全部记录（字典列表）"""
+        return self._consume(query, schema, tx, parameters, lambda cursor: cursor.data())
+
+    def evaluate(self, query, schema=None, tx=None, **parameters):
+        """执行命名查询并返回第一条记录的第一个值"""
+        return self._consume(query, schema, tx, parameters, lambda cursor: cursor.evaluate())
+
+    def _consume(self, query, schema, tx, parameters, reader):
+        statement = self.statement(query, schema)
+        start_time = time.perf_counter()
+        try:
+            runner = tx if tx is not None else self.graph
+            result = reader(runner.run(statement, parameters))
+        except Exception:
+            self._record(query, statement, time.perf_counter() - start_time, failed=True)
+            raise
+        self._record(query, statement, time.perf_counter() - start_time)
+        return result
+
+    def _record(self, query, statement, elapsed, failed=False):
+        with self._lock:
+            stats = self._stats.get(query)
+            if stats is None:
+                stats = self._stats[query] = {
+                    'calls': 0,
+                    'errors': 0,
+                    'repeat_statements': 0,
+                    'total_time': 0.0,
+                    'max_time': 0.0,
+                }
+            stats['calls'] += 1
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+            if failed:
+                stats['errors'] += 1
+            if statement in self._seen_statements:
+                stats['repeat_statements'] += 1
+            else:
+                self._seen_statements.add(statement)
+
+    def stats(self):
+        """
+        获取各查询的执行统计
+        repeat_statements 为本进程此前已发送过相同语句文本的次数（客户端统计，并非服务端执行计划缓存的命中数，
+        只说明语句文本保持稳定、服务端有条件复用已缓存的执行计划）
+        """
+        with self._lock:
+            result = {}
+            for query, stats in self._stats.items():
+                item = dict(stats)
+                item['avg_time'] = stats['total_time'] / stats['calls'] if stats['calls'] else 0.0
+                item['repeat_statement_rate'] = stats['repeat_statements'] / stats['calls'] if stats['calls'] else 0.0
+                result[query] = item
+            return result
+
+    def reset_stats(self):
+        """清空执行统计"""
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,140 @@
+"""
+节点/关系数据转换
+将py2neo节点、关系或快照中的原始值统一转换为接口返回的 node/line 字典，
+支持字段投影，只输出调用方需要的字段
+"""
+
+# 节点简要字段
+NODE_BRIEF_FIELDS = ('id', 'name', 'type')
+
+
+def node_type(node):
+    """节点类型：取第一个标签"""
+    return next(iter(node.labels), '')
+
+
+def relationship_type(rel):
+    """关系类型名称"""
+    return type(rel).__name__
+
+
+def parse_fields(fields):
+    """
+    解析字段投影参数
+    :param fields: 字段列表或逗号分隔的字符串，为空表示返回全部字段
+    :return: 字段集合（总是包含id），或None
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    selected = {field.strip() for field in fields if field and field.strip()}
+    if not selected:
+        return None
+    selected.add('id')
+    return frozenset(selected)
+
+
+class NodeRecord:
+    """节点记录，属性直接引用来源对象，转换为字典时一次性按投影输出"""
+
+    __slots__ = ('id', 'name', 'type', 'props')
+
+    def __init__(self, node_id, name, type_name, props=None):
+        self.id = node_id
+        self.name = name
+        self.type = type_name
+        self.props = props
+
+    @classmethod
+    def from_node(cls, node):
+        """由py2neo节点构建"""
+        return cls(node.identity, node.get('name'), node_type(node), node)
+
+    @classmethod
+    def from_values(cls, node_id, labels, props):
+        """由ID、标签列表和属性字典构建"""
+        return cls(node_id, props.get('name'), labels[0] if labels else '', props)
+
+    def to_dict(self, fields=None):
+        """
+        转换为接口返回的节点数据
+        :param fields: 投影字段集合，为None时输出全部属性
+        """
+        if fields is None:
+            data = {'id': self.id, 'name': self.name, 'type': self.type}
+            if self.props:
+                for key, value in self.props.items():
+                    if key != 'name':
+                        data[key] = value
+            return data
+
+        data = {'id': self.id}
+        if 'name' in fields:
+            data['name'] = self.name
+        if 'type' in fields:
+            data['type'] = self.type
+        if self.props and len(fields) > len(data):
+            for key in fields:
+                if key not in data and key in self.props:
+                    data[key] = self.props[key]
+        return data
+
+    def brief(self):
+        """只包含 id/name/type 的节点数据"""
+        return {'id': self.id, 'name': self.name, 'type': self.type}
+
+
+class LineRecord:
+    """关系记录，转换为前端图谱使用的 line 数据"""
+
+    __slots__ = ('source', 'target', 'text', 'props')
+
+    def __init__(self, source, target, text, props=None):
+        self.source = source
+        self.target = target
+        self.text = text
+        self.props = props
+
+    @classmethod
+    def from_relationship(cls, rel):
+        """由py2neo关系构建"""
+        return cls(rel.start_node.identity, rel.end_node.identity, relationship_type(rel), rel)
+
+    def to_dict(self, fields=None):
+        """
+        转换为接口返回的关系数据，relation_type 属性同时输出为 relation_category
+        :param fields: 投影字段集合，为None时输出全部属性；from/to/text 总是输出
+        """
+        data = {'from': self.source, 'to': self.target, 'text': self.text}
+        props = self.props
+        if not props:
+            return data
+        if fields is None:
+            for key, value in props.items():
+                data[key] = value
+            if 'relation_type' in props:
+                data['relation_category'] = props['relation_type']
+            return data
+
+        for key in fields:
+            if key in props:
+                data[key] = props[key]
+        if 'relation_category' in fields and 'relation_type' in props:
+            data['relation_category'] = props['relation_type']
+        return data
+
+
+def node_to_dict(node, fields=None):
+    """py2neo节点转换为节点数据"""
+    return NodeRecord.from_node(node).to_dict(fields)
+
+
+def node_brief(node):
+    """py2neo节点转换为 id/name/type 节点数据"""
+    return NodeRecord.from_node(node).brief()
+
+
+def relationship_to_line(rel, fields=None):
+    """py2neo关系转换为关系数据"""
+    return LineRecord.from_relationship(rel).to_dict(fields)
@@ -0,0 +1,125 @@
+"""
+读结果缓存
+按 (方法, 规范化参数) 缓存图谱读接口的返回结果，按条目数和字节数做LRU淘汰，
+并以图谱版本号判断失效
+"""
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    带版本号的LRU结果缓存
+    每个条目记录写入时的图谱版本号，版本号变化（图谱被写入）或超过ttl后视为失效
+    """
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+
+    def get(self, key, version):
+        """读取缓存，返回 (是否命中, 结果)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, stored_at, size, value = entry
+                if entry_version == version and time.time() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, value
+                # 图谱已变化或已超时
+                self._remove(key)
+                self._expired += 1
+            self._misses += 1
+            return False, None
+
+    def put(self, key, version, value):
+        """写入缓存，超过字节上限的单个结果不缓存"""
+        size = len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, time.time(), size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """命中率及容量统计"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expired': self._expired,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
+
+
+def _freeze(value):
+    """将参数转换为可哈希的规范形式"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def cached_read(method):
+    """
+    读方法缓存装饰器
+    要求实例提供 result_cache（ResultCache，可为None表示不缓存）和 graph_version 属性
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = getattr(self, 'result_cache', None)
+        if cache is None:
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple((name, _freeze(value)) for name, value in bound.arguments.items() if name != 'self')
+        key = (method.__name__, arguments)
+        version = self.graph_version
+        hit, value = cache.get(key, version)
+        if hit:
+            return value
+        value = method(self, *args, **kwargs)
+        cache.put(key, version, value)
+        return value
+
+    return wrapper
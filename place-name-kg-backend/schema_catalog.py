@@ -0,0 +1,76 @@
+"""
+图谱模式目录
+缓存节点类型和关系类型及其数量，供类型列表接口直接读取
+"""
+import threading
+
+
+class SchemaCatalog:
+    """
+    节点类型/关系类型目录
+    类型名称来自数据库的标签和关系类型目录，数量来自计数存储，均无需扫描图数据；
+    结果缓存在内存中，节点写入时增量维护或标记失效
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._lock = threading.Lock()
+        # 类型 -> 数量，为None表示需要重新加载
+        self._label_counts = None
+        self._rel_type_counts = None
+
+    def invalidate(self):
+        """标记目录失效，下次读取时重新加载"""
+        with self._lock:
+            self._label_counts = None
+            self._rel_type_counts = None
+
+    def node_created(self, label):
+        """新建节点后增量更新节点类型数量"""
+        with self._lock:
+            if self._label_counts is not None and label:
+                self._label_counts[label] = self._label_counts.get(label, 0) + 1
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._label_counts is not None and self._rel_type_counts is not None:
+                return self._label_counts, self._rel_type_counts
+
+            label_counts = {}
+            for record in self.executor.data('catalog_labels'):
+                label = record['label']
+                count = self.executor.evaluate('count_label', schema={'label': label}) or 0
+                # 标签目录中可能保留已无节点的标签
+                if count:
+                    label_counts[label] = count
+
+            rel_type_counts = {}
+            for record in self.executor.data('catalog_relationship_types'):
+                rel_type = record['relationshipType']
+                count = self.executor.evaluate('count_relationship_type', schema={'rel_type': rel_type}) or 0
+                if count:
+                    rel_type_counts[rel_type] = count
+
+            self._label_counts = label_counts
+            self._rel_type_counts = rel_type_counts
+            print(f"模式目录已加载: {len(label_counts)} 种节点类型, {len(rel_type_counts)} 种关系类型")
+            return label_counts, rel_type_counts
+
+    def node_types(self):
+        """所有节点类型（排序后）"""
+        label_counts, _ = self._ensure_loaded()
+        return sorted(label_counts)
+
+    def relationship_types(self):
+        """所有关系类型（排序后）"""
+        _, rel_type_counts = self._ensure_loaded()
+        return sorted(rel_type_counts)
+
+    def catalog(self):
+        """带数量的完整目录"""
+        label_counts, rel_type_counts = self._ensure_loaded()
+        return {
+            'node_types': [{'type': label, 'count': label_counts[label]} for label in sorted(label_counts)],
+            'relationship_types': [{'type': rel_type, 'count': rel_type_counts[rel_type]}
+                                   for rel_type in sorted(rel_type_counts)]
+        }
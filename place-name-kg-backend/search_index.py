@@ -0,0 +1,267 @@
+"""
+地名检索索引
+基于名称和别名的字符n-gram倒排索引，支持排序的模糊搜索、前缀（联想输入）搜索和增量更新
+"""
+import bisect
+import re
+import threading
+
+# 别名字段中多个别名之间的分隔符
+_ALIAS_SEPARATOR = re.compile(r'[、，,；;/\s]+')
+
+# 各匹配方式的相似度得分
+SCORE_EXACT = 1.0
+SCORE_PREFIX = 0.9
+SCORE_CONTAINS = 0.8
+SCORE_ALIAS_EXACT = 0.7
+SCORE_ALIAS_CONTAINS = 0.6
+# n-gram重叠（模糊）匹配的最高得分及最低重叠度
+SCORE_FUZZY_MAX = 0.5
+FUZZY_MIN_OVERLAP = 0.5
+
+
+def split_aliases(value):
+    """将别名属性拆分为别名列表"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        values = value
+    else:
+        values = _ALIAS_SEPARATOR.split(str(value))
+    return [alias.strip() for alias in values if alias and alias.strip()]
+
+
+def _grams(text):
+    """生成文本的一元和二元字符片段"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _bigrams(text):
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def edit_distance(a, b, max_distance=None):
+    """
+    两个字符串的编辑距离（Levenshtein）
+    给定max_distance时，距离超过上限即提前返回 max_distance + 1
+    """
+    if max_distance is not None and abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class NameSearchIndex:
+    """
+    名称/别名倒排索引
+    每个检索键（名称或别名，统一小写）拆分为一元和二元字符片段建立倒排表，
+    查询时以片段倒排表求交得到候选，再按匹配方式打分排序
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # 节点ID -> {'name', 'type', 'aliases'}
+        self._docs = {}
+        # 片段 -> {节点ID}
+        self._postings = {}
+        # 有序的 (小写检索键, 节点ID)，用于前缀搜索
+        self._sorted_keys = []
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, node_id):
+        return node_id in self._docs
+
+    def names(self):
+        """所有已索引的名称和别名"""
+        with self._lock:
+            names = []
+            for doc in self._docs.values():
+                if doc['name']:
+                    names.append(doc['name'])
+                names.extend(doc['aliases'])
+            return names
+
+    def get(self, node_id):
+        """获取已索引节点的名称、类型和别名"""
+        doc = self._docs.get(node_id)
+        return dict(doc) if doc else None
+
+    def add(self, node_id, name, node_type='', aliases=None):
+        """添加或更新一个节点"""
+        with self._lock:
+            if node_id in self._docs:
+                self.remove(node_id)
+            name = name or ''
+            aliases = [alias for alias in split_aliases(aliases) if alias != name]
+            self._docs[node_id] = {'name': name, 'type': node_type or '', 'aliases': aliases}
+            for key in self._keys(name, aliases):
+                for gram in _grams(key):
+                    self._postings.setdefault(gram, set()).add(node_id)
+                bisect.insort(self._sorted_keys, (key, node_id))
+
+    def remove(self, node_id):
+        """移除一个节点"""
+        with self._lock:
+            doc = self._docs.pop(node_id, None)
+            if not doc:
+                return
+            for key in self._keys(doc['name'], doc['aliases']):
+                for gram in _grams(key):
+                    ids = self._postings.get(gram)
+                    if ids is not None:
+                        ids.discard(node_id)
+                        if not ids:
+                            del self._postings[gram]
+                position = bisect.bisect_left(self._sorted_keys, (key, node_id))
+                if position < len(self._sorted_keys) and self._sorted_keys[position] == (key, node_id):
+                    del self._sorted_keys[position]
+
+    def lookup(self, key):
+        """
+        名称或别名与key完全相同（不区分大小写）的节点
+        :return: 节点ID列表
+        """
+        key = (key or '').strip().lower()
+        if not key:
+            return []
+        with self._lock:
+            node_ids = []
+            position = bisect.bisect_left(self._sorted_keys, (key,))
+            while position < len(self._sorted_keys) and self._sorted_keys[position][0] == key:
+                node_ids.append(self._sorted_keys[position][1])
+                position += 1
+            return node_ids
+
+    def near_keys(self, text, max_edits):
+        """
+        名称或别名与text的编辑距离不超过max_edits的节点
+        以一元片段倒排表计数筛选候选：编辑距离为k时，text中至少有 字符数 - k 个字符出现在检索键中
+        :return: (节点ID, 检索键, 编辑距离) 列表
+        """
+        query = (text or '').strip().lower()
+        chars = set(query)
+        if not query or max_edits <= 0:
+            return []
+        with self._lock:
+            shared = {}
+            for char in chars:
+                for node_id in self._postings.get(char, ()):
+                    shared[node_id] = shared.get(node_id, 0) + 1
+            required = len(chars) - max_edits
+            matches = []
+            for node_id, count in shared.items():
+                if count < required:
+                    continue
+                doc = self._docs[node_id]
+                for key in self._keys(doc['name'], doc['aliases']):
+                    distance = edit_distance(query, key, max_edits)
+                    if distance <= max_edits:
+                        matches.append((node_id, key, distance))
+            return matches
+
+    @staticmethod
+    def _keys(name, aliases):
+        keys = []
+        for value in [name] + list(aliases):
+            key = value.lower()
+            if key and key not in keys:
+                keys.append(key)
+        return keys
+
+    def search(self, text, limit=100, prefix=False):
+        """
+        搜索节点
+        :param text: 搜索文本
+        :param limit: 返回结果数量限制
+        :param prefix: 为True时只返回名称或别名以搜索文本开头的节点（联想输入）
+        :return: 按相似度降序排列的 (节点ID, 相似度) 列表
+        """
+        query = (text or '').strip().lower()
+        if not query:
+            return []
+        with self._lock:
+            if prefix:
+                scored = self._search_prefix(query)
+            else:
+                scored = self._search_contains(query)
+            ranked = sorted(scored.items(),
+                            key=lambda item: (-item[1], len(self._docs[item[0]]['name']),
+                                              self._docs[item[0]]['name'], item[0]))
+        return ranked[:limit]
+
+    def _search_prefix(self, query):
+        scored = {}
+        position = bisect.bisect_left(self._sorted_keys, (query,))
+        while position < len(self._sorted_keys):
+            key, node_id = self._sorted_keys[position]
+            if not key.startswith(query):
+                break
+            scored[node_id] = max(scored.get(node_id, 0), self._score(node_id, query))
+            position += 1
+        return scored
+
+    def _search_contains(self, query):
+        # 所有片段都出现的候选才可能包含搜索文本
+        query_grams = _grams(query)
+        postings = [self._postings.get(gram, set()) for gram in query_grams]
+        postings.sort(key=len)
+        candidates = set(postings[0]) if postings else set()
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+
+        scored = {}
+        for node_id in candidates:
+            score = self._score(node_id, query)
+            if score:
+                scored[node_id] = score
+
+        # n-gram重叠的模糊匹配（搜索文本中部分字符不一致）
+        if len(query) >= 3:
+            query_bigrams = _bigrams(query)
+            overlap = {}
+            for gram in query_bigrams:
+                for node_id in self._postings.get(gram, ()):
+                    if node_id not in scored:
+                        overlap[node_id] = overlap.get(node_id, 0) + 1
+            for node_id, shared in overlap.items():
+                doc = self._docs[node_id]
+                best = 0.0
+                for key in self._keys(doc['name'], doc['aliases']):
+                    key_bigrams = _bigrams(key)
+                    # Dice系数衡量两组二元片段的重叠程度
+                    dice = 2 * len(query_bigrams & key_bigrams) / (len(query_bigrams) + len(key_bigrams))
+                    best = max(best, dice)
+                if best >= FUZZY_MIN_OVERLAP:
+                    scored[node_id] = round(SCORE_FUZZY_MAX * best, 2)
+        return scored
+
+    def _score(self, node_id, query):
+        doc = self._docs[node_id]
+        name = doc['name'].lower()
+        if name == query:
+            return SCORE_EXACT
+        if name.startswith(query):
+            return SCORE_PREFIX
+        if query in name:
+            return SCORE_CONTAINS
+        aliases = [alias.lower() for alias in doc['aliases']]
+        if query in aliases:
+            return SCORE_ALIAS_EXACT
+        if any(query in alias for alias in aliases):
+            return SCORE_ALIAS_CONTAINS
+        return 0
@@ -0,0 +1,187 @@
+"""
+合成地名数据生成
+按 data/data.json 的字段结构生成任意规模的主数据，并为部分地名生成 result/*.json 属性文件，
+用于评估导入在大数据量下的表现。主数据边生成边写出，不在内存中保存
+"""
+import argparse
+import json
+import os
+import random
+
+# 地名用字
+NAME_CHARS = ('安 宁 平 昌 江 山 阳 城 德 兴 丰 华 清 河 东 西 南 北 武 康 乐 长 泰 永 新 金 云 龙 凤 崇 '
+              '福 海 湖 溪 桥 台 林 松 石 宝 庆 嘉 信 和 通 文 宣 绍 镇 远 沙 田 阜 济 顺 凌 怀 靖 建 合').split()
+
+# 地名类型及权重（参照 data.json 中的分布）
+ENTITY_TYPES = [('县', 40), ('区', 10), ('州', 8), ('地区', 7), ('县级市', 5), ('乡', 3), ('府', 3),
+                ('直隶州', 2), ('市', 2), ('郡', 2), ('镇', 2), ('路', 1), ('厅', 1), ('军', 1), ('道', 1)]
+
+# 上级地名类型
+PARENT_TYPES = {
+    '县': ['州', '府', '郡', '地区', '市'], '区': ['市'], '州': ['路', '道', '府'], '地区': ['道', '府'],
+    '县级市': ['地区', '市'], '乡': ['县'], '府': ['路', '道'], '直隶州': ['道'], '市': ['地区', '道'],
+    '郡': ['道'], '镇': ['县', '区'], '路': ['道'], '厅': ['府'], '军': ['路'], '道': ['路'],
+}
+
+# 演变类关系及权重
+EVOLUTION_RELATIONS = [('设立', 20), ('更名', 10), ('合并', 4), ('升格', 4), ('撤县设市', 2), ('降格', 2),
+                       ('分置', 1), ('并入', 1), ('撤销', 1), ('复置', 1)]
+# 所属类关系占全部关系的比例
+BELONG_RATIO = 0.52
+# 关联实体包含多个地名的比例
+MULTI_TARGET_RATIO = 0.06
+
+# 朝代年号及公元年份范围
+ERAS = [('秦始皇', -246, -210), ('汉武帝元狩', -122, -117), ('隋开皇', 581, 600), ('唐贞观', 627, 649),
+        ('宋熙宁', 1068, 1077), ('元至元', 1264, 1294), ('明洪武', 1368, 1398), ('清雍正', 1723, 1735)]
+CHINESE_DIGITS = '〇一二三四五六七八九'
+
+# 有属性文件的地名比例
+ATTRIBUTE_RATIO = 0.3
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _chinese_number(number):
+    if number == 1:
+        return '元'
+    if number < 10:
+        return CHINESE_DIGITS[number]
+    tens, ones = divmod(number, 10)
+    return (CHINESE_DIGITS[tens] if tens > 1 else '') + '十' + (CHINESE_DIGITS[ones] if ones else '')
+
+
+def place_name(index, entity_type):
+    """由序号生成唯一的地名（同一序号在不同类型下名称不同）"""
+    chars = []
+    index += len(NAME_CHARS)
+    while index:
+        index, digit = divmod(index, len(NAME_CHARS))
+        chars.append(NAME_CHARS[digit])
+    return ''.join(reversed(chars)) + entity_type
+
+
+def random_time(rng):
+    """生成 data.json 风格的时间，如 明洪武二年（1369年）、1951年"""
+    if rng.random() < 0.3:
+        return f"{rng.randint(1949, 2020)}年"
+    era, start, end = rng.choice(ERAS)
+    year = rng.randint(start, end)
+    ce = f"前{-year}年" if year < 0 else f"{year}年"
+    return f"{era}{_chinese_number(year - start + 1)}年（{ce}）"
+
+
+class PlaceGenerator:
+    """合成地名生成器，维护已生成的地名以便关系引用已有地名"""
+
+    def __init__(self, place_count, seed=0):
+        self.rng = random.Random(seed)
+        self.place_count = max(place_count, 2)
+        self.places = []
+        self.by_type = {}
+        for index in range(self.place_count):
+            entity_type = _weighted(self.rng, ENTITY_TYPES)
+            name = place_name(index, entity_type)
+            self.places.append((name, entity_type))
+            self.by_type.setdefault(entity_type, []).append(name)
+
+    def _place_of_types(self, types):
+        candidates = [t for t in types if t in self.by_type]
+        if not candidates:
+            return self.rng.choice(self.places)
+        entity_type = self.rng.choice(candidates)
+        return self.rng.choice(self.by_type[entity_type]), entity_type
+
+    def row(self):
+        """生成一条主数据"""
+        name, entity_type = self.rng.choice(self.places)
+        if self.rng.random() < BELONG_RATIO:
+            relation, relation_type = '隶属', '所属类'
+            target, target_type = self._place_of_types(PARENT_TYPES.get(entity_type, []))
+        else:
+            relation, relation_type = _weighted(self.rng, EVOLUTION_RELATIONS), '演变类'
+            target, target_type = self._place_of_types([entity_type])
+        if self.rng.random() < MULTI_TARGET_RATIO and len(self.by_type.get(target_type, [])) > 1:
+            others = self.rng.sample(self.by_type[target_type], min(3, len(self.by_type[target_type])))
+            target = '、'.join(dict.fromkeys([target] + others))
+        return {
+            "实体名称": name,
+            "实体类型": entity_type,
+            "实体关系": relation,
+            "关系类型": relation_type,
+            "关联实体": target,
+            "关联实体类型": target_type,
+            "时间": random_time(self.rng)
+        }
+
+    def attributes(self, name, entity_type):
+        """生成与 result/*.json 结构相同的属性"""
+        rng = self.rng
+        return {
+            "中文名": name,
+            "外文名": "",
+            "别名": rng.choice(self.places)[0] if rng.random() < 0.2 else "",
+            "行政区划代码": f"{rng.randint(110000, 659000)}",
+            "行政区类别": entity_type,
+            "所属地区": rng.choice(self.places)[0],
+            "地理位置": f"东经{rng.uniform(73, 135):.2f}度，北纬{rng.uniform(18, 53):.2f}度",
+            "面积": f"{rng.uniform(10, 5000):.1f}平方公里",
+            "下辖地区": "",
+            "政府驻地": "",
+            "电话区号": f"0{rng.randint(10, 999)}",
+            "邮政编码": f"{rng.randint(100000, 859999)}",
+            "气候条件": rng.choice(["亚热带季风气候", "温带季风气候", "温带大陆性气候"]),
+            "人口数量": f"{rng.randint(1, 300)}万",
+            "著名景点": "",
+            "火车站": "",
+            "车牌代码": "",
+            "地区生产总值": f"{rng.randint(10, 5000)}亿元"
+        }
+
+
+def generate_dataset(output_dir, rows, seed=0):
+    """
+    生成合成数据集
+    :param output_dir: 输出目录，生成 data.json 和 result/*.json
+    :param rows: 主数据行数
+    :return: 生成统计
+    """
+    # 地名数量约为行数的0.7倍，与 data.json 中地名和行数的比例相近
+    generator = PlaceGenerator(int(rows * 0.7), seed)
+    os.makedirs(os.path.join(output_dir, 'result'), exist_ok=True)
+
+    data_path = os.path.join(output_dir, 'data.json')
+    with open(data_path, 'w', encoding='utf-8') as file:
+        file.write('[\n')
+        for index in range(rows):
+            if index:
+                file.write(',\n')
+            file.write(json.dumps(generator.row(), ensure_ascii=False))
+        file.write('\n]\n')
+
+    attribute_files = 0
+    for name, entity_type in generator.places:
+        if generator.rng.random() < ATTRIBUTE_RATIO:
+            attribute_files += 1
+            path = os.path.join(output_dir, 'result', f"{attribute_files}.json")
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(generator.attributes(name, entity_type), file, ensure_ascii=False)
+
+    print(f"合成数据集已生成: {data_path}, {rows}行, {generator.place_count}个地名, {attribute_files}个属性文件")
+    return {'rows': rows, 'places': generator.place_count, 'attribute_files': attribute_files}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成地名数据集')
+    parser.add_argument('--rows', type=int, default=1000, help='主数据行数（1千至100万）')
+    parser.add_argument('--output-dir', default='data/synthetic', help='输出目录')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+    generate_dataset(args.output_dir, args.rows, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+分词用户词典
+以图谱中的节点名称和别名（ns）、节点类型（n）、关系类型（v）及朝代（t）生成jieba格式的用户词典文件；
+内容哈希未变化时跳过重写，jieba词频表连同用户词一起序列化缓存，启动时无需重新构建前缀词典；
+节点写入后增量加入新词
+"""
+import hashlib
+import json
+import marshal
+import os
+import threading
+
+# 默认词典文件路径
+DEFAULT_DICT_PATH = os.path.join(os.path.dirname(__file__), 'historical_places.txt')
+# 词典状态（内容哈希、词数）
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'user_dict_state.json')
+# 分词器缓存（内容哈希、jieba词频表、总词频、用户词词性）
+DEFAULT_TOKENIZER_CACHE = os.path.join(os.path.dirname(__file__), 'data', 'user_dict_tokenizer.cache')
+
+# 用户词的词频
+WORD_FREQ = 10
+# 词性：地名、名词（节点类型）、动词（关系类型）、时间词（朝代）
+TAG_PLACE = 'ns'
+TAG_TYPE = 'n'
+TAG_RELATION = 'v'
+TAG_TIME = 't'
+
+# 朝代名称，以时间词加入词典（不是地名）
+DYNASTIES = [
+    "秦朝", "汉朝", "西汉", "东汉", "三国", "魏国", "蜀国", "吴国",
+    "晋朝", "西晋", "东晋", "南北朝", "隋朝", "唐朝", "五代十国",
+    "宋朝", "北宋", "南宋", "辽朝", "金朝", "元朝", "明朝", "清朝", "民国"
+]
+
+
+def dictionary_lines(entries):
+    """词典文件内容：每行 词语 频率 词性，按词语排序"""
+    return [f"{word} {WORD_FREQ} {tag}" for word, tag in sorted(entries.items())]
+
+
+def content_hash(entries):
+    """词典内容哈希（与文件中的行顺序无关）"""
+    return hashlib.sha1('\n'.join(dictionary_lines(entries)).encode('utf-8')).hexdigest()
+
+
+def read_dictionary_file(path):
+    """读取词典文件为 {词语: 词性}，后出现的行覆盖先出现的行"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            parts = line.split()
+            if not parts:
+                continue
+            entries[parts[0]] = parts[2] if len(parts) >= 3 else TAG_PLACE
+    return entries
+
+
+class UserDictionary:
+    """
+    分词用户词典服务
+    load 在启动时加载现有词典文件，分词器缓存的哈希与词典一致时直接恢复jieba词频表；
+    sync 从图谱重新生成词典，内容未变化时不做任何事；add_words 在节点写入后增量加入新词
+    """
+
+    def __init__(self, dict_path=DEFAULT_DICT_PATH, state_path=DEFAULT_STATE_PATH,
+                 tokenizer_cache=DEFAULT_TOKENIZER_CACHE):
+        self.dict_path = dict_path
+        self.state_path = state_path
+        self.tokenizer_cache = tokenizer_cache
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._hash = None
+        self._tokenizer_ready = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, word):
+        return word in self._entries
+
+    @property
+    def content_hash(self):
+        return self._hash
+
+    def load(self):
+        """加载现有词典文件并初始化分词器"""
+        with self._lock:
+            self._entries = read_dictionary_file(self.dict_path)
+            self._hash = content_hash(self._entries)
+            state = self._load_state()
+            if state.get('hash') != self._hash:
+                self._save_state()
+            print(f"已加载分词用户词典: {self.dict_path}，共 {len(self._entries)} 个词")
+            self._load_tokenizer()
+
+    def collect(self, neo4j_db):
+        """从图谱收集词典词条：节点类型、关系类型、朝代及节点名称和别名"""
+        entries = {}
+        for node_type in neo4j_db.get_node_types():
+            entries[node_type] = TAG_TYPE
+        for relation in neo4j_db.get_relationship_types():
+            entries[relation] = TAG_RELATION
+        for dynasty in DYNASTIES:
+            entries[dynasty] = TAG_TIME
+        for name in neo4j_db.get_place_names():
+            if name and name.strip():
+                entries[name.strip()] = TAG_PLACE
+        return entries
+
+    def sync(self, neo4j_db):
+        """
+        从图谱重新生成词典
+        内容哈希与现有词典相同时跳过；否则重写词典文件，并把增删的词同步到分词器
+        :return: 同步统计
+        """
+        entries = self.collect(neo4j_db)
+        digest = content_hash(entries)
+        with self._lock:
+            if digest == self._hash and os.path.exists(self.dict_path):
+                print(f"分词用户词典未变化，跳过重建（{len(entries)} 个词）")
+                return {'changed': False, 'words': len(entries), 'added': 0, 'removed': 0}
+
+            previous = self._entries
+            added = {word: tag for word, tag in entries.items() if previous.get(word) != tag}
+            removed = [word for word in previous if word not in entries]
+            self._entries = entries
+            self._hash = digest
+            with open(self.dict_path, 'w', encoding='utf-8') as file:
+                file.write('\n'.join(dictionary_lines(entries)))
+            self._save_state()
+
+            if self._tokenizer_ready:
+                import jieba
+                for word, tag in added.items():
+                    jieba.add_word(word, WORD_FREQ, tag)
+                for word in removed:
+                    jieba.del_word(word)
+                self._dump_tokenizer()
+
+        print(f"分词用户词典已从图谱重建: {len(entries)} 个词，新增 {len(added)} 个，移除 {len(removed)} 个")
+        return {'changed': True, 'words': len(entries), 'added': len(added), 'removed': len(removed)}
+
+    def add_words(self, words, tag=TAG_PLACE):
+        """
+        增量加入新词（节点写入后调用）
+        新词追加到词典文件并加入分词器；分词器缓存在下次同步或启动时更新
+        """
+        with self._lock:
+            new_words = []
+            for word in words:
+                word = word.strip() if isinstance(word, str) else ''
+                if word and self._entries.get(word) != tag:
+                    self._entries[word] = tag
+                    new_words.append(word)
+            if not new_words:
+                return 0
+
+            self._hash = content_hash(self._entries)
+            with open(self.dict_path, 'a', encoding='utf-8') as file:
+                for word in new_words:
+                    file.write(f"\n{word} {WORD_FREQ} {tag}")
+            self._save_state()
+
+            if self._tokenizer_ready:
+                import jieba
+                for word in new_words:
+                    jieba.add_word(word, WORD_FREQ, tag)
+        print(f"分词用户词典新增: {', '.join(new_words)}")
+        return len(new_words)
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.state_path, 'w', encoding='utf-8') as file:
+            json.dump({'hash': self._hash, 'words': len(self._entries)}, file)
+
+    def _load_tokenizer(self):
+        """
+        初始化jieba分词器
+        分词器缓存的哈希与当前词典一致时直接恢复词频表，否则初始化jieba并加入用户词后写出缓存
+        """
+        try:
+            import jieba
+        except ImportError:
+            print("未找到jieba分词库，跳过用户词典加载")
+            return
+
+        try:
+            if os.path.exists(self.tokenizer_cache):
+                with open(self.tokenizer_cache, 'rb') as file:
+                    cached_hash, freq, total, word_tags = marshal.load(file)
+                if cached_hash == self._hash:
+                    with jieba.dt.lock:
+                        jieba.dt.FREQ, jieba.dt.total = freq, total
+                        jieba.dt.user_word_tag_tab.update(word_tags)
+                        jieba.dt.initialized = True
+                    self._tokenizer_ready = True
+                    print(f"已从分词器缓存恢复用户词典: {self.tokenizer_cache}")
+                    return
+        except Exception as e:
+            print(f"读取分词器缓存失败，重新构建: {str(e)}")
+
+        try:
+            jieba.dt.initialize()
+            for word, tag in self._entries.items():
+                jieba.add_word(word, WORD_FREQ, tag)
+            self._tokenizer_ready = True
+            self._dump_tokenizer()
+            print(f"已加载分词用户词典并写出分词器缓存: {self.tokenizer_cache}")
+        except Exception as e:
+            print(f"加载用户词典失败: {str(e)}")
+
+    def _dump_tokenizer(self):
+        import jieba
+        directory = os.path.dirname(self.tokenizer_cache)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.tokenizer_cache + '.tmp'
+        with open(temp_path, 'wb') as file:
+            marshal.dump((self._hash, jieba.dt.FREQ, jieba.dt.total, jieba.dt.user_word_tag_tab), file)
+        os.replace(temp_path, self.tokenizer_cache)